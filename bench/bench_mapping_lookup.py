@@ -0,0 +1,49 @@
+# bench/bench_mapping_lookup.py
+"""
+Tìm key mapping khi bộ địa chỉ không khớp đúng (thiếu / sai huyện, thiếu / sai tỉnh, sai tên xã...):
+index phụ của MappingTable (find_mapping_key) so với quét toàn bộ mapping (_scan_mapping_key, cách cũ).
+Kết quả 2 cách được kiểm tra giống hệt nhau trên mọi địa chỉ trước khi đo.
+
+Chạy từ thư mục gốc repo: python bench/bench_mapping_lookup.py [số địa chỉ đo cách quét]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.conversion import mapping_table
+from core.conversion.handlers.common.main_code import find_mapping_key, _scan_mapping_key
+
+def miss_addresses(seed: int = 1) -> list:
+    """Từ mọi key: thiếu / sai huyện, thiếu / sai tỉnh, xã viết sai + 20k bộ ngẫu nhiên; chỉ giữ bộ không khớp đúng"""
+    rng = random.Random(seed)
+    keys = list(mapping_table)
+    addresses = []
+    for p, d, w in keys:
+        addresses += [(p, '', w), ('', d, w), (p, 'sai', w), ('sai', d, w), (p, d, w + 'x')]
+    addresses += [(rng.choice(keys)[0], rng.choice(keys)[1], rng.choice(keys)[2]) for _ in range(20000)]
+    return [a for a in addresses if a not in mapping_table]
+
+def main(scan_sample: int = 2000):
+    misses = miss_addresses()
+    found = [find_mapping_key(mapping_table, a) for a in misses]
+    assert found == [_scan_mapping_key(mapping_table, a) for a in misses], "index và quét toàn bộ cho kết quả khác nhau"
+    print(f"📊 {len(mapping_table)} key, {len(misses)} địa chỉ không khớp đúng, {sum(1 for k in found if k)} tìm được key")
+
+    # Quét toàn bộ chậm → đo trên scan_sample địa chỉ đầu
+    sample = misses[:scan_sample]
+    start = time.perf_counter()
+    for a in sample:
+        _scan_mapping_key(mapping_table, a)
+    t_scan = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    for a in misses:
+        find_mapping_key(mapping_table, a)
+    t_index = (time.perf_counter() - start) / len(misses)
+    print(f"quét toàn bộ: {t_scan * 1e6:.1f} us/dòng   index: {t_index * 1e6:.2f} us/dòng   x{t_scan / t_index:.0f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,61 @@
+# bench/bench_normalization.py
+"""
+Đo tốc độ chuẩn hóa tên địa danh: bản cũ (tests/reference_normalization.py) so với bản mới
+(vietnamese_code + PlaceNormalizer). Dữ liệu: mọi tên tỉnh / huyện / xã trong mapping.json + biến thể.
+
+Chạy từ thư mục gốc repo: python bench/bench_normalization.py [số vòng]
+"""
+import os
+import random
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.conversion.utils import vietnamese_code
+from core.conversion.utils.normalizer import normalize_place, place_normalizer
+from tests import reference_normalization as reference
+from tests.test_normalization import mapping_names, variants
+
+def measure(fn, cases, rounds, before_round=None) -> float:
+    """Số chuỗi / giây (lấy vòng nhanh nhất)"""
+    best = float("inf")
+    for _ in range(rounds):
+        if before_round:
+            before_round()
+        start = time.perf_counter()
+        for text in cases:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return len(cases) / best
+
+def strip_accents(text: str) -> str:
+    """Bỏ dấu (dữ liệu đã gõ không dấu) → đi đường nhanh ASCII"""
+    text = unicodedata.normalize("NFD", text).replace("đ", "d").replace("Đ", "D")
+    return "".join(ch for ch in text if ch.isascii())
+
+def clear_caches():
+    place_normalizer.cache_clear()
+    vietnamese_code.normalize_syllable_cached.cache_clear()
+
+def main(rounds: int = 3):
+    rng = random.Random(20251018)
+    names = mapping_names()
+    accented = [v for name in names for v in variants(name, rng)]
+    ascii_only = [strip_accents(text) for text in accented]
+    print(f"📊 {len(names)} tên trong mapping.json → {len(accented)} chuỗi (có dấu) + {len(ascii_only)} chuỗi ASCII")
+
+    cases = [
+        ("vietnamese_normalize_text (có dấu)", reference.vietnamese_normalize_text, vietnamese_code.vietnamese_normalize_text, accented),
+        ("vietnamese_normalize_text (ASCII)", reference.vietnamese_normalize_text, vietnamese_code.vietnamese_normalize_text, ascii_only),
+        ("normalize_place (có dấu)", reference.normalize_place, normalize_place, accented),
+    ]
+    for label, old, new, texts in cases:
+        old_rate = measure(old, texts, rounds)
+        # Cache xóa trước mỗi vòng → đo đúng chi phí lần đầu gặp chuỗi, không phải cache hit
+        new_rate = measure(new, texts, rounds, before_round=clear_caches)
+        print(f"{label:40s} cũ {old_rate:>12,.0f}/s   mới {new_rate:>12,.0f}/s   x{new_rate / old_rate:.1f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,74 @@
+# bench/bench_pool_ipc.py
+"""
+Dữ liệu gửi qua pool worker khi chuyển đổi: bọc pool.map, pickle từng tham số / kết quả để đếm byte.
+So với bản trước (map_dict gửi kèm mỗi chunk): chạy lại script với --root trỏ tới checkout cũ, vd
+    git worktree add /tmp/before 42f8924^
+    python bench/bench_pool_ipc.py 200000 --root /tmp/before
+
+Chạy từ thư mục gốc repo: python bench/bench_pool_ipc.py [số dòng] [--row-path] [--root PATH]
+Thời gian gồm cả khởi tạo pool và chi phí pickle để đếm byte.
+"""
+import argparse
+import inspect
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class MeteredPool:
+    """Bọc pool: đếm byte pickle của tham số gửi đi / kết quả nhận về"""
+    def __init__(self, pool):
+        self.pool = pool
+        self._processes = pool._processes
+        self.sent = 0
+        self.received = 0
+
+    def map(self, fn, args):
+        self.sent += sum(len(pickle.dumps(a, pickle.HIGHEST_PROTOCOL)) for a in args)
+        results = self.pool.map(fn, args)
+        self.received += sum(len(pickle.dumps(r, pickle.HIGHEST_PROTOCOL)) for r in results)
+        return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rows", type=int, nargs="?", default=200000)
+    parser.add_argument("--row-path", action="store_true", help="matching từng dòng (VECTORIZED_MATCHING = False)")
+    parser.add_argument("--root", default=os.path.dirname(BENCH_DIR), help="checkout của app cần đo")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, os.path.abspath(args.root))
+    os.chdir(args.root)
+    from gen_data import make_df, address_groups
+    from config.settings import Settings
+    from core.conversion import mapping_table
+    import core.conversion.handlers.common.main_code as main_code
+
+    Settings.VECTORIZED_MATCHING = not args.row_path
+    df = make_df(args.rows)
+    df.insert(len(df.columns), "statusState", "")
+    # Bản cũ chưa có tham số stats / create_pool
+    kwargs = {"stats": []} if "stats" in inspect.signature(main_code.process_df_with_suffix).parameters else {}
+
+    start = time.perf_counter()
+    if hasattr(main_code, "create_pool"):
+        pool = main_code.create_pool(args.workers, mapping_table)
+    else:
+        pool = multiprocessing.Pool(args.workers)
+    with pool:
+        metered = MeteredPool(pool)
+        for idx, (id_p, id_d, id_w, p, d, w) in enumerate(address_groups()):
+            df = main_code.process_df_with_suffix(df, mapping_table, id_p, id_d, id_w, p, d, w,
+                                                  suffix=f"_group{idx+1}", pool=metered, **kwargs)
+        elapsed = time.perf_counter() - start
+
+    mode = "từng dòng" if args.row_path else "vector hóa"
+    print(f"{args.root} ({mode}): {args.rows} dòng, 2 nhóm, {args.workers} worker   "
+          f"{elapsed:.2f}s   gửi {metered.sent / 1e6:.1f} MB   nhận {metered.received / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()
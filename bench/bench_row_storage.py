@@ -0,0 +1,135 @@
+# bench/bench_row_storage.py
+"""
+Lưu dòng kết quả theo chunk (cần Postgres, DATABASE_URL như app):
+  1. Định dạng lưu – các dòng của task nguồn được ghi lại thành 2 task phụ: rows JSONB (dạng cũ) và rows_blob
+     (Arrow IPC nén zstd): byte lưu, thời gian ghi / đọc toàn bộ, thời gian chuyển JSONB → blob 1 lần.
+     Chỉ chạy khi checkout có core/conversion/utils/row_blob.py.
+  2. Đọc / sửa trên task nguồn: trang lọc lỗi, trang giữa, tìm kiếm, sắp xếp, sửa 1 dòng / hàng loạt / theo quy tắc.
+     Phần sửa ghi edit vào task nguồn (--no-edits để bỏ qua).
+So với bản trước (dòng lưu JSONB): git worktree add /tmp/before 0e648eb^ rồi chạy với --root /tmp/before --create N
+(task nguồn phải được tạo bởi chính checkout đó).
+
+Chạy từ thư mục gốc repo:
+    python bench/bench_row_storage.py --create 1000000   # tạo task nguồn (lưu task_id vào --task-file) rồi đo
+    python bench/bench_row_storage.py                    # đo lại trên task nguồn đã tạo
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BLOB_TASK_ID = "bench_rows_blob"
+JSONB_TASK_ID = "bench_rows_jsonb"
+
+def timed(label: str, fn, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:48s} {(time.perf_counter() - start) / repeat * 1000:10.1f} ms", flush=True)
+    return result
+
+def stored_bytes(task_id: str) -> str:
+    from sqlalchemy import text
+    from core.database import engine
+    with engine.connect() as conn:
+        n_chunks, jsonb_bytes, blob_bytes = conn.execute(text(
+            "SELECT count(*), coalesce(sum(pg_column_size(rows)), 0), coalesce(sum(length(rows_blob)), 0) "
+            "FROM task_row_chunks WHERE task_id = :t"), {"t": task_id}).first()
+    return f"{n_chunks} chunk, rows JSONB {jsonb_bytes / 1e6:.1f} MB, rows_blob {blob_bytes / 1e6:.1f} MB"
+
+def stored_rows(task_id: str) -> int:
+    """Tổng số dòng theo task_row_chunks (task phụ của bench không có result.total_rows)"""
+    from sqlalchemy import text
+    from core.database import engine
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT coalesce(sum(n_rows), 0) FROM task_row_chunks WHERE task_id = :t"),
+                            {"t": task_id}).scalar()
+
+def save_jsonb_chunks(task_id: str, rows: list, chunk_rows: int) -> None:
+    """Ghi rows theo dạng cũ (task_row_chunks.rows JSONB, không có blob)"""
+    from sqlalchemy.orm import Session
+    from core.database import engine
+    from core.models import TaskRowChunk
+    import tasks.task_manager as tm
+    with Session(engine) as db:
+        db.query(TaskRowChunk).filter(TaskRowChunk.task_id == task_id).delete()
+        for chunk_index, start_row in enumerate(range(0, len(rows), chunk_rows)):
+            chunk = tm.make_json_serializable(rows[start_row:start_row + chunk_rows])
+            db.add(TaskRowChunk(task_id=task_id, chunk_index=chunk_index, start_row=start_row,
+                                n_rows=len(chunk), rows=chunk, success_count=tm.count_success(chunk)))
+            # Mỗi chunk 1 câu INSERT (không gộp cả task vào 1 câu lệnh rất lớn)
+            db.flush()
+            db.expunge_all()
+        db.commit()
+
+def bench_storage(source_task_id: str, chunk_rows: int) -> None:
+    import tasks.task_manager as tm
+    rows = timed("đọc toàn bộ task nguồn (load_row_chunks)", lambda: tm.load_row_chunks(source_task_id))
+    print(f"📊 {len(rows)} dòng")
+    for task_id in (BLOB_TASK_ID, JSONB_TASK_ID):
+        if tm.get_task_meta(task_id) is None:
+            tm.create_task(task_id, "bench", 0)
+
+    timed("ghi rows_blob (save_row_chunks)", lambda: tm.save_row_chunks(BLOB_TASK_ID, rows, chunk_rows))
+    timed("ghi rows JSONB (dạng cũ)", lambda: save_jsonb_chunks(JSONB_TASK_ID, rows, chunk_rows))
+    print("blob :", stored_bytes(BLOB_TASK_ID))
+    print("JSONB:", stored_bytes(JSONB_TASK_ID))
+    # Mỗi lần chỉ giữ thêm 1 bản đọc lại (task lớn: mỗi bản hàng GB)
+    rows = tm.make_json_serializable(rows)
+    print("đọc lại rows_blob giống dòng đã ghi:", timed("đọc toàn bộ rows_blob", lambda: tm.load_row_chunks(BLOB_TASK_ID)) == rows)
+    print("đọc lại rows JSONB giống dòng đã ghi:", timed("đọc toàn bộ rows JSONB", lambda: tm.load_row_chunks(JSONB_TASK_ID)) == rows)
+    timed("chuyển JSONB → blob 1 lần (migrate_legacy_result)", lambda: tm.migrate_legacy_result(JSONB_TASK_ID))
+    print("JSONB sau khi chuyển:", stored_bytes(JSONB_TASK_ID))
+    print("đọc lại sau khi chuyển giống dòng đã ghi:", tm.load_row_chunks(JSONB_TASK_ID) == rows)
+
+def bench_queries(task_id: str, edits: bool) -> None:
+    import tasks.task_manager as tm
+    total_rows = stored_rows(task_id)
+    timed("query_rows trang lọc lỗi", lambda: tm.query_rows(task_id, status="error"), 5)
+    timed("query_rows trang ở giữa (cursor)", lambda: tm.query_rows(task_id, cursor=str(total_rows * 3 // 5)), 5)
+    page = timed("tìm mọi cột (trang đầu + đếm)", lambda: tm.query_rows(task_id, search="p. 01"), 2)
+    timed("tìm mọi cột (trang tiếp)", lambda: tm.query_rows(task_id, search="p. 01", cursor=page["next_cursor"]), 2)
+    timed("tìm 1 cột (trang đầu + đếm)", lambda: tm.query_rows(task_id, search="p. 01", search_column="xa0"), 2)
+    timed("sort_by xa0, dòng lỗi", lambda: tm.query_rows(task_id, status="error", sort_by="xa0"), 2)
+    if not edits:
+        return
+    rng = random.Random(11)
+    ids = rng.sample(range(1, total_rows + 1), 50)
+    timed("edit_row", lambda: tm.edit_row(task_id, str(ids.pop()), {"huyen0": "BENCH"}), 50)
+    scattered = [{"id": i, "huyen0": "BENCH"} for i in rng.sample(range(1, total_rows + 1), min(4000, total_rows))]
+    timed("edit_rows 4000 id rải rác", lambda: tm.edit_rows(task_id, scattered))
+    timed("edit_rows_matching", lambda: tm.edit_rows_matching(task_id, {"xa0": "P. 01x"}, {"xa0": "P. 01x"}))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--create", type=int, metavar="ROWS", help="tạo task nguồn mới với ROWS dòng trước khi đo")
+    parser.add_argument("--task-file", default="/tmp/bench_row_storage.tid")
+    parser.add_argument("--root", default=os.path.dirname(BENCH_DIR), help="checkout của app cần đo")
+    parser.add_argument("--chunk-rows", type=int, default=20000)
+    parser.add_argument("--no-edits", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, os.path.abspath(args.root))
+    if args.create:
+        # uploads/ và downloads/ của app được tạo trong thư mục tạm
+        workdir = tempfile.mkdtemp(prefix="bench_row_storage_")
+        os.chdir(workdir)
+        from fastapi.testclient import TestClient
+        from gen_data import create_converted_task
+        from main import app
+        with TestClient(app) as client:
+            with open(args.task_file, "w") as f:
+                f.write(create_converted_task(client, args.create, workdir))
+    with open(args.task_file) as f:
+        task_id = f.read().strip()
+
+    if os.path.exists(os.path.join(args.root, "core", "conversion", "utils", "row_blob.py")):
+        bench_storage(task_id, args.chunk_rows)
+    bench_queries(task_id, edits=not args.no_edits)
+
+if __name__ == "__main__":
+    main()
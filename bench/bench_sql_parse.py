@@ -0,0 +1,50 @@
+# bench/bench_sql_parse.py
+"""
+Parse file .sql (INSERT kiểu mysqldump, 8 cột, 1000 dòng / câu INSERT): thời gian và bộ nhớ đỉnh (RSS) của
+parse_sql_inserts (cả file → 1 DataFrame); --batches: chỉ duyệt các batch của SqlInsertReader (nhánh stream).
+File sinh 1 lần tại đường dẫn --file (mặc định /tmp/bench_sql_<số dòng>.sql).
+So với bản trước: git worktree add /tmp/before 40ce44d^ rồi chạy thêm với --root /tmp/before.
+
+Chạy từ thư mục gốc repo: python bench/bench_sql_parse.py [số dòng] [--batches] [--root PATH]
+Mỗi lần chạy 1 process để số RSS đỉnh không lẫn giữa các cách đọc.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rows", type=int, nargs="?", default=100000)
+    parser.add_argument("--batches", action="store_true", help="duyệt batch của SqlInsertReader, không ghép DataFrame")
+    parser.add_argument("--root", default=os.path.dirname(BENCH_DIR), help="checkout của app cần đo")
+    parser.add_argument("--file", default=None)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, os.path.abspath(args.root))
+    from gen_data import write_sql_dump
+    from core.conversion.handlers import sql_handler
+
+    path = args.file or f"/tmp/bench_sql_{args.rows}.sql"
+    if not os.path.exists(path):
+        write_sql_dump(args.rows, path)
+    size_mb = os.path.getsize(path) / 1e6
+
+    start = time.perf_counter()
+    if args.batches:
+        rows = sum(len(batch) for batch in sql_handler.SqlInsertReader(path))
+        label = "SqlInsertReader (batch)"
+    else:
+        df, _, _, _ = sql_handler.parse_sql_inserts(path)
+        rows = len(df)
+        label = "parse_sql_inserts"
+    elapsed = time.perf_counter() - start
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+    print(f"{args.root} {label}: {rows} dòng / {size_mb:.0f} MB   {elapsed:.2f}s   RSS đỉnh {rss_mb} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# bench/bench_task_poll.py
+"""
+Độ trễ poll trạng thái task lớn qua TestClient (cần Postgres, DATABASE_URL như app):
+GET /tasks/{task_id} (chỉ metadata, get_task_meta) so với GET /tasks/{task_id}?include_rows=true
+(toàn bộ dòng – payload mà endpoint trả về trước khi tách get_task_meta). Trung vị của --repeat lần.
+
+Chạy từ thư mục gốc repo:
+    python bench/bench_task_poll.py --create 500000   # upload + chuyển đổi file sinh, lưu task_id vào --task-file
+    python bench/bench_task_poll.py                   # đo trên task đã tạo
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+def measure(client, url: str, repeat: int) -> tuple:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        r = client.get(url)
+        times.append(time.perf_counter() - start)
+    assert r.status_code == 200, r.text
+    return statistics.median(times), len(r.content)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--create", type=int, metavar="ROWS", help="tạo task mới với ROWS dòng trước khi đo")
+    parser.add_argument("--task-file", default="/tmp/bench_task_poll.tid")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-rows", action="store_true", help="bỏ qua phép đo include_rows=true (chậm với task lớn)")
+    args = parser.parse_args()
+
+    # uploads/ và downloads/ của app được tạo trong thư mục tạm
+    workdir = tempfile.mkdtemp(prefix="bench_task_poll_")
+    os.chdir(workdir)
+    from fastapi.testclient import TestClient
+    from gen_data import create_converted_task
+    from main import app
+
+    with TestClient(app) as client:
+        if args.create:
+            with open(args.task_file, "w") as f:
+                f.write(create_converted_task(client, args.create, workdir))
+        with open(args.task_file) as f:
+            task_id = f.read().strip()
+
+        cases = [("GET /tasks/{id}", f"/tasks/{task_id}")]
+        if not args.skip_rows:
+            cases.append(("GET /tasks/{id}?include_rows=true", f"/tasks/{task_id}?include_rows=true"))
+        for label, url in cases:
+            latency, size = measure(client, url, args.repeat)
+            print(f"{label:36s} trung vị {latency * 1000:10.1f} ms   response {size / 1e6:8.3f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench/gen_data.py
+"""
+Dữ liệu sinh cho benchmark: địa chỉ lấy ngẫu nhiên từ mapping.json (tỉnh / huyện / xã cũ),
+một phần bị làm sai (thiếu huyện, sai tên xã, tỉnh viết khác, ô trống...) như dữ liệu thật.
+"""
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MAPPING_FILE = Path(__file__).resolve().parent.parent / "core" / "data" / "mapping.json"
+
+def make_df(n: int, seed: int = 0, n_groups: int = 2) -> pd.DataFrame:
+    """n dòng: name, amount + n_groups nhóm cột tinh{g} / huyen{g} / xa{g}"""
+    rng = random.Random(seed)
+    with open(MAPPING_FILE, encoding="utf-8") as f:
+        raw = json.load(f)
+    pool = [(r["Tỉnh (CŨ)"], r["Huyện (CŨ)"], r["Xã (CŨ)"]) for r in raw if r.get("Xã (CŨ)")]
+    pool = rng.sample(pool, 3000)
+
+    def variant(address):
+        p, d, w = address
+        r = rng.random()
+        if r < 0.1:
+            d = ""
+        elif r < 0.15:
+            w = w + "x"
+        elif r < 0.2:
+            p = "Tỉnh " + p.split(". ", 1)[-1]
+        elif r < 0.22:
+            w = None
+        elif r < 0.25:
+            d = "Quận sai"
+        return p, d, w
+
+    data = {"name": [f"kh{i}" for i in range(n)], "amount": np.arange(n) * 1.5}
+    for g in range(n_groups):
+        rows = [variant(rng.choice(pool)) for _ in range(n)]
+        data[f"tinh{g}"] = [r[0] for r in rows]
+        data[f"huyen{g}"] = [r[1] for r in rows]
+        data[f"xa{g}"] = [r[2] for r in rows]
+    return pd.DataFrame(data)
+
+def address_groups(n_groups: int = 2) -> list:
+    """Nhóm địa chỉ (id_p, id_d, id_w, p, d, w) khớp với make_df"""
+    return [(None, None, None, f"tinh{g}", f"huyen{g}", f"xa{g}") for g in range(n_groups)]
+
+def group_payload(n_groups: int = 2) -> list:
+    """Nhóm địa chỉ dạng body của POST /start-conversion/{task_id}"""
+    return [{"id_province": None, "id_district": None, "id_ward": None,
+             "province": f"tinh{g}", "district": f"huyen{g}", "ward": f"xa{g}"} for g in range(n_groups)]
+
+def _sql_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, str):
+        return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+    return repr(value)
+
+def write_sql_dump(n: int, path, rows_per_insert: int = 1000, seed: int = 7) -> None:
+    """File .sql kiểu mysqldump: comment, CREATE TABLE, INSERT nhiều dòng (rows_per_insert dòng / câu)"""
+    df = make_df(n, seed=seed)
+    cols = ", ".join(f"`{c}`" for c in df.columns)
+    rows = list(df.itertuples(index=False, name=None))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("-- MySQL dump\n/*!40101 SET NAMES utf8 */;\nDROP TABLE IF EXISTS `khach_hang`;\n"
+                "CREATE TABLE `khach_hang` (`name` varchar(50) COMMENT 'tên; (khách)');\n")
+        for i in range(0, n, rows_per_insert):
+            f.write(f"INSERT INTO `khach_hang` ({cols}) VALUES ")
+            f.write(",\n".join("(" + ",".join(_sql_literal(v) for v in row) + ")" for row in rows[i:i + rows_per_insert]))
+            f.write(";\n")
+
+def create_converted_task(client, n_rows: int, workdir: str, n_groups: int = 1) -> str:
+    """Upload file CSV n_rows dòng sinh bởi make_df qua TestClient của app rồi chuyển đổi; trả về task_id"""
+    path = os.path.join(workdir, f"bench_{n_rows}.csv")
+    make_df(n_rows, seed=5, n_groups=n_groups).to_csv(path, index=False)
+    with open(path, "rb") as f:
+        task_id = client.post("/upload-and-detect", files={"file": (os.path.basename(path), f)}).json()["data"]["task_id"]
+    start = time.perf_counter()
+    r = client.post(f"/start-conversion/{task_id}", json={"groups": group_payload(n_groups)})
+    print(f"🔄 Chuyển đổi {n_rows} dòng: {time.perf_counter() - start:.1f}s ({r.status_code}), task_id = {task_id}")
+    return task_id
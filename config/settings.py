@@ -6,8 +6,35 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 class Settings:
     MAPPING_FILE = BASE_DIR / "core" / "data" / "mapping.json"
+    # Bản build nhị phân của mapping (tự build lại khi mapping.json đổi); đặt rỗng để tắt.
+    # File này được unpickle lúc khởi động → chỉ trỏ tới đường dẫn tin cậy, người ngoài không ghi được
+    MAPPING_ARTIFACT_FILE = os.getenv("MAPPING_ARTIFACT_FILE", str(BASE_DIR / "core" / "data" / "mapping.cache.pkl"))
     DOWNLOAD_DIR = BASE_DIR / "downloads"
 
+    # Matching theo cả cột (vector hóa); đặt VECTORIZED_MATCHING=0 để dùng lại bản duyệt từng dòng
+    VECTORIZED_MATCHING = os.getenv("VECTORIZED_MATCHING", "1") == "1"
+
+    # Số chuỗi tối đa giữ trong mỗi cache LRU của bộ chuẩn hóa địa danh
+    NORMALIZER_CACHE_SIZE = int(os.getenv("NORMALIZER_CACHE_SIZE", "200000"))
+
+    # Pool worker dùng chung cho mọi conversion (0 = theo số CPU)
+    WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "0")) or (os.cpu_count() or 1)
+    # Số worker tối đa 1 conversion được dùng cùng lúc trên pool chung
+    TASK_MAX_WORKERS = int(os.getenv("TASK_MAX_WORKERS", "4"))
+
+    # Chuyển đổi dạng stream (CSV, Excel, SQL...): đọc + xử lý + ghi kết quả theo từng chunk STREAM_CHUNK_ROWS dòng,
+    # tối đa STREAM_MAX_INFLIGHT_CHUNKS chunk đang xử lý (0 = theo số worker của task).
+    # STREAM_CHUNK_ROWS cũng là số dòng mỗi chunk trong task_row_chunks khi handler không stream
+    STREAM_CONVERSION = os.getenv("STREAM_CONVERSION", "1") == "1"
+    STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "20000"))
+    STREAM_MAX_INFLIGHT_CHUNKS = int(os.getenv("STREAM_MAX_INFLIGHT_CHUNKS", "0"))
+    # Số dòng mỗi record batch trong blob của chunk (task_row_chunks.rows_blob): đọc 1 dòng chỉ giải nén 1 batch
+    ROW_BLOB_BATCH_ROWS = int(os.getenv("ROW_BLOB_BATCH_ROWS", "2000"))
+
+    # Phân trang dòng kết quả (GET /tasks/{task_id}/rows): số dòng mặc định / tối đa mỗi trang
+    ROWS_PAGE_SIZE = int(os.getenv("ROWS_PAGE_SIZE", "100"))
+    ROWS_PAGE_MAX_SIZE = int(os.getenv("ROWS_PAGE_MAX_SIZE", "1000"))
+
     @staticmethod
     def get_output_filename_1(input_filename: str) -> str:
         """
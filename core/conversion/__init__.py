@@ -1,7 +1,8 @@
 # core/conversion/__init__.py
-from .utils.mapping_loader import load_mapping_and_units
+from .utils.mapping_loader import load_mapping_and_units, mapping_version as _mapping_version
 
 # Load 1 lần duy nhất khi import package
 mapping_table, units = load_mapping_and_units()
+mapping_version = _mapping_version()
 
-__all__ = ["mapping_table", "units"]
\ No newline at end of file
+__all__ = ["mapping_table", "units", "mapping_version"]
\ No newline at end of file
@@ -0,0 +1,11 @@
+# core/conversion/build_mapping.py
+"""
+Build lại mapping artifact (chạy lúc deploy để process đầu tiên không phải parse JSON):
+    python -m core.conversion.build_mapping [mapping.json] [artifact]
+"""
+import sys
+from .utils.mapping_loader import build_mapping_artifact
+
+if __name__ == "__main__":
+    source_hash = build_mapping_artifact(*sys.argv[1:3])
+    print(f"✅ Đã build mapping artifact (sha256 {source_hash[:12]})")
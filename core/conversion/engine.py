@@ -1,27 +1,64 @@
 import time
-import multiprocessing
+import threading
 from pathlib import Path
-from core.conversion.handlers import get_handler
-from tasks.task_manager import update_task,get_task
-from core.conversion import mapping_table, units
+from config.settings import Settings
+from core.conversion.handlers import get_handler, supports_streaming
+from core.conversion.handlers.common.main_code import create_pool, TaskPool
+from tasks.task_manager import update_task, get_task_meta, save_row_chunk, save_row_chunks, delete_row_chunks, find_reusable_result, copy_task_result
+from core.conversion import mapping_table, units, mapping_version
+from core.conversion.utils.upload_store import UPLOAD_DIR, upload_path, result_cache_key
 import asyncio
 from typing import Any
 
+# ------------------- POOL WORKER DÙNG CHUNG -------------------
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+def start_worker_pool(n_workers: int = None):
+    """
+    Tạo pool dùng chung cho mọi conversion (gọi 1 lần khi app khởi động).
+    Mỗi worker nhận mapping trong init_worker (initializer của Pool), không cần task làm nóng.
+    """
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            n_workers = n_workers or Settings.WORKER_POOL_SIZE
+            _worker_pool = create_pool(n_workers, mapping_table)
+            print(f"⚙️ Đã khởi tạo pool {n_workers} worker")
+        return _worker_pool
+
+def get_worker_pool():
+    """Pool dùng chung; tự khởi tạo nếu app chưa gọi start_worker_pool"""
+    return _worker_pool or start_worker_pool()
+
+def shutdown_worker_pool() -> None:
+    """Đóng pool dùng chung, chờ các task đang chạy xong (gọi khi app tắt)"""
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is not None:
+            _worker_pool.close()
+            _worker_pool.join()
+            _worker_pool = None
+
 def _run_conversion_sync(task_id: str) -> None:
     """
     Hàm blocking thật sự – chứa toàn bộ logic multiprocessing
     """
     try:
-        current_task = get_task(task_id)
+        current_task = get_task_meta(task_id)
         if not current_task:
             raise Exception("Không tìm thấy task")
 
         filename = current_task["filename"]
-        input_path = Path("uploads") / f"{task_id}{Path(filename).suffix}"
+        content_hash = current_task.get("content_hash")
+        if content_hash:
+            input_path = upload_path(content_hash, Path(filename).suffix)
+        else:
+            input_path = UPLOAD_DIR / f"{task_id}{Path(filename).suffix}"
         str_input_path = str(input_path)
 
-        n_workers = current_task.get("n_workers") or current_task.get("suggested_workers", 4)
-        n_workers = int(n_workers)
+        # Giới hạn số worker của task trên pool chung (theo kích thước file, không theo số user chọn)
+        n_workers = min(int(current_task.get("suggested_workers") or 1), Settings.TASK_MAX_WORKERS)
         
         raw_groups = current_task.get("selected_groups", [])
         if not raw_groups:
@@ -44,30 +81,50 @@ def _run_conversion_sync(task_id: str) -> None:
 
         start_time = time.time()
 
-        with multiprocessing.Pool(processes=n_workers) as pool:
-            result = handler_func(
-                input_file=str_input_path,
-                map_dict=mapping_table,
-                address_groups=address_groups,
-                pool=pool
-            )
+        # Cùng file + cùng nhóm địa chỉ + cùng mapping đã chuyển đổi ở task khác → chép kết quả, không chạy lại
+        result_key = result_cache_key(content_hash, raw_groups, mapping_version) if content_hash else None
+        update_task(task_id, result_key=None)
+        if result_key and _reuse_result(task_id, result_key, start_time):
+            return
+
+        pool = TaskPool(get_worker_pool(), n_workers)
+        handler_kwargs = {}
+        if Settings.STREAM_CONVERSION and supports_streaming(input_path.suffix):
+            # Kết quả từng chunk ghi thẳng vào task_row_chunks, không giữ cả file trong bộ nhớ
+            delete_row_chunks(task_id)
+            handler_kwargs["sink"] = lambda chunk_index, start_row, rows: save_row_chunk(task_id, chunk_index, start_row, rows)
+
+        result = handler_func(
+            input_file=str_input_path,
+            map_dict=mapping_table,
+            address_groups=address_groups,
+            pool=pool,
+            **handler_kwargs
+        )
 
         progress = round(result["success_count"] / result["total_rows"] * 100, 1) if result["total_rows"] > 0 else 0
 
         elapsed = time.time() - start_time
 
         if result.get("success"):
+            if "full_df" in result:
+                # Handler không stream: vẫn lưu dòng vào task_row_chunks, tasks.result chỉ giữ metadata
+                row_chunks = save_row_chunks(task_id, result.pop("full_df"), Settings.STREAM_CHUNK_ROWS)
+            else:
+                row_chunks = result["row_chunks"]
             update_task(task_id, 
                 status = "preview_ready",
                 progress = progress,
                 message = f"HOÀN THÀNH trong {elapsed:.1f}s, Sẵn sàng xem kết quả và chỉnh sửa!",
                 columns = result["columns"],
                 step = 2,
+                result_key = result_key,
                 result={ 
                     "total_rows": result["total_rows"],
                     "success_count": result["success_count"],
                     "fail_count": result["fail_count"],
-                    "full_data": result["full_df"]
+                    "address_stats": result.get("address_stats", []),
+                    "row_chunks": row_chunks,
                 }
             )
         else:
@@ -77,6 +134,28 @@ def _run_conversion_sync(task_id: str) -> None:
         update_task(task_id, status="failed", message=f"Lỗi: {str(e)}", progress=0)
 
 
+def _reuse_result(task_id: str, result_key: str, start_time: float) -> bool:
+    """Chép kết quả của task khác có cùng result_key (nếu có) và đánh dấu task sẵn sàng"""
+    src_task_id = find_reusable_result(result_key, exclude_task_id=task_id)
+    if not src_task_id:
+        return False
+    copied = copy_task_result(src_task_id, task_id)
+    if not copied:
+        return False
+    result_meta, columns = copied
+
+    total_rows = result_meta.get("total_rows", 0)
+    progress = round(result_meta.get("success_count", 0) / total_rows * 100, 1) if total_rows > 0 else 0
+    elapsed = time.time() - start_time
+    update_task(task_id,
+        status = "preview_ready",
+        progress = progress,
+        message = f"HOÀN THÀNH trong {elapsed:.1f}s (dùng lại kết quả đã chuyển đổi), Sẵn sàng xem kết quả và chỉnh sửa!",
+        step = 2,
+        result_key = result_key,
+    )
+    return True
+
 # Hàm async
 async def convert_file_blocking(task_id: str):
     """
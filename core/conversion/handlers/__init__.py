@@ -3,6 +3,8 @@ from .csv_handler import process_csv
 from .json_handler import process_json
 from .excel_handler import process_excel
 from .sql_handler import process_sql
+from .sqlite_handler import process_sqlite
+from .parquet_handler import process_parquet
 
 def get_handler(ext: str):
     """
@@ -13,6 +15,20 @@ def get_handler(ext: str):
         '.json': process_json,
         '.xlsx': process_excel,
         '.xls': process_excel,
-        '.sql': process_sql
+        '.sql': process_sql,
+        '.db': process_sqlite,
+        '.sqlite': process_sqlite,
+        '.sqlite3': process_sqlite,
+        '.parquet': process_parquet,
+        '.feather': process_parquet,
+        '.arrow': process_parquet,
+        '.ipc': process_parquet
     }
-    return handlers.get(ext.lower())
\ No newline at end of file
+    return handlers.get(ext.lower())
+
+def supports_streaming(ext: str) -> bool:
+    """
+    Handler của định dạng này nhận tham số sink (ghi kết quả theo từng chunk thay vì trả full_df)
+    """
+    return ext.lower() in ('.csv', '.xlsx', '.xls', '.sql', '.db', '.sqlite', '.sqlite3',
+                           '.parquet', '.feather', '.arrow', '.ipc')
\ No newline at end of file
@@ -1,8 +1,12 @@
+import threading
+from collections import deque
+import numpy as np
 import pandas as pd
 from multiprocessing import Pool, cpu_count
-from typing import Dict, Optional, Tuple, List
+from typing import Callable, Dict, Iterable, Optional, Tuple, List
+from config.settings import Settings
 from core.conversion.utils.column_detector import validate_columns
-from core.conversion.utils.normalizer import normalize_mapping_key
+from core.conversion.utils.normalizer import normalize_mapping_key, normalize_key_part
 
 def find_mapping_key(mapping_table: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]], address: tuple) -> str:
     """
@@ -10,26 +14,143 @@ def find_mapping_key(mapping_table: Dict[Tuple[str, str, str], List[Tuple[str, s
     address: tuple (name1, name2, id)
     Trả về key (tuple) nếu thỏa: address[2] == key[2] và (address[0] == key[0] or address[1] == key[1])
     Ngược lại trả về ''.
+    Nếu mapping_table có chỉ mục phụ (MappingTable) thì tra O(1), không duyệt toàn bảng.
     """
     if address in mapping_table:
         return address
-    else:
-        countkey = 0
-        keyfound = ''
-        for key in mapping_table.keys():
-            if address[2] == key[2] and (address[0] == key[0] or address[1] == key[1]):
-                countkey += 1
-                if countkey > 1:
-                    return ''
-                keyfound = key
-        if countkey == 1:
-            return keyfound
+
+    ward_province_index = getattr(mapping_table, 'ward_province_index', None)
+    ward_district_index = getattr(mapping_table, 'ward_district_index', None)
+    if ward_province_index is None or ward_district_index is None:
+        return _scan_mapping_key(mapping_table, address)
+
+    keyfound = ''
+    for index, partial in ((ward_province_index, (address[2], address[0])),
+                           (ward_district_index, (address[2], address[1]))):
+        entry = index.get(partial)
+        if entry is None:
+            continue
+        countkey, key = entry
+        # Chỉ nhận khi đúng 1 key khớp (key khớp cả 2 chỉ mục chỉ tính 1 lần)
+        if countkey > 1 or (keyfound and keyfound != key):
+            return ''
+        keyfound = key
+    return keyfound
+
+def _scan_mapping_key(mapping_table: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]], address: tuple) -> str:
+    """Duyệt toàn bảng – dùng cho dict thường không có chỉ mục phụ"""
+    countkey = 0
+    keyfound = ''
+    for key in mapping_table.keys():
+        if address[2] == key[2] and (address[0] == key[0] or address[1] == key[1]):
+            countkey += 1
+            if countkey > 1:
+                return ''
+            keyfound = key
+    if countkey == 1:
+        return keyfound
     return ''
 
+# ------------------- MAPPING TRONG WORKER -------------------
+# Mapping của process worker: gán 1 lần bởi init_worker (initializer của Pool),
+# để các task chỉ mang dữ liệu dòng + tên cột, không pickle lại mapping mỗi chunk.
+_worker_map_dict = None
+
+def init_worker(map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]] = None) -> None:
+    """
+    Initializer cho multiprocessing.Pool: Pool(n, initializer=init_worker, initargs=(mapping_table,)).
+    Pool chạy initializer trong mọi worker lúc khởi động (cả worker thay thế), nên worker nào cũng
+    giữ sẵn mapping trước task đầu tiên. Với fork, initargs được kế thừa từ process chính nên không phải pickle.
+    """
+    global _worker_map_dict
+    _worker_map_dict = map_dict
+
+def _get_worker_map_dict() -> Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]]:
+    """Mapping của worker; Pool không có initializer thì dùng mapping_table đã load khi import"""
+    if _worker_map_dict is None:
+        from core.conversion import mapping_table
+        init_worker(mapping_table)
+    return _worker_map_dict
+
+def create_pool(n_workers: int, map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]]):
+    """Tạo Pool mà mỗi worker đã giữ sẵn map_dict"""
+    return Pool(processes=n_workers, initializer=init_worker, initargs=(map_dict,))
+
+class TaskPool:
+    """
+    Giới hạn số task chạy đồng thời của 1 conversion trên pool dùng chung.
+    Dùng được ở mọi chỗ đang nhận pool (process_df_with_suffix chỉ cần map + _processes).
+    """
+    def __init__(self, pool, max_workers: int):
+        self.pool = pool
+        self._processes = max(1, max_workers)
+
+    def map(self, func, iterable) -> list:
+        slots = threading.BoundedSemaphore(self._processes)
+        release = lambda _: slots.release()
+        pending = []
+        for args in iterable:
+            slots.acquire()
+            pending.append(self.pool.apply_async(func, (args,), callback=release, error_callback=release))
+        return [result.get() for result in pending]
+
+    def imap(self, func, iterable, max_inflight: int = None):
+        """
+        Như map nhưng trả kết quả dần theo đúng thứ tự và chỉ lấy thêm phần tử từ iterable
+        khi số task chưa lấy kết quả < max_inflight (mặc định = số worker của task),
+        nên bộ nhớ không phụ thuộc độ dài iterable.
+        """
+        max_inflight = max(1, max_inflight or self._processes)
+        pending = deque()
+        for args in iterable:
+            if len(pending) >= max_inflight:
+                yield pending.popleft().get()
+            pending.append(self.pool.apply_async(func, (args,)))
+        while pending:
+            yield pending.popleft().get()
+
+class InlinePool:
+    """Chạy tuần tự ngay trong process hiện tại (dùng trong worker, nơi không tạo pool con được)"""
+    _processes = 1
+
+    def map(self, func, iterable) -> list:
+        return [func(args) for args in iterable]
+
+# ------------------- CỘT OPTION -------------------
+def _option_columns(ward_col: str, ward_id_col_name: str, opt_num: int) -> Tuple[str, str]:
+    """Tên (cột mã xã, cột tên xã) của option thứ opt_num"""
+    return f'{ward_id_col_name}_option_{opt_num}', f'{ward_col}_option_{opt_num}'
+
+def _insert_option_columns(df: pd.DataFrame, ward_col: str, ward_id_col_name: str, max_values: int) -> List[str]:
+    """
+    Tạo sẵn 1 lần các cột option 2..max_values (giá trị '') trước khi chia chunk,
+    để mọi chunk có cùng schema và không phải chèn cột trong lúc duyệt.
+    Thứ tự: xã, mã option 2, tên option 2, mã option 3, tên option 3, ...
+    Trả về các cột đã thêm.
+    """
+    inserted = []
+    for opt_num in range(2, max_values + 1):
+        ward_id_col, ward_name_col = _option_columns(ward_col, ward_id_col_name, opt_num)
+        if ward_id_col not in df.columns:
+            prev_col = f'{ward_col}_option_{opt_num-1}' if opt_num > 2 else ward_col
+            insert_pos = df.columns.get_loc(prev_col) + 1
+            df.insert(insert_pos, ward_id_col, '')
+            inserted.append(ward_id_col)
+        if ward_name_col not in df.columns:
+            insert_pos = df.columns.get_loc(ward_id_col) + 1
+            df.insert(insert_pos, ward_name_col, '')
+            inserted.append(ward_name_col)
+    return inserted
+
 # ------------------- HÀM XỬ LÝ TỪNG CHUNK  -------------------
 def _process_chunk(args):
-    chunk_idx, chunk_df, map_dict, province_col, district_col, ward_col, province_id_col_name, ward_id_col_name, suffix = args
-
+    """
+    Duyệt từng dòng của chunk (các cột option đã được tạo sẵn).
+    Trả về (chunk_df, số giá trị mới nhiều nhất đã dùng trong chunk).
+    """
+    chunk_idx, chunk_df, province_col, district_col, ward_col, province_id_col_name, ward_id_col_name, suffix = args
+    map_dict = _get_worker_map_dict()
+    max_used = 0
 
     for idx, row in chunk_df.iterrows():
         province_raw = str(row.get(province_col, '')) if province_col else ''
@@ -57,21 +178,10 @@ def _process_chunk(args):
                 # Xử lý các option (từ tuple thứ 2 trở đi)
                 for opt_num, val in enumerate(values[1:], start=2):
                     prov_new_opt, ward_new_opt, id_prov_opt, id_ward_opt = val
-
-                    ward_id_col = f'{ward_id_col_name}_option_{opt_num}'
-                    ward_name_col = f'{ward_col}_option_{opt_num}'
-
-                    # Thêm cột nếu chưa có
-                    if ward_id_col not in chunk_df.columns:
-                        prev_col = f'{ward_col}_option_{opt_num-1}' if opt_num > 2 else ward_col
-                        insert_pos = chunk_df.columns.get_loc(prev_col) + 1 
-                        chunk_df.insert(insert_pos, ward_id_col, '')
+                    ward_id_col, ward_name_col = _option_columns(ward_col, ward_id_col_name, opt_num)
                     chunk_df.at[idx, ward_id_col] = id_ward_opt
-
-                    if ward_name_col not in chunk_df.columns:
-                        insert_pos = chunk_df.columns.get_loc(ward_id_col) + 1
-                        chunk_df.insert(insert_pos, ward_name_col, '')
                     chunk_df.at[idx, ward_name_col] = ward_new_opt
+                max_used = max(max_used, len(values))
             if  chunk_df.at[idx, 'statusState'] == '':
                 chunk_df.at[idx, 'statusState'] = 'Thành công'
         else:
@@ -79,10 +189,143 @@ def _process_chunk(args):
                 chunk_df.at[idx, 'statusState'] = f'Lỗi {suffix}'
             else:
                 chunk_df.at[idx, 'statusState'] += f';{suffix}'
-    return chunk_df
+    return chunk_df, max_used
+
+
+# ------------------- MATCHING VECTOR HÓA -------------------
+def _factorize_addresses(df: pd.DataFrame,
+                         province_col: Optional[str],
+                         district_col: Optional[str],
+                         ward_col: Optional[str]) -> Tuple[np.ndarray, List[Tuple[str, str, str]]]:
+    """
+    Mã hóa bộ địa chỉ thô (tỉnh, huyện, xã) của từng dòng.
+    Trả về (codes cho từng dòng, list bộ địa chỉ thô duy nhất theo thứ tự mã).
+    """
+    n_rows = len(df)
+    parts = []
+    for col in (province_col, district_col, ward_col):
+        if not col or col not in df.columns:
+            parts.append((np.zeros(n_rows, dtype=np.intp), np.array([''], dtype=object)))
+            continue
+        raw = np.array([str(v) for v in df[col].to_numpy(dtype=object)], dtype=object)
+        part_codes, part_uniques = pd.factorize(raw)
+        parts.append((part_codes, np.asarray(part_uniques, dtype=object)))
+
+    codes = np.zeros(n_rows, dtype=np.int64)
+    for part_codes, part_uniques in parts:
+        codes, _ = pd.factorize(codes * len(part_uniques) + part_codes)
+    _, first_rows = np.unique(codes, return_index=True)
+
+    triples = list(zip(*(part_uniques[part_codes[first_rows]] for part_codes, part_uniques in parts)))
+    return codes, triples
+
+def _resolve_addresses(triples: List[Tuple[str, str, str]]) -> List[str]:
+    """
+    Chuẩn hóa + tìm key cho 1 nhóm bộ địa chỉ thô (chạy trong worker).
+    Trả về key tìm được (hoặc '') theo đúng thứ tự đầu vào.
+    """
+    map_dict = _get_worker_map_dict()
+    return [
+        find_mapping_key(map_dict, tuple(normalize_key_part(part) for part in triple))
+        for triple in triples
+    ]
+
+def _build_match_columns(keys: List[str],
+                         map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]]) -> dict:
+    """
+    Dựng sẵn kết quả theo từng bộ địa chỉ duy nhất:
+    matched, số giá trị mới, 4 cột của tuple đầu tiên và (tên xã, mã xã) của từng option.
+    """
+    n_uniques = len(keys)
+    matched = np.zeros(n_uniques, dtype=bool)
+    n_values = np.zeros(n_uniques, dtype=np.int64)
+    for u, key in enumerate(keys):
+        if key:
+            matched[u] = True
+            n_values[u] = len(map_dict[key])
+
+    max_values = int(n_values.max()) if n_uniques else 0
+    first = [np.empty(n_uniques, dtype=object) for _ in range(4)]
+    options = [(np.empty(n_uniques, dtype=object), np.empty(n_uniques, dtype=object))
+               for _ in range(2, max_values + 1)]
+    for u, key in enumerate(keys):
+        if not n_values[u]:
+            continue
+        values = map_dict[key]
+        for arr, val in zip(first, values[0]):
+            arr[u] = val
+        for (opt_ward_new, opt_id_ward), val in zip(options, values[1:]):
+            _, opt_ward_new[u], _, opt_id_ward[u] = val
+
+    return {"matched": matched, "n_values": n_values, "first": first, "options": options}
+
+def _assign_rows(df: pd.DataFrame, col: str, mask: np.ndarray, values: np.ndarray) -> None:
+    """Gán values[mask] vào cột col – tương đương df.at[idx, col] = ... cho từng dòng trong mask"""
+    if not mask.any():
+        return
+    if col not in df.columns:
+        df[col] = np.nan
+    column = df[col].to_numpy(dtype=object, copy=True)
+    column[mask] = values[mask]
+    df[col] = column
+
+def _apply_matches(df: pd.DataFrame, codes: np.ndarray, match_columns: dict,
+                   province_col, ward_col, province_id_col_name, ward_id_col_name, suffix) -> pd.DataFrame:
+    """
+    Bản vector hóa của _process_chunk, cho kết quả giống hệt: phát kết quả của từng
+    bộ địa chỉ duy nhất về các dòng theo codes, gán tên/mã mới, cột option và statusState theo cả cột.
+    Các cột option phải được tạo sẵn bằng _insert_option_columns.
+    """
+    n_values = match_columns["n_values"][codes]
+    matched = match_columns["matched"][codes]
+
+    # Tuple đầu tiên: tên tỉnh, tên xã, mã tỉnh, mã xã mới
+    if len(codes) and n_values.max() > 0:
+        prov_new, ward_new, id_prov, id_ward = (arr[codes] for arr in match_columns["first"])
+        has_values = n_values > 0
+        _assign_rows(df, province_col if province_col else f'provinceName{suffix}', has_values, prov_new)
+        _assign_rows(df, ward_col, has_values, ward_new)
+        _assign_rows(df, province_id_col_name, has_values, id_prov)
+        _assign_rows(df, ward_id_col_name, has_values, id_ward)
+
+    # Xử lý các option (từ tuple thứ 2 trở đi)
+    for opt_num, (opt_ward_new, opt_id_ward) in enumerate(match_columns["options"], start=2):
+        ward_id_col, ward_name_col = _option_columns(ward_col, ward_id_col_name, opt_num)
+        has_option = n_values >= opt_num
+        _assign_rows(df, ward_id_col, has_option, opt_id_ward[codes])
+        _assign_rows(df, ward_name_col, has_option, opt_ward_new[codes])
+
+    # CẬP NHẬT statusState
+    status = df['statusState'].to_numpy(dtype=object, copy=True)
+    is_empty = status == ''
+    set_success = matched & is_empty
+    set_error = ~matched & (is_empty | (status == 'Thành công'))
+    append_error = ~matched & ~set_error
+    status[set_success] = 'Thành công'
+    status[set_error] = f'Lỗi {suffix}'
+    status[append_error] = np.array([s + f';{suffix}' for s in status[append_error]], dtype=object)
+    df['statusState'] = status
+    return df
 
 
 # ------------------- HÀM CHÍNH process_df (song song) -------------------
+def _resolve_triples(triples: List[Tuple[str, str, str]],
+                     map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]],
+                     pool=None) -> List[str]:
+    """Chia các bộ địa chỉ duy nhất thành chunk, tìm key song song (1 lượt pool.map)"""
+    n_workers = pool._processes if pool else 1
+    triple_chunk_size = max(1000, -(-len(triples) // n_workers))
+    resolve_args = [
+        triples[i:i + triple_chunk_size]
+        for i in range(0, len(triples), triple_chunk_size)
+    ]
+    if pool:
+        resolved = pool.map(_resolve_addresses, resolve_args)
+    else:
+        with create_pool(n_workers, map_dict) as temp_pool:
+            resolved = temp_pool.map(_resolve_addresses, resolve_args)
+    return [key for part in resolved for key in part]
+
 def process_df_with_suffix(df: pd.DataFrame,
                            map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]],
                            id_province_col: Optional[str] = None,
@@ -92,9 +335,16 @@ def process_df_with_suffix(df: pd.DataFrame,
                            district_col: Optional[str] = None,
                            ward_col: Optional[str] = None,
                            suffix: str = "",
-                           pool=None) -> pd.DataFrame:
+                           pool=None,
+                           stats: Optional[List[dict]] = None,
+                           resolved: Optional[Tuple[np.ndarray, list, list]] = None,
+                           uniques: Optional[Dict[str, list]] = None) -> pd.DataFrame:
     """
     Xử lý 1 nhóm địa chỉ → thêm cột với suffix → trả về df mới.
+    Nếu truyền stats (list) thì thêm vào đó thống kê số bộ địa chỉ duy nhất / tổng số dòng của nhóm.
+    Nếu truyền uniques (dict) thì ghi vào đó các bộ địa chỉ thô duy nhất của nhóm (đã có sẵn từ bước mã hóa).
+    pool phải được tạo bằng create_pool(n, map_dict) (worker giữ sẵn map_dict).
+    resolved = (codes, triples, keys) đã tìm sẵn (do process_df_groups truyền vào) thì không gửi lên pool nữa.
     """
     if not validate_columns(province_col, district_col, ward_col):
         print("Cảnh báo: Thiếu cột địa chỉ cần thiết. Bỏ qua nhóm này.")
@@ -132,29 +382,238 @@ def process_df_with_suffix(df: pd.DataFrame,
         pos = df.columns.get_loc(province_id_col_name) + 1
         df.insert(pos, f'provinceName{suffix}', '')
 
-    # --- CHIA CHUNK & XỬ LÝ SONG SONG ---
     n_workers = pool._processes if pool else 1
-    ideal_chunk_size = 10000
-    chunk_size = max(ideal_chunk_size, total_rows // (n_workers * 2))
-    chunks = [df[i:i + chunk_size] for i in range(0, total_rows, chunk_size)]
-
-    chunk_args = [
-        (i, chunk.copy(), map_dict, province_col, district_col, ward_col,
-         province_id_col_name, ward_id_col_name, suffix)
-        for i, chunk in enumerate(chunks)
-    ]
 
-    if pool:
-        results = pool.map(_process_chunk, chunk_args)
+    if Settings.VECTORIZED_MATCHING:
+        # --- MÃ HÓA: MỖI BỘ ĐỊA CHỈ KHÁC NHAU CHỈ CHUẨN HÓA + MATCHING 1 LẦN ---
+        if resolved is None:
+            codes, triples = _factorize_addresses(df, province_col, district_col, ward_col)
+            keys = _resolve_triples(triples, map_dict, pool)
+        else:
+            codes, triples, keys = resolved
+        match_columns = _build_match_columns(keys, map_dict)
+
+        # --- TẠO SẴN CỘT OPTION THEO SỐ GIÁ TRỊ MỚI NHIỀU NHẤT CỦA CÁC KEY TÌM ĐƯỢC ---
+        _insert_option_columns(df, ward_col, ward_id_col_name, len(match_columns["options"]) + 1)
+
+        # --- PHÁT KẾT QUẢ VỀ TỪNG DÒNG (schema cố định nên gán thẳng trên cả df) ---
+        if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+            df = df.reset_index(drop=True)
+        result_df = _apply_matches(df, codes, match_columns,
+                                   province_col, ward_col, province_id_col_name, ward_id_col_name, suffix)
+
+        if uniques is not None:
+            uniques[suffix.lstrip('_')] = triples
+        if stats is not None:
+            stats.append({
+                "group": suffix.lstrip('_'),
+                "total_rows": total_rows,
+                "unique_addresses": len(triples),
+                "unique_ratio": round(len(triples) / total_rows, 4),
+            })
     else:
-        with Pool(n_workers) as temp_pool:
-            results = temp_pool.map(_process_chunk, chunk_args)
+        # --- TẠO SẴN CỘT OPTION THEO SỐ GIÁ TRỊ MỚI NHIỀU NHẤT CỦA MAPPING, BỎ PHẦN THỪA SAU KHI GỘP ---
+        max_values = max((len(values) for values in map_dict.values()), default=1)
+        inserted_cols = _insert_option_columns(df, ward_col, ward_id_col_name, max_values)
+
+        # --- CHIA CHUNK & XỬ LÝ SONG SONG ---
+        ideal_chunk_size = 10000
+        chunk_size = max(ideal_chunk_size, total_rows // (n_workers * 2))
+        chunks = [df[i:i + chunk_size] for i in range(0, total_rows, chunk_size)]
+
+        chunk_args = [
+            (i, chunk.copy(), province_col, district_col, ward_col,
+             province_id_col_name, ward_id_col_name, suffix)
+            for i, chunk in enumerate(chunks)
+        ]
 
-    # --- GỘP KẾT QUẢ ---
-    result_df = pd.concat(results, ignore_index=True, sort=False)
+        if pool:
+            results = pool.map(_process_chunk, chunk_args)
+        else:
+            with create_pool(n_workers, map_dict) as temp_pool:
+                results = temp_pool.map(_process_chunk, chunk_args)
+
+        # --- GỘP KẾT QUẢ ---
+        result_df = pd.concat([chunk_df for chunk_df, _ in results], ignore_index=True, sort=False)
+        max_used = max(used for _, used in results)
+        unused_cols = {col for opt_num in range(max(max_used, 1) + 1, max_values + 1)
+                       for col in _option_columns(ward_col, ward_id_col_name, opt_num)}
+        result_df = result_df.drop(columns=[col for col in inserted_cols if col in unused_cols])
 
     # XÓA CỘT HUYỆN
     if district_col and district_col in result_df.columns:
         result_df = result_df.drop(columns=[district_col])
 
-    return result_df
\ No newline at end of file
+    return result_df
+
+def process_df_groups(df: pd.DataFrame,
+                      map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]],
+                      address_groups: List[tuple],
+                      pool=None,
+                      stats: Optional[List[dict]] = None,
+                      uniques: Optional[Dict[str, list]] = None) -> pd.DataFrame:
+    """
+    Xử lý tất cả nhóm địa chỉ (id_p, id_d, id_w, p, d, w) của file, nhóm thứ i có suffix _group{i}.
+    stats / uniques: xem process_df_with_suffix.
+    Khi matching vector hóa và các nhóm không dùng chung cột: mã hóa địa chỉ của mọi nhóm trước,
+    gộp các bộ địa chỉ duy nhất của tất cả nhóm rồi tìm key trong 1 lượt pool.map,
+    sau đó gán kết quả lần lượt từng nhóm (giống hệt xử lý từng nhóm riêng).
+    """
+    groups = [(f"_group{idx+1}", cols) for idx, cols in enumerate(address_groups)]
+
+    resolved_groups = {}
+    group_cols = [{c for c in cols if c} for _, cols in groups]
+    disjoint = sum(len(cols) for cols in group_cols) == len(set().union(*group_cols)) if group_cols else True
+    if Settings.VECTORIZED_MATCHING and disjoint and len(df) > 0:
+        factorized = {}
+        for suffix, (id_p, id_d, id_w, p, d, w) in groups:
+            if validate_columns(p, d, w):
+                factorized[suffix] = _factorize_addresses(df, p, d, w)
+
+        all_triples = list(dict.fromkeys(t for _, triples in factorized.values() for t in triples))
+        keys_by_triple = dict(zip(all_triples, _resolve_triples(all_triples, map_dict, pool))) if all_triples else {}
+        for suffix, (codes, triples) in factorized.items():
+            resolved_groups[suffix] = (codes, triples, [keys_by_triple[t] for t in triples])
+
+    for suffix, (id_p, id_d, id_w, p, d, w) in groups:
+        df = process_df_with_suffix(df, map_dict,
+                                    id_province_col=id_p,
+                                    id_district_col=id_d,
+                                    id_ward_col=id_w,
+                                    province_col=p,
+                                    district_col=d,
+                                    ward_col=w,
+                                    suffix=suffix,
+                                    pool=pool,
+                                    stats=stats,
+                                    resolved=resolved_groups.get(suffix),
+                                    uniques=uniques)
+    return df
+
+
+# ------------------- XỬ LÝ DẠNG STREAM (THEO CHUNK) -------------------
+def _convert_stream_chunk(args):
+    """
+    Chuyển đổi trọn 1 chunk trong worker (giống handler xử lý cả file):
+    thêm statusState, xử lý mọi nhóm địa chỉ, gán id liên tục theo start_row.
+    Trả về (chunk_idx, start_row, cột, records, số dòng thành công, thống kê nhóm,
+    {nhóm: các bộ địa chỉ thô duy nhất của chunk – lấy lại từ bước mã hóa để matching,
+    dùng để đếm địa chỉ duy nhất trên cả file});
+    to_dict chạy luôn trong worker để process chính chỉ còn việc ghi ra sink.
+    """
+    chunk_idx, start_row, df, address_groups = args
+    if 'statusState' not in df.columns:
+        df.insert(len(df.columns), 'statusState', '')
+
+    stats, distinct = [], {}
+    df = process_df_groups(df, _get_worker_map_dict(), address_groups, pool=InlinePool(),
+                           stats=stats, uniques=distinct)
+    df.insert(0, 'id', np.arange(start_row + 1, start_row + len(df) + 1))
+    count_success = int((df['statusState'] == 'Thành công').sum())
+    return chunk_idx, start_row, df.columns.tolist(), df.to_dict(orient="records"), count_success, stats, distinct
+
+def _merge_columns(columns: List[str], new_columns: List[str]) -> None:
+    """
+    Gộp schema của 1 chunk vào danh sách cột chung (các chunk có thể khác nhau ở số cột option):
+    cột mới được đặt ngay sau cột đứng trước nó trong chunk → cùng thứ tự như khi xử lý cả file.
+    """
+    for i, col in enumerate(new_columns):
+        if col not in columns:
+            pos = columns.index(new_columns[i - 1]) + 1 if i else 0
+            columns.insert(pos, col)
+
+def _merge_stream_stats(stats: List[dict], chunk_stats: List[dict],
+                        distinct: Dict[str, set], chunk_distinct: Dict[str, set]) -> None:
+    """
+    Cộng dồn thống kê từng nhóm qua các chunk. Địa chỉ duy nhất đếm trên cả file: distinct giữ tập
+    bộ địa chỉ thô đã gặp của từng nhóm (kích thước theo số địa chỉ khác nhau, không theo số dòng)
+    → cùng kết quả như xử lý cả file, không phụ thuộc STREAM_CHUNK_ROWS.
+    """
+    by_group = {item["group"]: item for item in stats}
+    for item in chunk_stats:
+        total = by_group.get(item["group"])
+        if total is None:
+            total = {"group": item["group"], "total_rows": 0, "unique_addresses": 0, "unique_ratio": 0}
+            by_group[item["group"]] = total
+            stats.append(total)
+        seen = distinct.setdefault(item["group"], set())
+        seen.update(chunk_distinct.get(item["group"], ()))
+        total["total_rows"] += item["total_rows"]
+        total["unique_addresses"] = len(seen)
+        total["unique_ratio"] = round(total["unique_addresses"] / total["total_rows"], 4)
+
+def process_df_stream(chunks: Iterable[pd.DataFrame],
+                      map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]],
+                      address_groups: List[tuple],
+                      sink: Callable[[int, int, List[dict]], None],
+                      pool=None,
+                      max_inflight: int = None) -> dict:
+    """
+    Chuyển đổi file theo từng chunk DataFrame đọc dần (pd.read_csv(chunksize=...), ...):
+    chunk được đẩy lên pool ngay khi đọc xong, tối đa max_inflight chunk đang xử lý,
+    kết quả của từng chunk (đúng thứ tự) được ghi ra sink(chunk_idx, start_row, records) rồi bỏ đi.
+    Bộ nhớ vì vậy chỉ phụ thuộc kích thước chunk × max_inflight, không phụ thuộc kích thước file.
+    Trả về tổng hợp: total_rows, success_count, columns (gồm id), address_stats, row_chunks.
+    """
+    def chunk_args():
+        start_row = 0
+        for chunk_idx, chunk_df in enumerate(chunks):
+            yield chunk_idx, start_row, chunk_df, address_groups
+            start_row += len(chunk_df)
+
+    summary = {"total_rows": 0, "success_count": 0, "columns": [], "address_stats": [], "row_chunks": 0}
+    distinct = {}
+
+    def consume(results):
+        for chunk_idx, start_row, columns, records, count_success, stats, chunk_distinct in results:
+            _merge_columns(summary["columns"], columns)
+            _merge_stream_stats(summary["address_stats"], stats, distinct, chunk_distinct)
+            summary["total_rows"] += len(records)
+            summary["success_count"] += count_success
+            summary["row_chunks"] += 1
+            sink(chunk_idx, start_row, records)
+
+    if pool is None:
+        n_workers = Settings.TASK_MAX_WORKERS
+        with create_pool(n_workers, map_dict) as temp_pool:
+            consume(TaskPool(temp_pool, n_workers).imap(_convert_stream_chunk, chunk_args(), max_inflight))
+    else:
+        if not isinstance(pool, TaskPool):
+            pool = TaskPool(pool, pool._processes)
+        consume(pool.imap(_convert_stream_chunk, chunk_args(), max_inflight))
+    return summary
+
+def process_stream_batches(batches: Iterable[pd.DataFrame],
+                           map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]],
+                           address_groups: List[tuple],
+                           pool,
+                           sink: Callable[[int, int, List[dict]], None],
+                           file_label: str,
+                           empty_message: str):
+    """
+    Nhánh stream chung của các handler: handler chỉ cung cấp iterator batch DataFrame (reader của định dạng),
+    batch được chuyển đổi qua process_df_stream (tối đa STREAM_MAX_INFLIGHT_CHUNKS chunk đang xử lý).
+    Lỗi đọc / chuyển đổi hoặc file không có dòng nào → False,
+    còn lại → kết quả như nhánh đọc toàn bộ nhưng không có full_df mà có row_chunks (số chunk đã ghi ra sink).
+    """
+    try:
+        summary = process_df_stream(batches, map_dict, address_groups, sink,
+                                    pool=pool, max_inflight=Settings.STREAM_MAX_INFLIGHT_CHUNKS)
+    except Exception as e:
+        print(f"❌ Không thể đọc {file_label}: {e}")
+        return False
+
+    if summary["total_rows"] == 0:
+        print(f"❌ {empty_message}")
+        return False
+    print(f"📊 Đã xử lý {file_label} dạng stream: {summary['total_rows']} mẫu, {summary['row_chunks']} chunk")
+
+    return {
+        "success": True,
+        "columns": [col for col in summary["columns"] if col.lower() != "id"],
+        "total_rows": summary["total_rows"],
+        "success_count": summary["success_count"],
+        "fail_count": summary["total_rows"] - summary["success_count"],
+        "address_stats": summary["address_stats"],
+        "row_chunks": summary["row_chunks"],
+    }
@@ -1,13 +1,33 @@
 import pandas as pd
 import os
-from typing import Dict, Tuple, Optional, List
-from core.conversion.handlers.common.main_code import process_df_with_suffix
+from typing import Callable, Dict, Iterator, Tuple, Optional, List
+from config.settings import Settings
+from core.conversion.handlers.common.main_code import process_df_groups, process_stream_batches
+from core.conversion.utils.file_scan import sniff_encoding
+
+def address_dtypes(address_groups) -> Dict[str, type]:
+    """
+    Cột địa chỉ của các nhóm được đọc dạng chuỗi: read_csv suy kiểu theo dữ liệu đang đọc
+    (đọc theo chunk thì theo từng chunk) → cùng ô '1' có thể thành 1, 1.0 (chunk có ô trống) hay '1'
+    và được chuẩn hóa khác nhau. Đọc dạng chuỗi (ô trống vẫn là NaN) thì đọc toàn bộ và stream ra cùng kết quả.
+    """
+    return {col: str for cols in address_groups or [] for col in cols if col}
+
+def iter_csv_batches(input_file: str, batch_rows: int, dtype: Optional[dict] = None) -> Iterator[pd.DataFrame]:
+    """Đọc CSV theo chunk batch_rows dòng (pd.read_csv(chunksize=...)), mở file ngay lần lấy batch đầu tiên"""
+    with pd.read_csv(input_file, chunksize=batch_rows, encoding=sniff_encoding(input_file), dtype=dtype) as reader:
+        yield from reader
 
 def process_csv(input_file: str,
                 map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]], 
                 address_groups=None,
-                pool=None) -> bool:
-    """Xử lý CSV HOÀN CHỈNH (.csv) - DEBUG MAPPING CHI TIẾT"""
+                pool=None,
+                sink: Optional[Callable[[int, int, List[dict]], None]] = None) -> bool:
+    """
+    Xử lý CSV HOÀN CHỈNH (.csv) - DEBUG MAPPING CHI TIẾT
+    Có sink → xử lý dạng stream: đọc theo chunk, ghi kết quả từng chunk ra sink,
+    kết quả trả về không có full_df mà có row_chunks (số chunk đã ghi).
+    """
     
     # -------------------------------------------------
     # 1. KIỂM TRA FILE
@@ -15,13 +35,18 @@ def process_csv(input_file: str,
     if not os.path.exists(input_file):
         print(f"❌ File CSV không tồn tại: {input_file}")
         return False
+
+    if sink is not None:
+        batches = iter_csv_batches(input_file, Settings.STREAM_CHUNK_ROWS, address_dtypes(address_groups))
+        return process_stream_batches(batches, map_dict, address_groups, pool, sink,
+                                      "CSV", "File CSV rỗng hoặc không đọc được")
     
     # -------------------------------------------------
     # 2. ĐỌC CSV
     # -------------------------------------------------
     df = None
     try:
-        df = pd.read_csv(input_file)
+        df = pd.read_csv(input_file, encoding=sniff_encoding(input_file), dtype=address_dtypes(address_groups))
         print(f"📊 Đã đọc CSV: {len(df)} mẫu, {len(df.columns)} trường")
     except Exception as e:
         print(f"❌ Không thể đọc CSV: {e}")
@@ -37,17 +62,8 @@ def process_csv(input_file: str,
     # -------------------------------------------------
     # 3. XỬ LÝ DATAFRAME
     # -------------------------------------------------
-    for idx, (id_p, id_d, id_w, p, d, w) in enumerate(address_groups):
-        suffix = f"_group{idx+1}"
-        df = process_df_with_suffix(df, map_dict,
-                                    id_province_col=id_p, 
-                                    id_district_col=id_d, 
-                                    id_ward_col=id_w,
-                                    province_col=p, 
-                                    district_col=d, 
-                                    ward_col=w,
-                                    suffix=suffix, 
-                                    pool=pool)
+    address_stats = []
+    df = process_df_groups(df, map_dict, address_groups, pool=pool, stats=address_stats)
         
     count_success = (df['statusState'] == 'Thành công').sum()
     count_fail = len(df) - count_success
@@ -64,4 +80,5 @@ def process_csv(input_file: str,
         "total_rows": len(df),
         "success_count": int(count_success),
         "fail_count": int(count_fail),
-    }
\ No newline at end of file
+        "address_stats": address_stats,
+    }
@@ -1,20 +1,54 @@
 # core/conversion/handlers/excel_handler.py
 import pandas as pd
 import os
+from itertools import islice
 from pathlib import Path
 import openpyxl
-from typing import Dict, Tuple, Optional, List
-from core.conversion.handlers.common.main_code import process_df_with_suffix
+from typing import Callable, Dict, Iterator, Tuple, Optional, List
+from config.settings import Settings
+from core.conversion.handlers.common.main_code import process_df_groups, process_stream_batches
+
+
+def excel_header(header_row) -> List[str]:
+    """Tên cột từ dòng đầu của sheet (ô trống → col_i)"""
+    return [
+        str(cell) if cell is not None else f"col_{i}"
+        for i, cell in enumerate(header_row)
+    ]
+
+def iter_excel_batches(input_file: str, batch_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Đọc sheet đầu tiên ở chế độ read_only và trả dần từng DataFrame batch_rows dòng
+    (ô None → ''), không giữ toàn bộ dòng của file dưới dạng list Python.
+    Workbook được đóng khi đọc hết hoặc khi generator bị bỏ dở.
+    """
+    wb = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            return
+        header = excel_header(header_row)
+        while True:
+            batch = [['' if cell is None else cell for cell in row] for row in islice(rows, batch_rows)]
+            if not batch:
+                return
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        wb.close()
 
 
 def process_excel(input_file: str,
                   map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]], 
                   address_groups=None,
                   pool=None,
+                  sink: Optional[Callable[[int, int, List[dict]], None]] = None,
                 ) -> bool:
     """
     Xử lý file Excel (.xlsx, .xlsm, .xls) – **không chuẩn hóa dữ liệu**.
-    Đọc toàn bộ file bằng openpyxl (read_only + data_only) → tạo DataFrame → mapping → lưu.
+    Đọc file bằng openpyxl (read_only + data_only) theo từng batch dòng → DataFrame → mapping.
+    Có sink → xử lý dạng stream: từng batch được chuyển đổi và ghi ra sink,
+    kết quả trả về không có full_df mà có row_chunks.
     """
     # -------------------------------------------------
     # 0. KIỂM TRA CÁC TRƯỜNG ĐỊA CHỈ
@@ -31,48 +65,25 @@ def process_excel(input_file: str,
         print(f"File Excel không tồn tại: {input_file}")
         return False
 
+    if sink is not None:
+        return process_stream_batches(iter_excel_batches(p, Settings.STREAM_CHUNK_ROWS), map_dict, address_groups, pool, sink,
+                                      "Excel", "File Excel rỗng hoặc chỉ có header")
+
     # -------------------------------------------------
     # 2. ĐỌC EXCEL
     # -------------------------------------------------
-    wb = None
     try:
-        wb = openpyxl.load_workbook(p, read_only=True, data_only=True)
-        sheet = wb.active
-
-        if sheet.max_row <= 1:
-            print("File Excel rỗng hoặc chỉ có header")
-            wb.close()
-            return False
-
-        # ---- Header ----
-        header_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True))
-        header = [
-            str(cell) if cell is not None else f"col_{i}"
-            for i, cell in enumerate(header_row)
-        ]
-        
-        # ---- Dữ liệu  ----
-        data_rows = []
-        total_rows = sheet.max_row - 1
-        
-        for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-            clean_row = ['' if cell is None else cell for cell in row]
-            data_rows.append(clean_row)
-
+        batches = list(iter_excel_batches(p, Settings.STREAM_CHUNK_ROWS))
     except Exception as e:
         print(f"Lỗi đọc file Excel bằng openpyxl: {e}")
-        if wb:
-            wb.close()
         return False
-    finally:
-        if wb:
-            wb.close()
 
-    if not data_rows:
-        print("Không có dữ liệu để xử lý")
+    if not batches:
+        print("File Excel rỗng hoặc chỉ có header")
         return False
 
-    df = pd.DataFrame(data_rows, columns=header)
+    df = pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+    del batches
     print(f"📊 Đã đọc Excel: {len(df)} mẫu, {len(df.columns)} trường")
 
     if 'statusState' not in df.columns:
@@ -81,17 +92,8 @@ def process_excel(input_file: str,
     # -------------------------------------------------
     # 3. XỬ LÝ DATAFRAME
     # -------------------------------------------------
-    for idx, (id_p, id_d, id_w, p, d, w) in enumerate(address_groups):
-        suffix = f"_group{idx+1}"
-        df = process_df_with_suffix(df, map_dict,
-                                    id_province_col=id_p, 
-                                    id_district_col=id_d, 
-                                    id_ward_col=id_w,
-                                    province_col=p, 
-                                    district_col=d, 
-                                    ward_col=w,
-                                    suffix=suffix, 
-                                    pool=pool)
+    address_stats = []
+    df = process_df_groups(df, map_dict, address_groups, pool=pool, stats=address_stats)
         
     count_success = (df['statusState'] == 'Thành công').sum()
     count_fail = len(df) - count_success
@@ -108,4 +110,5 @@ def process_excel(input_file: str,
         "total_rows": len(df),
         "success_count": int(count_success),
         "fail_count": int(count_fail),
-    }
\ No newline at end of file
+        "address_stats": address_stats,
+    }
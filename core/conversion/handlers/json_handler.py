@@ -1,8 +1,24 @@
 import pandas as pd
+import io
 import os
 import json
 from typing import Dict, Tuple, Optional, List
-from core.conversion.handlers.common.main_code import process_df_with_suffix
+from core.conversion.handlers.common.main_code import process_df_groups
+from core.conversion.utils.parsed_cache import iter_parsed_cache
+
+def read_json_file(input_file: str) -> pd.DataFrame:
+    """
+    Đọc file .json 1 lần: mảng record (orient='records') hoặc JSON lines
+    (bỏ dòng trống và dòng chú thích //).
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+    if not content:
+        return pd.DataFrame()
+    if content.startswith('['):
+        return pd.read_json(io.StringIO(content), orient='records')
+    lines = [ln for ln in content.splitlines() if ln.strip() and not ln.strip().startswith('//')]
+    return pd.read_json(io.StringIO('\n'.join(lines)), orient='records', lines=True)
 
 def process_json(input_file: str,
                  map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]], 
@@ -22,7 +38,13 @@ def process_json(input_file: str,
     # -------------------------------------------------
     df = None
     try:
-        df = pd.read_json(input_file, orient='records')
+        # Đã parse lúc upload (get_file_info) thì đọc lại bản cache, không parse lần nữa
+        batches = iter_parsed_cache(input_file)
+        if batches is not None:
+            batch_list = list(batches)
+            df = pd.concat(batch_list, ignore_index=True) if batch_list else pd.DataFrame()
+        else:
+            df = read_json_file(input_file)
         print(f"📊 Đã đọc JSON: {len(df)} mẫu, {len(df.columns)} trường")
     except Exception as e:
         print(f"❌ Không thể đọc JSON: {e}")
@@ -38,17 +60,8 @@ def process_json(input_file: str,
     # -------------------------------------------------
     # 3. XỬ LÝ DATAFRAME
     # -------------------------------------------------
-    for idx, (id_p, id_d, id_w, p, d, w) in enumerate(address_groups):
-        suffix = f"_group{idx+1}"
-        df = process_df_with_suffix(df, map_dict,
-                                    id_province_col=id_p, 
-                                    id_district_col=id_d, 
-                                    id_ward_col=id_w,
-                                    province_col=p, 
-                                    district_col=d, 
-                                    ward_col=w,
-                                    suffix=suffix, 
-                                    pool=pool)
+    address_stats = []
+    df = process_df_groups(df, map_dict, address_groups, pool=pool, stats=address_stats)
     
     count_success = (df['statusState'] == 'Thành công').sum()
     count_fail = len(df) - count_success
@@ -65,4 +78,5 @@ def process_json(input_file: str,
         "total_rows": len(df),
         "success_count": int(count_success),
         "fail_count": int(count_fail),
+        "address_stats": address_stats,
     }
\ No newline at end of file
@@ -0,0 +1,152 @@
+# core/conversion/handlers/parquet_handler.py
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Callable, Dict, Iterator, Tuple, Optional, List
+from config.settings import Settings
+from core.conversion.handlers.common.main_code import process_df_groups, process_stream_batches
+from core.conversion.utils.row_blob import dictionary_encode_repetitive
+
+PARQUET_EXTENSIONS = ('.parquet',)
+ARROW_EXTENSIONS = ('.feather', '.arrow', '.ipc')
+COLUMNAR_EXTENSIONS = PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+def _open_arrow_ipc(input_file: str):
+    """Reader Arrow IPC: dạng file (Feather v2, có footer, đọc ngẫu nhiên) hoặc dạng stream"""
+    source = pa.memory_map(str(input_file), 'r')
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+def _iter_record_batches(input_file: str, batch_rows: int) -> Iterator[pa.RecordBatch]:
+    ext = os.path.splitext(str(input_file))[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        # Đọc dần theo row group, mỗi lần tối đa batch_rows dòng
+        yield from pq.ParquetFile(input_file).iter_batches(batch_size=batch_rows)
+        return
+
+    reader = _open_arrow_ipc(input_file)
+    if isinstance(reader, pa.ipc.RecordBatchFileReader):
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        batches = reader
+    for batch in batches:
+        for offset in range(0, batch.num_rows, batch_rows):
+            yield batch.slice(offset, batch_rows)
+
+def _batch_to_frame(batch: pa.RecordBatch) -> pd.DataFrame:
+    """RecordBatch → DataFrame; cột dictionary (category) trả về object để pipeline ghi đè giá trị được"""
+    df = batch.to_pandas()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    return df
+
+def iter_columnar_batches(input_file: str, batch_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Đọc Parquet (theo row group) hoặc Arrow IPC / Feather (theo record batch)
+    và trả dần từng DataFrame tối đa batch_rows dòng.
+    """
+    for batch in _iter_record_batches(input_file, batch_rows):
+        if batch.num_rows:
+            yield _batch_to_frame(batch)
+
+def columnar_row_count(input_file: str) -> int:
+    """Số dòng lấy từ metadata (Parquet footer / độ dài các record batch), không đọc dữ liệu"""
+    ext = os.path.splitext(str(input_file))[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        return pq.ParquetFile(input_file).metadata.num_rows
+
+    reader = _open_arrow_ipc(input_file)
+    if isinstance(reader, pa.ipc.RecordBatchFileReader):
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    return sum(batch.num_rows for batch in reader)
+
+def dataframe_to_arrow(df: pd.DataFrame) -> pa.Table:
+    """
+    DataFrame → Arrow Table để ghi Parquet / Feather:
+      - Cột object lẫn kiểu (vd số và '' từ Excel) không chuyển thẳng được → ghi dạng chuỗi (NaN/None → null).
+      - Cột chuỗi lặp nhiều (địa chỉ, statusState) → dictionary encode.
+    """
+    arrays = []
+    for col in df.columns:
+        series = df[col]
+        try:
+            arr = pa.array(series, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arr = pa.array(
+                [None if pd.isna(v) else str(v) for v in series],
+                type=pa.string()
+            )
+        arrays.append(dictionary_encode_repetitive(arr))
+    return pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+
+def process_parquet(input_file: str,
+                    map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]],
+                    address_groups=None,
+                    pool=None,
+                    sink: Optional[Callable[[int, int, List[dict]], None]] = None) -> bool:
+    """
+    Xử lý file dạng cột: Parquet (.parquet) và Arrow IPC / Feather (.feather, .arrow, .ipc).
+    Đọc theo row group / record batch → DataFrame → mapping.
+    Có sink → xử lý dạng stream: từng batch được chuyển đổi và ghi ra sink,
+    kết quả trả về không có full_df mà có row_chunks.
+    """
+
+    # -------------------------------------------------
+    # 1. KIỂM TRA FILE
+    # -------------------------------------------------
+    if not os.path.exists(input_file):
+        print(f"❌ File Parquet/Arrow không tồn tại: {input_file}")
+        return False
+
+    if sink is not None:
+        return process_stream_batches(iter_columnar_batches(input_file, Settings.STREAM_CHUNK_ROWS), map_dict, address_groups, pool, sink,
+                                      "Parquet/Arrow", "File Parquet/Arrow rỗng")
+
+    # -------------------------------------------------
+    # 2. ĐỌC PARQUET / ARROW
+    # -------------------------------------------------
+    try:
+        batches = list(iter_columnar_batches(input_file, Settings.STREAM_CHUNK_ROWS))
+    except Exception as e:
+        print(f"❌ Không thể đọc Parquet/Arrow: {e}")
+        return False
+
+    if not batches:
+        print("❌ File Parquet/Arrow rỗng")
+        return False
+
+    df = pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+    del batches
+    print(f"📊 Đã đọc Parquet/Arrow: {len(df)} mẫu, {len(df.columns)} trường")
+
+    if 'statusState' not in df.columns:
+        df.insert(len(df.columns), 'statusState', '')
+
+    # -------------------------------------------------
+    # 3. XỬ LÝ DATAFRAME
+    # -------------------------------------------------
+    address_stats = []
+    df = process_df_groups(df, map_dict, address_groups, pool=pool, stats=address_stats)
+
+    count_success = (df['statusState'] == 'Thành công').sum()
+    count_fail = len(df) - count_success
+
+    df.insert(0, 'id', df.index + 1)
+
+    original_columns = df.columns.tolist()
+    final_columns_order = [col for col in original_columns if col.lower() != "id"]
+
+    return {
+        "success": True,
+        "full_df": df[original_columns].to_dict(orient="records"),
+        "columns": final_columns_order,
+        "total_rows": len(df),
+        "success_count": int(count_success),
+        "fail_count": int(count_fail),
+        "address_stats": address_stats,
+    }
@@ -1,8 +1,148 @@
 import pandas as pd
 import os
 import re
-from typing import Dict, Tuple, Optional, List
-from core.conversion.handlers.common.main_code import process_df_with_suffix
+from typing import Callable, Dict, Iterator, Tuple, Optional, List
+from config.settings import Settings
+from core.conversion.handlers.common.main_code import process_df_groups, process_stream_batches
+from core.conversion.utils.parsed_cache import iter_parsed_cache
+
+# ---- Tokenizer SQL INSERT dạng stream ----
+# Chuỗi '...' (escape kiểu MySQL \x và '') – dùng lượng từ possessive nên thời gian tuyến tính, không backtrack
+_SQL_STRING = r"'(?:[^'\\]++|\\.|'')*+'"
+_SQL_GAP = r"(?:\s++|--[^\n]*+\n|/\*.*?\*/)*+"
+
+# Ngoài câu INSERT: bỏ qua chú thích / chuỗi của câu lệnh khác, tìm đầu câu INSERT tiếp theo.
+# Chú thích / chuỗi chưa đóng khớp tới cuối buffer (\Z) để biết cần đọc thêm.
+_SQL_SKIP_RE = re.compile(
+    r"--[^\n]*+(?:\n|\Z)|#[^\n]*+(?:\n|\Z)|/\*.*?(?:\*/|\Z)"
+    r"|'(?:[^'\\]++|\\.|'')*+(?:'|\Z)|\"(?:[^\"\\]++|\\.)*+(?:\"|\Z)"
+    r"|(INSERT\s+INTO\s+`?((?:[\w-]+)(?:\.(?:[\w-]+))?)`?\s*\(([\w\s`,]+)\)\s*VALUES\s*)",
+    re.IGNORECASE | re.DOTALL,
+)
+# 1 dòng giá trị (...) kèm dấu phân cách phía sau (',' = còn dòng, ';' = hết câu INSERT)
+_SQL_ROW_RE = re.compile(
+    _SQL_GAP
+    + r"\(((?:[^'()]++|" + _SQL_STRING + r"|\((?:[^'()]++|" + _SQL_STRING + r")*+\))*+)\)"
+    + _SQL_GAP + r"([,;]?)",
+    re.DOTALL,
+)
+# 1 giá trị trong dòng (nội dung dòng được nối thêm ',' để giá trị cuối cũng có dấu phân cách)
+_SQL_VALUE_RE = re.compile(r"\s*+(" + _SQL_STRING + r"|[^,']*?)\s*,", re.DOTALL)
+_SQL_ESCAPE_RE = re.compile(r"\\(.)|''", re.DOTALL)
+_SQL_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+def _sql_unescape(match) -> str:
+    char = match.group(1)
+    if char is None:
+        return "'"
+    return _SQL_ESCAPES.get(char, char)
+
+def _sql_value(token: str):
+    """Giá trị SQL thô → None / chuỗi (đã bỏ escape) / số; không đổi được thì giữ nguyên chuỗi"""
+    if token[:1] == "'":
+        value = token[1:-1]
+        if '\\' in value or "''" in value:
+            value = _SQL_ESCAPE_RE.sub(_sql_unescape, value)
+        return value
+    if token.upper() == 'NULL':
+        return None
+    try:
+        # Thử chuyển đổi sang float/int cho các giá trị số
+        return float(token) if '.' in token else int(token)
+    except ValueError:
+        return token
+
+class SqlInsertReader:
+    """
+    Đọc file .sql theo từng block và trả dần các DataFrame batch_rows dòng
+    lấy từ các câu INSERT INTO <bảng> (<cột>) VALUES (...), (...);
+    Một lượt duy nhất, xử lý đúng chuỗi có dấu phẩy / ngoặc / ; / escape, chú thích và NULL.
+    table_name, columns được gán khi gặp câu INSERT đầu tiên; debug_lines chứa các dòng bị bỏ qua.
+    Gặp INSERT vào bảng khác thì raise ValueError.
+    """
+    # Dòng không khớp mà phần còn lại của buffer đã dài hơn mức này thì coi là dòng lỗi (không đọc thêm)
+    MAX_ROW_CHARS = 16 << 20
+
+    def __init__(self, file_path: str, batch_rows: int = 20000, block_size: int = 1 << 20):
+        self.file_path = file_path
+        self.batch_rows = batch_rows
+        self.block_size = block_size
+        self.table_name: Optional[str] = None
+        self.columns: Optional[list] = None
+        self.debug_lines: List[str] = []
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        rows = []
+        for row in self._iter_rows():
+            rows.append(row)
+            if len(rows) >= self.batch_rows:
+                yield pd.DataFrame(rows, columns=self.columns)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows, columns=self.columns)
+
+    def _iter_rows(self) -> Iterator[list]:
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            buf, pos, eof = '', 0, False
+            in_values = False
+
+            while True:
+                if in_values:
+                    match = _SQL_ROW_RE.match(buf, pos)
+                    # Dòng / dấu phân cách có thể bị cắt ở cuối block → đọc thêm rồi khớp lại
+                    if not eof and (match is None and len(buf) - pos < self.MAX_ROW_CHARS
+                                    or match is not None and (match.end() == len(buf)
+                                                              or not match.group(2) and len(buf) - match.end() < 4096)):
+                        block = f.read(self.block_size)
+                        buf, pos, eof = buf[pos:] + block, 0, not block
+                        continue
+                    if match is None:
+                        if pos < len(buf) and buf[pos:].strip():
+                            self._skip_row(buf[pos:pos + 100])
+                            pos += 1
+                        in_values = False
+                        continue
+
+                    pos = match.end()
+                    row = [_sql_value(token) for token in _SQL_VALUE_RE.findall(match.group(1) + ',')]
+                    if len(row) == len(self.columns):
+                        yield row
+                    else:
+                        self._skip_row(match.group(0).strip()[:100], len(row))
+                    if match.group(2) != ',':
+                        in_values = False
+                else:
+                    match = _SQL_SKIP_RE.search(buf, pos)
+                    if not eof and (match is None or match.end() == len(buf)):
+                        # Giữ lại phần cuối buffer phòng khi đầu câu INSERT bị cắt ngang giữa 2 block
+                        keep_from = match.start() if match else max(pos, len(buf) - 65536)
+                        block = f.read(self.block_size)
+                        buf, pos, eof = buf[keep_from:] + block, 0, not block
+                        continue
+                    if match is None:
+                        return
+
+                    pos = match.end()
+                    if match.group(1):
+                        self._start_insert(match.group(2), match.group(3))
+                        in_values = True
+
+    def _start_insert(self, table_name: str, columns_str: str) -> None:
+        # Đảm bảo tên bảng nhất quán
+        if self.table_name is None:
+            self.table_name = table_name
+            # Các cột lấy từ câu INSERT đầu tiên (giả sử tất cả các INSERT đều có cùng một cột)
+            self.columns = [col.strip().strip('`') for col in columns_str.split(',')]
+        elif self.table_name != table_name:
+            raise ValueError(f"Tìm thấy nhiều bảng khác nhau: {self.table_name} và {table_name}")
+
+    def _skip_row(self, raw: str, n_values: int = None) -> None:
+        if n_values is None:
+            self.debug_lines.append(f"-- Bỏ qua dòng không phân tích được: ({raw})")
+            print(f"⚠️ Bỏ qua dòng không phân tích được: {raw}")
+        else:
+            self.debug_lines.append(f"-- Bỏ qua dòng không khớp số cột ({n_values} cột, cần {len(self.columns)}): ({raw})")
+            print(f"⚠️ Bỏ qua dòng không khớp số cột ({n_values} cột, cần {len(self.columns)}): {raw}")
 
 def parse_sql_inserts(file_path: str) -> Tuple[Optional[pd.DataFrame], Optional[str], Optional[list], List[str]]:
     """
@@ -10,113 +150,34 @@ def parse_sql_inserts(file_path: str) -> Tuple[Optional[pd.DataFrame], Optional[
     Xử lý nhiều câu lệnh INSERT hoặc một lệnh INSERT duy nhất với nhiều hàng giá trị.
     Trả về (DataFrame, table_name, column_names, debug_lines) hoặc (None, None, None, []) nếu phân tích cú pháp không thành công.
     debug_lines chứa văn bản thô của các hàng không thể phân tích cú pháp để gỡ lỗi.
+    (Đọc qua SqlInsertReader rồi gộp các batch; xử lý theo chunk thì dùng thẳng SqlInsertReader.)
     """
-    debug_lines = []
+    reader = SqlInsertReader(file_path, batch_rows=Settings.STREAM_CHUNK_ROWS)
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            sql_content = f.read()
-        
-        # Chuẩn hóa khoảng trắng và xóa chú thích
-        sql_content = re.sub(r'--.*?\n|/\*.*?\*/', '', sql_content, flags=re.DOTALL)
-        sql_content = re.sub(r'\s+', ' ', sql_content.strip())
-        
-        # Tìm tất cả các câu lệnh INSERT với regex được cải thiện để xử lý dấu chấm phẩy trong các giá trị
-        insert_pattern = r'INSERT INTO\s+`?((?:[\w-]+)(?:\.(?:[\w-]+))?)`?\s*\(([\w\s`,]+)\)\s*VALUES\s*((?:\(.*?\)(?:,\s*\(.*?\))*));'
-        
-        matches = re.findall(insert_pattern, sql_content, re.IGNORECASE | re.DOTALL)
-        
-        if not matches:
-            debug_lines.append("-- Không tìm thấy câu lệnh INSERT hợp lệ trong file SQL")
-            print("❌ Không tìm thấy câu lệnh INSERT hợp lệ trong file SQL")
-            return None, None, None, debug_lines
-        
-        all_values = []
-        table_name = None
-        columns = None
-        
-        for match in matches:
-            current_table_name, columns_str, values_str = match
-            
-            # Đảm bảo tên bảng nhất quán
-            if table_name is None:
-                table_name = current_table_name
-            elif table_name != current_table_name:
-                debug_lines.append(f"-- Lỗi: Tìm thấy nhiều bảng khác nhau: {table_name} và {current_table_name}")
-                print(f"❌ Tìm thấy nhiều bảng khác nhau: {table_name} và {current_table_name}")
-                return None, None, None, debug_lines
-            
-           # Phân tích cú pháp các cột (chỉ một lần, giả sử tất cả các INSERT đều có cùng một cột)
-            if columns is None:
-                columns = [col.strip().strip('`') for col in columns_str.split(',')]
-            
-            # Phân tích giá trị
-            values_str = values_str.strip()
-            value_rows = []
-            current_row = []
-            current_value = ''
-            in_quotes = False
-            i = 0
-            
-            while i < len(values_str):
-                char = values_str[i]
-                
-                if char == "'" and (i == 0 or values_str[i-1] != '\\'):
-                    in_quotes = not in_quotes
-                    current_value += char
-                elif char == ',' and not in_quotes:
-                    val = current_value.strip()
-                    if val.lower() == 'null':
-                        current_row.append(None)
-                    elif val.startswith("'") and val.endswith("'"):
-                        current_row.append(val[1:-1])
-                    else:
-                        try:
-                            # Thử chuyển đổi sang float/int cho các giá trị số
-                            current_row.append(float(val) if '.' in val else int(val))
-                        except ValueError:
-                            current_row.append(val)
-                    current_value = ''
-                elif char == '(' and not in_quotes:
-                    current_value = ''
-                    current_row = []
-                elif char == ')' and not in_quotes:
-                    val = current_value.strip()
-                    if val.lower() == 'null':
-                        current_row.append(None)
-                    elif val.startswith("'") and val.endswith("'"):
-                        current_row.append(val[1:-1])
-                    else:
-                        try:
-                            current_row.append(float(val) if '.' in val else int(val))
-                        except ValueError:
-                            current_row.append(val)
-                    if len(current_row) == len(columns):
-                        value_rows.append(current_row)
-                    else:
-                        debug_lines.append(f"-- Bỏ qua dòng không khớp số cột ({len(current_row)} cột, cần {len(columns)}): ({values_str[max(0, i-50):i+50]})")
-                        print(f"⚠️ Bỏ qua dòng không khớp số cột ({len(current_row)} cột, cần {len(columns)}): {current_row}")
-                    current_value = ''
-                    current_row = []
-                else:
-                    current_value += char
-                i += 1
-            
-            all_values.extend(value_rows)
-        
-        if not all_values:
-            debug_lines.append("-- Không thể phân tích dữ liệu từ câu lệnh INSERT")
-            print("❌ Không thể phân tích dữ liệu từ câu lệnh INSERT")
-            return None, None, None, debug_lines
-        
-        # Tạo DataFrame
-        df = pd.DataFrame(all_values, columns=columns)
-        print(f"📊 Đã đọc SQL: {len(df)} mẫu, {len(df.columns)} trường")
-        return df, table_name, columns, debug_lines
-    
+        batches = list(reader)
+    except ValueError as e:
+        reader.debug_lines.append(f"-- Lỗi: {e}")
+        print(f"❌ {e}")
+        return None, None, None, reader.debug_lines
     except Exception as e:
-        debug_lines.append(f"-- Lỗi đọc file SQL: {str(e)}")
+        reader.debug_lines.append(f"-- Lỗi đọc file SQL: {str(e)}")
         print(f"❌ Không thể đọc SQL: {e}")
-        return None, None, None, debug_lines
+        return None, None, None, reader.debug_lines
+
+    if reader.table_name is None:
+        reader.debug_lines.append("-- Không tìm thấy câu lệnh INSERT hợp lệ trong file SQL")
+        print("❌ Không tìm thấy câu lệnh INSERT hợp lệ trong file SQL")
+        return None, None, None, reader.debug_lines
+
+    if not batches:
+        reader.debug_lines.append("-- Không thể phân tích dữ liệu từ câu lệnh INSERT")
+        print("❌ Không thể phân tích dữ liệu từ câu lệnh INSERT")
+        return None, None, None, reader.debug_lines
+
+    # Tạo DataFrame
+    df = pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+    print(f"📊 Đã đọc SQL: {len(df)} mẫu, {len(df.columns)} trường")
+    return df, reader.table_name, reader.columns, reader.debug_lines
 
 def generate_sql_inserts(df: pd.DataFrame, table_name: str, columns: list) -> str:
     """
@@ -137,8 +198,13 @@ def generate_sql_inserts(df: pd.DataFrame, table_name: str, columns: list) -> st
 def process_sql(input_file: str, 
                 map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]], 
                 address_groups=None,
-                pool=None) -> bool:
-    """Xử lý SQL HOÀN CHỈNH (.sql) - DEBUG MAPPING CHI TIẾT"""
+                pool=None,
+                sink: Optional[Callable[[int, int, List[dict]], None]] = None) -> bool:
+    """
+    Xử lý SQL HOÀN CHỈNH (.sql) - DEBUG MAPPING CHI TIẾT
+    Có sink → xử lý dạng stream: các batch của SqlInsertReader được chuyển đổi và ghi ra sink,
+    kết quả trả về không có full_df mà có row_chunks.
+    """
     
     # -------------------------------------------------
     # 1. KIỂM TRA FILE
@@ -146,14 +212,31 @@ def process_sql(input_file: str,
     if not os.path.exists(input_file):
         print(f"❌ File SQL không tồn tại: {input_file}")
         return False
+
+    if sink is not None:
+        # Lấy batch từ cache đã parse lúc upload nếu có, không thì tokenize file .sql theo block
+        batches = iter_parsed_cache(input_file)
+        if batches is None:
+            batches = SqlInsertReader(input_file, batch_rows=Settings.STREAM_CHUNK_ROWS)
+        return process_stream_batches(batches, map_dict, address_groups, pool, sink,
+                                      "SQL", "File SQL rỗng hoặc không đọc được")
     
     # -------------------------------------------------
     # 2. ĐỌC SQL
     # -------------------------------------------------
-    df, table_name, original_columns, debug_lines = parse_sql_inserts(input_file)
+    # Đã parse lúc upload (get_file_info) thì đọc lại bản cache, không parse lần nữa
+    batches = iter_parsed_cache(input_file)
+    if batches is not None:
+        batch_list = list(batches)
+        df = pd.concat(batch_list, ignore_index=True) if batch_list else None
+        del batch_list
+    else:
+        df, table_name, original_columns, debug_lines = parse_sql_inserts(input_file)
+    address_stats = []
     
-    if df is None or table_name is None or original_columns is None or len(df) == 0:
+    if df is None or len(df) == 0:
         print("❌ File SQL rỗng hoặc không đọc được")
+        return False
     else:
         if 'statusState' not in df.columns:
             df.insert(len(df.columns), 'statusState', '')
@@ -161,17 +244,7 @@ def process_sql(input_file: str,
         # -------------------------------------------------
         # 3. XỬ LÝ DATAFRAME
         # -------------------------------------------------
-        for idx, (id_p, id_d, id_w, p, d, w) in enumerate(address_groups):
-            suffix = f"_group{idx+1}"
-            df = process_df_with_suffix(df, map_dict,
-                                        id_province_col=id_p, 
-                                        id_district_col=id_d, 
-                                        id_ward_col=id_w,
-                                        province_col=p, 
-                                        district_col=d, 
-                                        ward_col=w,
-                                        suffix=suffix, 
-                                        pool=pool)
+        df = process_df_groups(df, map_dict, address_groups, pool=pool, stats=address_stats)
 
     count_success = (df['statusState'] == 'Thành công').sum()
     count_fail = len(df) - count_success
@@ -188,4 +261,5 @@ def process_sql(input_file: str,
         "total_rows": len(df),
         "success_count": int(count_success),
         "fail_count": int(count_fail),
-    }
\ No newline at end of file
+        "address_stats": address_stats,
+    }
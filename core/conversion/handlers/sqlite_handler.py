@@ -0,0 +1,146 @@
+# core/conversion/handlers/sqlite_handler.py
+import os
+import sqlite3
+import pandas as pd
+from typing import Callable, Dict, Iterator, Tuple, Optional, List
+from config.settings import Settings
+from core.conversion.handlers.common.main_code import process_df_groups, process_stream_batches
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+# Số dòng mỗi lần executemany khi ghi file SQLite kết quả
+SQLITE_WRITE_BATCH_ROWS = 5000
+
+def quote_identifier(name) -> str:
+    """Tên bảng / cột trong câu lệnh SQLite (đặt trong "", nhân đôi " bên trong)"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def sqlite_first_table(conn: sqlite3.Connection) -> Optional[str]:
+    """Bảng dữ liệu đầu tiên của file (bỏ qua bảng nội bộ sqlite_*), None nếu không có"""
+    row = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' LIMIT 1"
+    ).fetchone()
+    return row[0] if row else None
+
+def iter_sqlite_batches(input_file: str, batch_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Đọc bảng đầu tiên (mở read-only) bằng cursor.fetchmany và trả dần từng DataFrame batch_rows dòng,
+    không nạp cả bảng vào bộ nhớ. Kết nối được đóng khi đọc hết hoặc khi generator bị bỏ dở.
+    """
+    conn = sqlite3.connect(f"file:{input_file}?mode=ro", uri=True)
+    try:
+        table = sqlite_first_table(conn)
+        if table is None:
+            return
+        cur = conn.execute(f"SELECT * FROM {quote_identifier(table)}")
+        columns = [d[0] for d in cur.description]
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                return
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        conn.close()
+
+def write_sqlite_rows(output_file: str, table_name: str, columns: list, rows) -> int:
+    """
+    Ghi các dòng (iterable các tuple theo thứ tự columns) vào bảng table_name của file SQLite:
+    tạo lại bảng rồi executemany theo lô SQLITE_WRITE_BATCH_ROWS dòng, tất cả trong 1 transaction.
+    Trả về số dòng đã ghi.
+    """
+    insert_sql = (
+        f"INSERT INTO {quote_identifier(table_name)} "
+        f"({', '.join(quote_identifier(c) for c in columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    written = 0
+    conn = sqlite3.connect(output_file)
+    try:
+        # File kết quả mới tạo: không cần journal / fsync từng trang
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {quote_identifier(table_name)}")
+            conn.execute(
+                f"CREATE TABLE {quote_identifier(table_name)} "
+                f"({', '.join(quote_identifier(c) for c in columns)})"
+            )
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= SQLITE_WRITE_BATCH_ROWS:
+                    conn.executemany(insert_sql, batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany(insert_sql, batch)
+                written += len(batch)
+    finally:
+        conn.close()
+    return written
+
+def process_sqlite(input_file: str,
+                   map_dict: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]],
+                   address_groups=None,
+                   pool=None,
+                   sink: Optional[Callable[[int, int, List[dict]], None]] = None) -> bool:
+    """
+    Xử lý file SQLite (.db, .sqlite, .sqlite3): bảng đầu tiên, đọc theo lô fetchmany → DataFrame → mapping.
+    Có sink → xử lý dạng stream: từng lô được chuyển đổi và ghi ra sink,
+    kết quả trả về không có full_df mà có row_chunks.
+    """
+
+    # -------------------------------------------------
+    # 1. KIỂM TRA FILE
+    # -------------------------------------------------
+    if not os.path.exists(input_file):
+        print(f"❌ File SQLite không tồn tại: {input_file}")
+        return False
+
+    if sink is not None:
+        return process_stream_batches(iter_sqlite_batches(input_file, Settings.STREAM_CHUNK_ROWS), map_dict, address_groups, pool, sink,
+                                      "SQLite", "File SQLite rỗng hoặc không có bảng")
+
+    # -------------------------------------------------
+    # 2. ĐỌC SQLITE
+    # -------------------------------------------------
+    try:
+        batches = list(iter_sqlite_batches(input_file, Settings.STREAM_CHUNK_ROWS))
+    except Exception as e:
+        print(f"❌ Không thể đọc SQLite: {e}")
+        return False
+
+    if not batches:
+        print("❌ File SQLite rỗng hoặc không có bảng")
+        return False
+
+    df = pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+    del batches
+    print(f"📊 Đã đọc SQLite: {len(df)} mẫu, {len(df.columns)} trường")
+
+    if 'statusState' not in df.columns:
+        df.insert(len(df.columns), 'statusState', '')
+
+    # -------------------------------------------------
+    # 3. XỬ LÝ DATAFRAME
+    # -------------------------------------------------
+    address_stats = []
+    df = process_df_groups(df, map_dict, address_groups, pool=pool, stats=address_stats)
+
+    count_success = (df['statusState'] == 'Thành công').sum()
+    count_fail = len(df) - count_success
+
+    df.insert(0, 'id', df.index + 1)
+
+    original_columns = df.columns.tolist()
+    final_columns_order = [col for col in original_columns if col.lower() != "id"]
+
+    return {
+        "success": True,
+        "full_df": df[original_columns].to_dict(orient="records"),
+        "columns": final_columns_order,
+        "total_rows": len(df),
+        "success_count": int(count_success),
+        "fail_count": int(count_fail),
+        "address_stats": address_stats,
+    }
@@ -1,9 +1,17 @@
 # load_file/file_info.py  
-import os, json, sqlite3, openpyxl, pandas as pd
+import os, sqlite3, openpyxl, pandas as pd
+from itertools import islice
 from pathlib import Path
 
-# === IMPORT parse_sql_inserts từ sql_handler ===
-from core.conversion.handlers.sql_handler import parse_sql_inserts  
+# === IMPORT reader của các handler: parse 1 lần lúc upload, handler dùng lại bản cache ===
+from config.settings import Settings
+from core.conversion.handlers.sql_handler import SqlInsertReader
+from core.conversion.handlers.json_handler import read_json_file
+from core.conversion.handlers.excel_handler import excel_header
+from core.conversion.handlers.sqlite_handler import SQLITE_EXTENSIONS, sqlite_first_table, quote_identifier
+from core.conversion.handlers.parquet_handler import COLUMNAR_EXTENSIONS, columnar_row_count, iter_columnar_batches
+from core.conversion.utils.parsed_cache import write_parsed_cache
+from core.conversion.utils.file_scan import count_csv_rows, sniff_encoding
 
 def get_sample_rows(total_row: int) -> int:
     """
@@ -20,6 +28,33 @@ def get_sample_rows(total_row: int) -> int:
 
     return sample_rows
 
+def read_excel_info(p: Path) -> dict:
+    """
+    Mở workbook 1 lần duy nhất (read_only) để lấy header, số dòng và dòng mẫu.
+    Số dòng lấy từ kích thước sheet; file không ghi kích thước thì đếm khi duyệt
+    (vẫn trong cùng 1 lượt, giữ tối đa 500 dòng đầu làm mẫu).
+    """
+    wb = openpyxl.load_workbook(p, read_only=True, data_only=True)
+    try:
+        sheet = wb.active
+        rows = sheet.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            return {"rows": 0, "sample_df": None}
+
+        header = excel_header(header_row)
+        if sheet.max_row is not None:
+            total_row = sheet.max_row - 1
+            data_rows = list(islice(rows, get_sample_rows(total_row) if total_row > 0 else 0))
+        else:
+            data_rows = list(islice(rows, 500))
+            total_row = len(data_rows) + sum(1 for _ in rows)
+            data_rows = data_rows[:get_sample_rows(total_row)]
+        sample_df = pd.DataFrame(data_rows, columns=header) if total_row > 0 else None
+        return {"rows": total_row, "sample_df": sample_df}
+    finally:
+        wb.close()
+
 def get_file_info(path: str):
     p = Path(path)
     if not p.exists():
@@ -30,34 +65,34 @@ def get_file_info(path: str):
     result = {"rows": 0, "cols": 0, "names": [], "mb": mb, "sample_df": None, "error": None}
 
     # ==================== ĐẾM DÒNG (RIÊNG) ====================
+    excel_info = None
+    parsed_head = None  # .sql / .json: các dòng đầu của bản parse duy nhất (đã ghi cache cho bước chuyển đổi)
     if result["error"] is None:
         try:
             if ext in {'.xlsx', '.xls'}:
-                wb = openpyxl.load_workbook(p, read_only=True)
-                result["rows"] = wb.active.max_row - 1
-                wb.close()
+                # Header + số dòng + mẫu trong 1 lần mở workbook
+                excel_info = read_excel_info(p)
+                result["rows"] = excel_info["rows"]
             elif ext == '.csv':
-                with open(p, 'r', encoding='utf-8-sig') as f:
-                    result["rows"] = sum(1 for _ in f) - 1
+                # Đếm theo block nhị phân, bỏ qua xuống dòng trong field có ngoặc kép
+                result["rows"] = count_csv_rows(p)
             elif ext == '.json':
-                with open(p, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    if content.startswith('['):
-                        result["rows"] = len(json.loads(content))
-                    else:
-                        result["rows"] = sum(1 for ln in f if ln.strip() and not ln.strip().startswith('//'))
-            elif ext in {'.db', '.sqlite', '.sqlite3'}:
+                # === PARSE 1 LẦN, GHI CACHE CHO handler, LẤY SỐ DÒNG + MẪU ===
+                result["rows"], parsed_head = write_parsed_cache(p, [read_json_file(str(p))])
+            elif ext in SQLITE_EXTENSIONS:
+                # Cùng bảng mà sqlite_handler sẽ chuyển đổi
                 conn = sqlite3.connect(f"file:{p}?mode=ro", uri=True)
-                cur = conn.cursor()
-                cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' LIMIT 1")
-                table = cur.fetchone()
+                table = sqlite_first_table(conn)
                 if table:
-                    result["rows"] = cur.execute(f"SELECT COUNT(*) FROM `{table[0]}`").fetchone()[0]
+                    result["rows"] = conn.execute(f"SELECT COUNT(*) FROM {quote_identifier(table)}").fetchone()[0]
                 conn.close()
+            elif ext in COLUMNAR_EXTENSIONS:
+                # Parquet / Arrow: số dòng có sẵn trong metadata
+                result["rows"] = columnar_row_count(p)
             elif ext == '.sql':
-                # === DÙNG parse_sql_inserts ĐỂ ĐẾM DÒNG TRONG .sql ===
-                df_temp, _, _, _ = parse_sql_inserts(str(p))
-                result["rows"] = len(df_temp) if df_temp is not None else 0
+                # === TOKENIZE 1 LẦN, GHI CACHE CHO handler, LẤY SỐ DÒNG + MẪU ===
+                reader = SqlInsertReader(str(p), batch_rows=Settings.STREAM_CHUNK_ROWS)
+                result["rows"], parsed_head = write_parsed_cache(p, reader)
         except Exception as e:
             result["rows"] = -1
             result["error"] = result["error"] or f"Count error: {e}"
@@ -69,62 +104,51 @@ def get_file_info(path: str):
     df_sample = None
     try:
         if ext in {'.xlsx', '.xls'}:
-            wb = openpyxl.load_workbook(p, read_only=True, data_only=True)
-            sheet = wb.active
-            if sheet.max_row <= 1:
+            if excel_info is None:
+                pass  # lỗi mở file đã ghi ở bước đếm dòng
+            elif excel_info["rows"] <= 0:
                 result["error"] = "Excel trống hoặc chỉ có header"
             else:
-                header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True))
-                header = [str(h) if h is not None else f"col_{i}" for i, h in enumerate(header)]
-                data_rows = list(sheet.iter_rows(min_row=2, max_row=min(1+sample_rows, sheet.max_row), values_only=True))
-                df_sample = pd.DataFrame(data_rows, columns=header)
-            wb.close()
+                df_sample = excel_info["sample_df"]
 
         elif ext == '.csv':
-            for encoding in ['utf-8-sig', 'utf-8', 'cp1252', 'latin1']:
-                try:
-                    df_sample = pd.read_csv(p, nrows=sample_rows, encoding=encoding)
-                    break
-                except:
-                    continue
-            else:
+            # Đoán encoding 1 lần từ block đầu rồi đọc mẫu đúng 1 lần
+            try:
+                df_sample = pd.read_csv(p, nrows=sample_rows, encoding=sniff_encoding(p))
+            except Exception:
                 result["error"] = "Không đọc được CSV (encoding)"
 
         elif ext == '.json':
-            with open(p, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if not content:
-                    result["error"] = "JSON rỗng"
-                elif content.startswith('['):
-                    data = json.loads(content)[:sample_rows]
-                else:
-                    lines = [ln.strip() for ln in content.splitlines() if ln.strip() and not ln.strip().startswith('//')]
-                    data = [json.loads(ln) for ln in lines[:sample_rows]]
-                df_sample = pd.DataFrame(data)
+            if parsed_head is None:
+                result["error"] = result["error"] or "JSON rỗng"
+            else:
+                df_sample = parsed_head.head(sample_rows)
 
-        elif ext in {'.db', '.sqlite', '.sqlite3'}:
+        elif ext in SQLITE_EXTENSIONS:
             conn = None
             try:
                 conn = sqlite3.connect(f"file:{p}?mode=ro", uri=True)
-                cur = conn.cursor()
-                cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' LIMIT 1")
-                row = cur.fetchone()
-                if not row:
+                table = sqlite_first_table(conn)
+                if not table:
                     result["error"] = "Không có bảng"
                 else:
-                    table = row[0]
-                    df_sample = pd.read_sql_query(f"SELECT * FROM `{table}` LIMIT {sample_rows}", conn)
+                    df_sample = pd.read_sql_query(f"SELECT * FROM {quote_identifier(table)} LIMIT {sample_rows}", conn)
                 conn.close()
             except Exception as e:
                 if conn: conn.close()
                 result["error"] = f"DB error: {e}"
 
+        elif ext in COLUMNAR_EXTENSIONS:
+            # Chỉ đọc batch đầu tiên (row group / record batch đầu)
+            df_sample = next(iter_columnar_batches(p, max(sample_rows, 1)), None)
+            if df_sample is None:
+                result["error"] = "File Parquet/Arrow rỗng"
+
         elif ext == '.sql':
-            # === DÙNG parse_sql_inserts ĐỂ ĐỌC MẪU .sql ===
-            df_full, table_name, columns, debug_lines = parse_sql_inserts(str(p))
-            if df_full is not None and not df_full.empty:
+            # === MẪU LẤY TỪ BẢN PARSE Ở BƯỚC ĐẾM DÒNG ===
+            if parsed_head is not None and not parsed_head.empty:
                 # Lấy mẫu
-                df_sample = df_full.head(sample_rows).copy()
+                df_sample = parsed_head.head(sample_rows).copy()
                 # Đảm bảo cột là str
                 df_sample.columns = [str(col) for col in df_sample.columns]
             else:
@@ -3,15 +3,14 @@ from typing import Tuple, Optional, Dict, Set, List
 import pandas as pd
 import numpy as np
 import Levenshtein
-from core.conversion.utils.normalizer import normalize_place
-from core.conversion.utils.vietnamese_code import vietnamese_normalize_text
+from core.conversion.utils.normalizer import place_normalizer
 
 def normalize_sample_value(value):
     """Chuẩn hóa giống hệt mapping_loader"""
     if pd.isna(value) or value == '':
         return ''
     s = str(value).strip()
-    return vietnamese_normalize_text(normalize_place(s)).strip()
+    return place_normalizer.normalize_text(s)
 
 # Kiểm tra cột có thể chuyển về int an toàn không
 def can_convert_to_numeric(series):
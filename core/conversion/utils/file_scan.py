@@ -0,0 +1,76 @@
+# core/conversion/utils/file_scan.py
+"""
+Quét nhanh file CSV ở mức byte (dùng khi upload và khi chuyển đổi):
+  - sniff_encoding: đoán encoding 1 lần từ block đầu file.
+  - count_csv_rows: đếm số dòng dữ liệu theo block nhị phân lớn (numpy),
+    không tính dấu xuống dòng nằm trong field có dấu ngoặc kép.
+"""
+import codecs
+import numpy as np
+
+QUOTE = ord('"')
+NEWLINE = ord('\n')
+
+def sniff_encoding(path, sample_size: int = 1 << 16) -> str:
+    """
+    Encoding của file theo block đầu: utf-8-sig (có BOM) → utf-8 → cp1252 → latin1
+    (cùng thứ tự ưu tiên như khi thử lần lượt pd.read_csv với từng encoding).
+    """
+    with open(path, 'rb') as f:
+        head = f.read(sample_size)
+
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # final=False: ký tự nhiều byte bị cắt ở cuối block không tính là lỗi
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        head.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        return 'latin1'
+
+def count_csv_rows(path, block_size: int = 1 << 24) -> int:
+    """
+    Số dòng dữ liệu của CSV (không tính header), đọc theo block nhị phân block_size byte, đếm bằng numpy.
+    Block có dấu ": '\n' nằm trong ngoặc kép khi số dấu " đứng trước nó (cộng trạng thái từ block trước)
+    là số lẻ ("" trong field tự triệt tiêu) – tính bằng XOR số dấu " giữa các '\n' liên tiếp.
+    Nếu hết file mà ngoặc kép vẫn chưa đóng (dấu " lẻ loi trong field không có ngoặc)
+    thì trả về số dòng vật lý như cách đếm cũ.
+    """
+    quoted_newlines = 0
+    total_newlines = 0
+    in_quotes = False
+    last_byte = b''
+
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            last_byte = block[-1:]
+            arr = np.frombuffer(block, dtype=np.uint8)
+
+            if b'"' not in block:
+                block_newlines = int(np.count_nonzero(arr == NEWLINE))
+                total_newlines += block_newlines
+                if in_quotes:
+                    quoted_newlines += block_newlines
+                continue
+
+            is_quote = (arr == QUOTE).view(np.uint8)
+            newline_pos = np.flatnonzero(arr == NEWLINE)
+            total_newlines += len(newline_pos)
+            if len(newline_pos):
+                # Tính chẵn lẻ số dấu " trong từng đoạn [đầu block hoặc '\n' trước, '\n' này)
+                segment_parity = np.bitwise_xor.reduceat(is_quote, np.concatenate(([0], newline_pos)))[:len(newline_pos)]
+                quotes_before = np.cumsum(segment_parity) + in_quotes
+                quoted_newlines += int(np.count_nonzero(quotes_before & 1))
+            in_quotes ^= bool(np.count_nonzero(is_quote) & 1)
+
+    newlines = total_newlines if in_quotes else total_newlines - quoted_newlines
+    lines = newlines + (1 if last_byte and last_byte != b'\n' else 0)
+    return max(lines - 1, 0)
@@ -1,26 +1,170 @@
+import gc
+import hashlib
 import json
 import os
+import pickle
+from functools import lru_cache
 from typing import Dict, Tuple, List, Set
 from config.settings import Settings
-from .normalizer import normalize_mapping_key, normalize_place
-from .vietnamese_code import vietnamese_normalize_text
+from .normalizer import normalize_mapping_key, place_normalizer
 
-def load_mapping_and_units(mapping_file: str = None) -> Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]]:
+class MappingTable(dict):
     """
-    Load mapping và lưu tất cả value vào một list thay vì bỏ qua duplicate
+    Bảng mapping key (tỉnh, huyện, xã) → list giá trị mới, kèm 2 chỉ mục phụ
+    phục vụ tra cứu khi key đầy đủ không khớp (xem find_mapping_key):
+      - ward_province_index: (xã, tỉnh) → (số key khớp, key)
+      - ward_district_index: (xã, huyện) → (số key khớp, key)
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ward_province_index: Dict[Tuple[str, str], Tuple[int, Tuple[str, str, str]]] = {}
+        self.ward_district_index: Dict[Tuple[str, str], Tuple[int, Tuple[str, str, str]]] = {}
+
+def build_partial_indexes(mapping_table: MappingTable) -> MappingTable:
+    """
+    Tạo chỉ mục (xã, tỉnh) và (xã, huyện) kèm số lượng key trùng,
+    để việc tìm key thiếu huyện / sai chính tả huyện là O(1) thay vì duyệt toàn bảng.
+    """
+    ward_province_index = {}
+    ward_district_index = {}
+    for key in mapping_table:
+        prov, dist, ward = key
+        for index, partial in ((ward_province_index, (ward, prov)), (ward_district_index, (ward, dist))):
+            if partial in index:
+                index[partial] = (index[partial][0] + 1, key)
+            else:
+                index[partial] = (1, key)
+
+    mapping_table.ward_province_index = ward_province_index
+    mapping_table.ward_district_index = ward_district_index
+    return mapping_table
+
+# ---- Artifact nhị phân ----
+# Tăng số này mỗi khi đổi cách chuẩn hóa key / cấu trúc MappingTable / units,
+# để artifact cũ tự bị bỏ qua và build lại
+MAPPING_ARTIFACT_VERSION = 1
+
+def file_sha256(path) -> str:
+    """
+    Hash nội dung file nguồn (mapping.json) để biết artifact còn khớp hay không.
+    Cache theo (path, mtime, size): lúc import, load_mapping_and_units và mapping_version
+    dùng chung 1 lần hash; file đổi thì stat đổi → hash lại.
+    """
+    st = os.stat(path)
+    return _file_sha256_cached(os.fspath(path), st.st_mtime_ns, st.st_size)
+
+@lru_cache(maxsize=8)
+def _file_sha256_cached(path: str, mtime_ns: int, size: int) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def mapping_version(mapping_file: str = None) -> str:
+    """
+    Phiên bản mapping dùng làm khóa cache kết quả (kiểm tra file / chuyển đổi):
+    đổi khi mapping.json đổi nội dung hoặc MAPPING_ARTIFACT_VERSION tăng.
+    """
+    mapping_file = mapping_file or Settings.MAPPING_FILE
+    return f"{MAPPING_ARTIFACT_VERSION}-{file_sha256(mapping_file)[:16]}"
+
+def read_mapping_artifact(artifact_file, source_hash: str):
+    """
+    Đọc artifact; trả None nếu không có, hỏng, khác version hoặc khác hash nguồn.
+    Artifact là file pickle: unpickle chạy được code tùy ý, nên MAPPING_ARTIFACT_FILE chỉ được trỏ tới
+    file do chính app build ra (build_mapping_artifact / load_mapping_and_units), ở thư mục người ngoài không ghi được.
+    Kiểm tra version / hash nguồn chỉ phát hiện artifact cũ, không chống được file bị thay thế có chủ ý.
+    """
+    # Tắt GC khi unpickle: hàng trăm nghìn tuple nhỏ làm GC chạy liên tục vô ích
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(artifact_file, 'rb') as f:
+            payload = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Không đọc được mapping artifact {artifact_file}: {e}")
+        return None
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    if (
+        not isinstance(payload, dict)
+        or payload.get("version") != MAPPING_ARTIFACT_VERSION
+        or payload.get("source_sha256") != source_hash
+    ):
+        return None
+    return payload["mapping_table"], payload["units"]
+
+def write_mapping_artifact(artifact_file, source_hash: str, mapping_table: MappingTable, units: dict) -> None:
+    """
+    Ghi artifact (mapping_table + chỉ mục phụ + units) ra file tạm rồi os.replace,
+    để process khác đang đọc không bao giờ thấy file ghi dở.
+    """
+    payload = {
+        "version": MAPPING_ARTIFACT_VERSION,
+        "source_sha256": source_hash,
+        "mapping_table": mapping_table,
+        "units": units,
+    }
+    tmp_file = f"{artifact_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, artifact_file)
+    except OSError as e:
+        print(f"⚠️ Không ghi được mapping artifact {artifact_file}: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+def build_mapping_artifact(mapping_file: str = None, artifact_file: str = None) -> str:
+    """Bước build: parse mapping.json và ghi artifact, trả về hash nguồn"""
+    mapping_file = mapping_file or Settings.MAPPING_FILE
+    artifact_file = artifact_file or Settings.MAPPING_ARTIFACT_FILE
+    source_hash = file_sha256(mapping_file)
+    mapping_table, units = parse_mapping_file(mapping_file)
+    write_mapping_artifact(artifact_file, source_hash, mapping_table, units)
+    return source_hash
+
+def load_mapping_and_units(mapping_file: str = None, artifact_file: str = None) -> Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]]:
+    """
+    Load mapping + units, ưu tiên artifact nhị phân đã build sẵn.
+    Artifact được build lại tự động khi hash của mapping.json thay đổi
+    (hoặc MAPPING_ARTIFACT_VERSION tăng). MAPPING_ARTIFACT_FILE rỗng = luôn parse JSON.
     """
     if mapping_file is None:
         mapping_file = Settings.MAPPING_FILE
-    
+    if artifact_file is None:
+        artifact_file = Settings.MAPPING_ARTIFACT_FILE
+
     if not os.path.exists(mapping_file):
         raise FileNotFoundError(f"❌ Mapping file không tồn tại: {mapping_file}")
-    
+
+    if not artifact_file:
+        return parse_mapping_file(mapping_file)
+
+    source_hash = file_sha256(mapping_file)
+    cached = read_mapping_artifact(artifact_file, source_hash)
+    if cached is not None:
+        return cached
+
+    mapping_table, units = parse_mapping_file(mapping_file)
+    write_mapping_artifact(artifact_file, source_hash, mapping_table, units)
+    return mapping_table, units
+
+def parse_mapping_file(mapping_file) -> Tuple[MappingTable, dict]:
+    """
+    Parse mapping.json và lưu tất cả value vào một list thay vì bỏ qua duplicate
+    """
     # Đọc JSON
     with open(mapping_file, 'r', encoding='utf-8') as f:
         raw_mappings = json.load(f)
     
     # TẠO BẢNG HASH
-    mapping_table: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]] = {}
+    mapping_table: Dict[Tuple[str, str, str], List[Tuple[str, str, str, str]]] = MappingTable()
     id_provinces_set: Set[str] = set()
     id_districts_set: Set[str] = set()
     id_wards_set: Set[str] = set()
@@ -58,15 +202,18 @@ def load_mapping_and_units(mapping_file: str = None) -> Dict[Tuple[str, str, str
         if id_ward_old_raw:
             id_wards_set.add(id_ward_old_raw)
         if prov_old_raw:
-            norm = vietnamese_normalize_text(normalize_place(prov_old_raw)).strip()
+            norm = place_normalizer.normalize_text(prov_old_raw)
             if norm: provinces_set.add(norm)
         if dist_old_raw:
-            norm = vietnamese_normalize_text(normalize_place(dist_old_raw)).strip()
+            norm = place_normalizer.normalize_text(dist_old_raw)
             if norm: districts_set.add(norm)
         if ward_old_raw:
-            norm = vietnamese_normalize_text(normalize_place(ward_old_raw)).strip()
+            norm = place_normalizer.normalize_text(ward_old_raw)
             if norm: wards_set.add(norm)
     
+    # CHỈ MỤC PHỤ CHO TRA CỨU THIẾU KEY
+    build_partial_indexes(mapping_table)
+
     # BẢNG TỈNH, HUYỆN, XÃ cŨ
     units = {
         "id_provinces": id_provinces_set,
@@ -77,4 +224,4 @@ def load_mapping_and_units(mapping_file: str = None) -> Dict[Tuple[str, str, str
         "wards": wards_set
     }
 
-    return mapping_table, units
\ No newline at end of file
+    return mapping_table, units
@@ -1,63 +1,102 @@
 import re
 import pandas as pd
+from functools import lru_cache
 from typing import Tuple
+from config.settings import Settings
 from core.conversion.utils.vietnamese_code import vietnamese_normalize_text
 
-def normalize_place(name: str) -> str:
-    """Chuẩn hóa tên địa danh - loại bỏ tiền tố và ký tự thừa (không phân biệt hoa thường)"""
-    if pd.isna(name) or not name:
-        return ''
-    
-    # Chuyển về lowercase để xử lý tiền tố
-    name_lower = str(name).strip().lower()
-    
-    # 🔥 TIỀN TỐ VIỆT NAM (case-insensitive)
-    prefixes_vn = [
-        r'tp\.', r'tx\.', r'tt\.', r'q\.', r'x\.', r'p\.', r't\.', r'h\.',  
-        r'thành phố', r'tỉnh', r'tp', r'thủ đô', r'td',                      
-        r'huyện', r'quận', r'thị xã',                                      
-        r'xã', r'phường', r'thị trấn'                                 
-    ]
-    
-    # 🔥 TIỀN TỐ TIẾNG ANH
-    prefixes_en = [
-        r'district of', r'dist of', r'county of', r'town of',
-        r'ward of', r'commune of', r'township of'
-    ]
-    
-    all_prefixes = prefixes_vn + prefixes_en
-
-    # 🔥 HẬU TỐ TIẾNG ANH
-    all_suffixes = [
-        r'province', r'prov', 
-        r'district', r'dist', r'county', r'town',
-        r'ward', r'commune', r'township'
-    ]
-    
-    # Loại bỏ tiền tố
-    for prefix_pattern in all_prefixes:
-        match = re.match(rf'^{prefix_pattern}\s*', name_lower)
+# 🔥 TIỀN TỐ VIỆT NAM (case-insensitive)
+PREFIXES_VN = [
+    r'tp\.', r'tx\.', r'tt\.', r'q\.', r'x\.', r'p\.', r't\.', r'h\.',
+    r'thành phố', r'tỉnh', r'tp', r'thủ đô', r'td',
+    r'huyện', r'quận', r'thị xã',
+    r'xã', r'phường', r'thị trấn'
+]
+
+# 🔥 TIỀN TỐ TIẾNG ANH
+PREFIXES_EN = [
+    r'district of', r'dist of', r'county of', r'town of',
+    r'ward of', r'commune of', r'township of'
+]
+
+# 🔥 HẬU TỐ TIẾNG ANH
+SUFFIXES_EN = [
+    r'province', r'prov',
+    r'district', r'dist', r'county', r'town',
+    r'ward', r'commune', r'township'
+]
+
+class PlaceNormalizer:
+    """
+    Bộ chuẩn hóa địa danh dùng chung (mapping_loader, column_detector, matching):
+      - Tiền tố / hậu tố gộp thành 1 regex alternation biên dịch sẵn
+        (giữ đúng thứ tự ưu tiên như khi thử lần lượt từng mẫu).
+      - Regex dọn ký tự đặc biệt biên dịch sẵn.
+      - Cache LRU có giới hạn theo chuỗi thô, xem số hit/miss qua cache_info().
+    """
+    def __init__(self, maxsize: int = 100000):
+        self.prefix_re = re.compile(rf'^(?:{"|".join(PREFIXES_VN + PREFIXES_EN)})\s*')
+        self.suffix_re = re.compile(rf'\s*(?:{"|".join(SUFFIXES_EN)})$')
+        self.special_chars_re = re.compile(r'[,\(\)\[\]\-\+]+')
+        self.trailing_re = re.compile(r'[.,/\s]+$')
+        self.spaces_re = re.compile(r'\s+')
+        self.leading_zeros_re = re.compile(r'^0+')
+
+        # typed=True: 1 và 1.0 cho ra chuỗi khác nhau nên không được dùng chung cache
+        self.normalize_place = lru_cache(maxsize=maxsize, typed=True)(self._normalize_place)
+        self.normalize_text = lru_cache(maxsize=maxsize, typed=True)(self._normalize_text)
+        self.normalize_key_part = lru_cache(maxsize=maxsize, typed=True)(self._normalize_key_part)
+
+    def _normalize_place(self, name) -> str:
+        if pd.isna(name) or not name:
+            return ''
+
+        # Chuyển về lowercase để xử lý tiền tố
+        name_lower = str(name).strip().lower()
+
+        # Loại bỏ tiền tố
+        match = self.prefix_re.match(name_lower)
         if match:
             name_lower = name_lower[match.end():].strip()
-            break
-    
-    # Loại bỏ hậu tố
-    for suffix_pattern in all_suffixes:
-        match = re.search(rf'\s*{suffix_pattern}$', name_lower.lower())
+
+        # Loại bỏ hậu tố
+        match = self.suffix_re.search(name_lower)
         if match:
             name_lower = name_lower[:match.start()].strip()
-            break
 
-    # Xóa ký tự đặc biệt và khoảng trắng thừa
-    name_lower = re.sub(r'[,\(\)\[\]\-\+]+', ' ', name_lower)
-    name_lower = re.sub(r'[.,/\s]+$', '', name_lower)  # Xóa .,/,space ở cuối
-    name_lower = re.sub(r'\s+', ' ', name_lower).strip()
-    
-    # Xóa số 0 ở đầu (nếu có)
-    name_lower = re.sub(r'^0+', '', name_lower).strip()
-    return name_lower
+        # Xóa ký tự đặc biệt và khoảng trắng thừa
+        name_lower = self.special_chars_re.sub(' ', name_lower)
+        name_lower = self.trailing_re.sub('', name_lower)  # Xóa .,/,space ở cuối
+        name_lower = self.spaces_re.sub(' ', name_lower).strip()
 
-from typing import Tuple
+        # Xóa số 0 ở đầu (nếu có)
+        name_lower = self.leading_zeros_re.sub('', name_lower).strip()
+        return name_lower
+
+    def _normalize_text(self, name) -> str:
+        return vietnamese_normalize_text(self.normalize_place(name)).strip()
+
+    def _normalize_key_part(self, name) -> str:
+        return self.normalize_text(name).lower()
+
+    def cache_info(self) -> dict:
+        """Số hit/miss/kích thước hiện tại của từng cache"""
+        return {
+            name: getattr(self, name).cache_info()._asdict()
+            for name in ("normalize_place", "normalize_text", "normalize_key_part")
+        }
+
+    def cache_clear(self) -> None:
+        self.normalize_place.cache_clear()
+        self.normalize_text.cache_clear()
+        self.normalize_key_part.cache_clear()
+
+# Dùng chung trong mỗi process (worker fork từ process chính nhận luôn cache đã warm)
+place_normalizer = PlaceNormalizer(maxsize=Settings.NORMALIZER_CACHE_SIZE)
+
+def normalize_place(name: str) -> str:
+    """Chuẩn hóa tên địa danh - loại bỏ tiền tố và ký tự thừa (không phân biệt hoa thường)"""
+    return place_normalizer.normalize_place(name)
 
 def normalize_mapping_key(prov: str, dist: str, ward: str) -> Tuple[str, str, str]:
     """
@@ -68,7 +107,13 @@ def normalize_mapping_key(prov: str, dist: str, ward: str) -> Tuple[str, str, st
       3️ strip(): loại bỏ khoảng trắng thừa ở đầu và cuối
     """
     return tuple(
-        vietnamese_normalize_text(normalize_place(x)).strip()  # thực hiện 3 bước chuẩn hóa
-        for x in (prov, dist, ward)                             # áp dụng cho cả 3 phần: tỉnh, huyện, xã
+        place_normalizer.normalize_text(x)  # thực hiện 3 bước chuẩn hóa
+        for x in (prov, dist, ward)         # áp dụng cho cả 3 phần: tỉnh, huyện, xã
     )
 
+def normalize_key_part(x: str) -> str:
+    """
+    Chuẩn hóa 1 thành phần địa chỉ giống normalize_mapping_key rồi đưa về chữ thường
+    (đúng dạng từng phần của key trong mapping_table).
+    """
+    return place_normalizer.normalize_key_part(x)
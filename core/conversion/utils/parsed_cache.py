@@ -0,0 +1,106 @@
+# core/conversion/utils/parsed_cache.py
+"""
+Bản đã parse của file upload (uploads/<hash>.<ext>.parsed.pkl): ghi 1 lần lúc kiểm tra file
+(get_file_info) và được handler đọc lại khi chuyển đổi → file .sql / .json chỉ parse đúng 1 lần cho mỗi nội dung file.
+Định dạng: các object pickle nối tiếp nhau – header (dict) rồi từng DataFrame batch,
+nên cả lúc ghi lẫn lúc đọc chỉ giữ 1 batch trong bộ nhớ.
+"""
+import os
+import pickle
+import uuid
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+import pandas as pd
+
+# Tăng khi đổi cách parse / định dạng cache để cache cũ tự bị bỏ qua
+PARSED_CACHE_VERSION = 1
+# Số dòng đầu giữ lại khi ghi cache (đủ cho mẫu lớn nhất của get_sample_rows)
+HEAD_ROWS = 500
+
+def parsed_cache_path(input_file) -> Path:
+    """uploads/<hash>.sql → uploads/<hash>.sql.parsed.pkl"""
+    input_file = Path(input_file)
+    return input_file.with_name(input_file.name + '.parsed.pkl')
+
+def _source_stamp(input_file) -> dict:
+    st = os.stat(input_file)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def write_parsed_cache(input_file, batches: Iterable[pd.DataFrame]) -> Tuple[int, Optional[pd.DataFrame]]:
+    """
+    Ghi từng batch đã parse ra cache (file tạm riêng cho mỗi lần ghi rồi os.replace).
+    Trả về (tổng số dòng, tối đa HEAD_ROWS dòng đầu để làm mẫu; None nếu không có dòng nào).
+    Lỗi khi parse thì xóa file tạm và raise lại.
+    Nhiều request cùng kiểm tra 1 file: mỗi request ghi file tạm của mình; os.replace thua
+    (vd Windows: file đích đang mở) mà cache hợp lệ đã có → coi như cache hit.
+    """
+    path = parsed_cache_path(input_file)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}-{uuid.uuid4().hex}.tmp")
+    total_rows, head = 0, []
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({"version": PARSED_CACHE_VERSION, **_source_stamp(input_file)}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            for batch in batches:
+                if batch.empty:
+                    continue
+                pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                if total_rows < HEAD_ROWS:
+                    head.append(batch.head(HEAD_ROWS - total_rows))
+                total_rows += len(batch)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Request khác đã ghi xong cùng nội dung → dùng bản đó
+            cached = _open_valid_cache(input_file)
+            if cached is None:
+                raise
+            cached.close()
+            tmp_path.unlink()
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+    head_df = pd.concat(head, ignore_index=True) if head else None
+    return total_rows, head_df
+
+def iter_parsed_cache(input_file) -> Optional[Iterator[pd.DataFrame]]:
+    """
+    Các batch đã parse của input_file theo thứ tự;
+    None nếu chưa có cache hoặc cache không còn khớp file (khác version / kích thước / mtime).
+    """
+    f = _open_valid_cache(input_file)
+    if f is None:
+        return None
+    return _iter_batches(f)
+
+def _open_valid_cache(input_file):
+    """File cache đã đọc qua header (con trỏ ở batch đầu); None nếu chưa có / không còn khớp input_file"""
+    path = parsed_cache_path(input_file)
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+    try:
+        header = pickle.load(f)
+        valid = (
+            isinstance(header, dict)
+            and header.get("version") == PARSED_CACHE_VERSION
+            and {"size": header.get("size"), "mtime_ns": header.get("mtime_ns")} == _source_stamp(input_file)
+        )
+    except Exception as e:
+        print(f"⚠️ Không đọc được cache đã parse {path}: {e}")
+        valid = False
+    if not valid:
+        f.close()
+        return None
+    return f
+
+def _iter_batches(f) -> Iterator[pd.DataFrame]:
+    with f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
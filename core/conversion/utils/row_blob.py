@@ -0,0 +1,202 @@
+# core/conversion/utils/row_blob.py
+"""
+Mã hóa dòng kết quả (list dict) thành blob Arrow IPC nén zstd – dạng lưu của task_row_chunks.rows_blob:
+  - Mỗi cột 1 mảng Arrow (tên cột không lặp lại theo từng dòng như JSONB), chia record batch batch_rows dòng.
+  - Cột chỉ gồm chuỗi / số nguyên / số thực / bool (và None) giữ kiểu Arrow tương ứng, cột chuỗi lặp nhiều
+    (tên tỉnh / huyện / xã, statusState...) ghi dạng dictionary; cột lẫn kiểu,
+    lồng nhau hoặc có dòng thiếu key được ghi dạng chuỗi JSON (đánh dấu trong metadata của field)
+    → giải mã lại đúng giá trị như lúc ghi.
+  - Đọc theo khoảng dòng chỉ giải nén các record batch chứa khoảng đó.
+"""
+import json
+from typing import Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Dòng mỗi record batch trong blob: đơn vị nhỏ nhất phải giải nén khi đọc theo khoảng dòng
+DEFAULT_BATCH_ROWS = 2000
+# Cột chuỗi có tỉ lệ giá trị khác nhau / số dòng dưới ngưỡng này được ghi dạng dictionary
+DICTIONARY_MAX_UNIQUE_RATIO = 0.5
+
+_JSON_FIELD = {b"enc": b"json"}
+_WRITE_OPTIONS = pa.ipc.IpcWriteOptions(compression="zstd")
+_MISSING = object()
+
+_PLAIN_TYPES = {
+    frozenset({str}): pa.string(),
+    frozenset({int}): pa.int64(),
+    frozenset({float}): pa.float64(),
+    frozenset({bool}): pa.bool_(),
+    frozenset(): pa.null(),
+}
+
+def dictionary_encode_repetitive(array: pa.Array) -> pa.Array:
+    """
+    Mảng chuỗi có số giá trị khác nhau (bỏ null) ≤ DICTIONARY_MAX_UNIQUE_RATIO * số dòng → dictionary encode,
+    còn lại giữ nguyên. Dùng chung cho blob dòng kết quả và file xuất Parquet / Arrow.
+    """
+    if pa.types.is_string(array.type) and len(array):
+        if pc.count_distinct(array, mode="only_valid").as_py() <= len(array) * DICTIONARY_MAX_UNIQUE_RATIO:
+            return array.dictionary_encode()
+    return array
+
+def _encode_column(name: str, values: list) -> tuple:
+    """(field, array) của 1 cột; cột không giữ được kiểu gốc → chuỗi JSON, thiếu key → null"""
+    if not any(v is _MISSING for v in values):
+        arrow_type = _PLAIN_TYPES.get(frozenset(type(v) for v in values if v is not None))
+        if arrow_type is not None:
+            try:
+                array = pa.array(values, type=arrow_type)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+                array = None  # vd số nguyên vượt int64
+            if array is not None:
+                array = dictionary_encode_repetitive(array)
+                return pa.field(name, array.type), array
+    encoded = [None if v is _MISSING else json.dumps(v, ensure_ascii=False) for v in values]
+    return pa.field(name, pa.string(), metadata=_JSON_FIELD), pa.array(encoded, type=pa.string())
+
+def encode_rows(rows: List[dict], batch_rows: int = DEFAULT_BATCH_ROWS) -> bytes:
+    """list dict (đã JSON-serializable) → blob Arrow IPC (file format, nén zstd)"""
+    names = list(dict.fromkeys(key for row in rows for key in row))
+    fields, arrays = [], []
+    for name in names:
+        field, array = _encode_column(name, [row.get(name, _MISSING) for row in rows])
+        fields.append(field)
+        arrays.append(array)
+    schema = pa.schema(fields, metadata={b"n_rows": str(len(rows)).encode(), b"batch_rows": str(batch_rows).encode()})
+    table = pa.Table.from_arrays(arrays, schema=schema)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, schema, options=_WRITE_OPTIONS) as writer:
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+def read_table(blob, start: int = 0, stop: Optional[int] = None) -> pa.Table:
+    """Các dòng [start, stop) của blob dạng Arrow Table – chỉ giải nén các record batch chứa khoảng đó"""
+    reader = pa.ipc.open_file(pa.py_buffer(blob))
+    metadata = reader.schema.metadata or {}
+    n_rows = int(metadata.get(b"n_rows", 0))
+    batch_rows = int(metadata.get(b"batch_rows", DEFAULT_BATCH_ROWS))
+    stop = n_rows if stop is None else min(stop, n_rows)
+    start = max(start, 0)
+    if start >= stop or reader.num_record_batches == 0:
+        return reader.schema.empty_table()
+
+    first, last = start // batch_rows, (stop - 1) // batch_rows
+    batches = [reader.get_batch(i) for i in range(first, min(last, reader.num_record_batches - 1) + 1)]
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    return table.slice(start - first * batch_rows, stop - start)
+
+def _is_json_field(field: pa.Field) -> bool:
+    return bool(field.metadata) and field.metadata.get(b"enc") == b"json"
+
+def _to_pylist(column: pa.ChunkedArray) -> list:
+    """ChunkedArray → list; cột dictionary giải mã qua dictionary + indices (nhanh hơn to_pylist nhiều lần)"""
+    if not pa.types.is_dictionary(column.type):
+        return column.to_pylist()
+    values = []
+    for chunk in column.chunks:
+        dictionary = chunk.dictionary.to_pylist()
+        values.extend(None if i is None else dictionary[i] for i in chunk.indices.to_pylist())
+    return values
+
+def column_values(table: pa.Table, name: str) -> list:
+    """Giá trị Python của 1 cột như lúc ghi (dòng thiếu key → None; cột không có → toàn None)"""
+    if name not in table.column_names:
+        return [None] * table.num_rows
+    values = _to_pylist(table.column(name))
+    if _is_json_field(table.schema.field(name)):
+        return [None if v is None else json.loads(v) for v in values]
+    return values
+
+def column_text(table: pa.Table, name: str) -> pa.ChunkedArray:
+    """
+    Cột dạng chuỗi như toán tử ->> của Postgres trên JSONB (số / bool → chuỗi, None → null),
+    dùng cho lọc / tìm kiếm / sắp xếp bằng pyarrow.compute.
+    """
+    if name not in table.column_names:
+        return pa.chunked_array([pa.nulls(table.num_rows, pa.string())])
+    column = table.column(name)
+    if _is_json_field(table.schema.field(name)):
+        return pa.chunked_array([pa.array(
+            [None if v is None or v == "null" else (json.loads(v) if v.startswith('"') else v) for v in column.to_pylist()],
+            type=pa.string(),
+        )])
+    if pa.types.is_boolean(column.type):
+        return pc.if_else(column, "true", "false")
+    if pa.types.is_floating(column.type):
+        # Cách in số thực của Arrow khác JSON (3.0 → "3") → in như json.dumps (repr của float)
+        return pa.chunked_array([pa.array(
+            [None if v is None else repr(v) for v in column.to_pylist()], type=pa.string()
+        )])
+    return column.cast(pa.string())
+
+def contains_text(table: pa.Table, name: str, pattern: str) -> pa.ChunkedArray:
+    """
+    Mask dòng có column_text chứa pattern (không phân biệt hoa thường, null → False);
+    cột dictionary chỉ so trên các giá trị khác nhau rồi ánh xạ theo indices.
+    """
+    if name in table.column_names and pa.types.is_dictionary(table.column(name).type):
+        return pa.chunked_array([
+            pc.fill_null(pc.take(
+                pc.fill_null(pc.match_substring(chunk.dictionary, pattern, ignore_case=True), False),
+                chunk.indices,
+            ), False)
+            for chunk in table.column(name).chunks
+        ], type=pa.bool_())
+    return pc.fill_null(pc.match_substring(column_text(table, name), pattern, ignore_case=True), False)
+
+def equals_value(table: pa.Table, name: str, value) -> pa.ChunkedArray:
+    """
+    Mask dòng có giá trị cột name == value như trên dict Python (thiếu key → None).
+    value là chuỗi (trường hợp thường gặp: tên tỉnh / huyện / xã) → so bằng pyarrow.compute,
+    cột dictionary chỉ so trên các giá trị khác nhau; giá trị khác (số, bool, None...) → so theo column_values.
+    """
+    if not isinstance(value, str):
+        return pa.chunked_array([pa.array([v == value for v in column_values(table, name)], type=pa.bool_())])
+    if name not in table.column_names:
+        return pa.chunked_array([pa.array([False] * table.num_rows, type=pa.bool_())])
+    column = table.column(name)
+    if _is_json_field(table.schema.field(name)):
+        return pc.fill_null(pc.equal(column, json.dumps(value, ensure_ascii=False)), False)
+    if pa.types.is_dictionary(column.type):
+        return pa.chunked_array([
+            pc.fill_null(pc.take(pc.fill_null(pc.equal(chunk.dictionary, value), False), chunk.indices), False)
+            for chunk in column.chunks
+        ], type=pa.bool_())
+    if pa.types.is_string(column.type):
+        return pc.fill_null(pc.equal(column, value), False)
+    return pa.chunked_array([pa.array([False] * table.num_rows, type=pa.bool_())])
+
+def table_to_rows(table: pa.Table) -> List[dict]:
+    """Arrow Table (từ read_table) → list dict như lúc ghi"""
+    names = table.column_names
+    columns = []
+    has_missing = False
+    for name in names:
+        values = _to_pylist(table.column(name))
+        if _is_json_field(table.schema.field(name)):
+            values = [_MISSING if v is None else json.loads(v) for v in values]
+            has_missing = has_missing or any(v is _MISSING for v in values)
+        columns.append(values)
+    if not has_missing:
+        return [dict(zip(names, values)) for values in zip(*columns)] if names else [{} for _ in range(table.num_rows)]
+    return [
+        {name: v for name, v in zip(names, values) if v is not _MISSING}
+        for values in zip(*columns)
+    ]
+
+def decode_rows(blob, start: int = 0, stop: Optional[int] = None) -> List[dict]:
+    """Các dòng [start, stop) của blob"""
+    return table_to_rows(read_table(blob, start, stop))
+
+def take_rows(blob, offsets: Iterable[int]) -> List[dict]:
+    """Các dòng tại vị trí offsets (trong blob, theo đúng thứ tự offsets) – chỉ giải nén các batch cần"""
+    offsets = list(offsets)
+    if not offsets:
+        return []
+    lo, hi = min(offsets), max(offsets) + 1
+    table = read_table(blob, lo, hi)
+    return table_to_rows(table.take(pa.array([o - lo for o in offsets], type=pa.int64())))
@@ -2,6 +2,10 @@ import os
 import pandas as pd
 
 from core.conversion.handlers.sql_handler import generate_sql_inserts    
+from core.conversion.handlers.sqlite_handler import SQLITE_EXTENSIONS, write_sqlite_rows
+from core.conversion.handlers.parquet_handler import PARQUET_EXTENSIONS, ARROW_EXTENSIONS, dataframe_to_arrow
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 
 def save_excel_file(df: pd.DataFrame, output_file: str) -> None:
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -72,10 +76,57 @@ def save_sql_file(df: pd.DataFrame, output_file: str) -> None:
     
     return True
 
+def save_sqlite_file(df: pd.DataFrame, output_file: str) -> None:
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    if not output_file.lower().endswith(SQLITE_EXTENSIONS):
+        output_file = output_file.rsplit('.', 1)[0] + '.db'
+
+    try:
+        # NaN → NULL; itertuples trả về kiểu Python nên sqlite3 bind được trực tiếp
+        df = df.astype(object).where(df.notna(), None)
+        written = write_sqlite_rows(output_file, "converted_addresses", df.columns.tolist(),
+                                    df.itertuples(index=False, name=None))
+        print(f"💾 Đã lưu SQLite: {output_file} ({written} dòng)")
+    except Exception as e:
+        print(f"❌ Lỗi lưu file: {e}")
+        return False
+
+    return True
+
+def save_parquet_file(df: pd.DataFrame, output_file: str) -> None:
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    if not output_file.lower().endswith(PARQUET_EXTENSIONS):
+        output_file = output_file.rsplit('.', 1)[0] + '.parquet'
+
+    try:
+        # Cột địa chỉ lặp nhiều đã là dictionary → Parquet lưu dictionary page, nén zstd
+        pq.write_table(dataframe_to_arrow(df), output_file, compression='zstd')
+        print(f"💾 Đã lưu Parquet: {output_file}")
+    except Exception as e:
+        print(f"❌ Lỗi lưu file: {e}")
+        return False
+
+    return True
+
+def save_arrow_file(df: pd.DataFrame, output_file: str) -> None:
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    if not output_file.lower().endswith(ARROW_EXTENSIONS):
+        output_file = output_file.rsplit('.', 1)[0] + '.feather'
+
+    try:
+        # Feather v2 = Arrow IPC dạng file, nén zstd
+        feather.write_feather(dataframe_to_arrow(df), output_file, compression='zstd')
+        print(f"💾 Đã lưu Arrow/Feather: {output_file}")
+    except Exception as e:
+        print(f"❌ Lỗi lưu file: {e}")
+        return False
+
+    return True
+
 def save_file_1(df: pd.DataFrame, output_file: str) -> bool:
     """
     Lưu DataFrame Thành công vào file với định dạng dựa trên phần mở rộng của output_file.
-    Hỗ trợ: .xlsx, .csv, .json, .sql
+    Hỗ trợ: .xlsx, .csv, .json, .sql, .db/.sqlite/.sqlite3, .parquet, .feather/.arrow/.ipc
     Trả về True nếu lưu thành công, False nếu lỗi.
     """
     df_filtered = df[df['statusState'] == 'Thành công'].copy()
@@ -94,6 +145,12 @@ def save_file_1(df: pd.DataFrame, output_file: str) -> bool:
         return save_json_file(df_filtered, output_file)
     elif ext == '.sql':
         return save_sql_file(df_filtered, output_file)
+    elif ext in SQLITE_EXTENSIONS:
+        return save_sqlite_file(df_filtered, output_file)
+    elif ext in PARQUET_EXTENSIONS:
+        return save_parquet_file(df_filtered, output_file)
+    elif ext in ARROW_EXTENSIONS:
+        return save_arrow_file(df_filtered, output_file)
     else:
         print(f"❌ Định dạng file không được hỗ trợ: {ext}")
         return False
@@ -101,7 +158,7 @@ def save_file_1(df: pd.DataFrame, output_file: str) -> bool:
 def save_file_0(df: pd.DataFrame, output_file: str) -> bool:
     """
     Lưu DataFrame Không thành công vào file với định dạng dựa trên phần mở rộng của output_file.
-    Hỗ trợ: .xlsx, .csv, .json, .sql
+    Hỗ trợ: .xlsx, .csv, .json, .sql, .db/.sqlite/.sqlite3, .parquet, .feather/.arrow/.ipc
     Trả về True nếu lưu thành công, False nếu lỗi.
     """
     df_filtered = df[df['statusState'] != 'Thành công'].copy()
@@ -120,6 +177,12 @@ def save_file_0(df: pd.DataFrame, output_file: str) -> bool:
         return save_json_file(df_filtered, output_file)
     elif ext == '.sql':
         return save_sql_file(df_filtered, output_file)
+    elif ext in SQLITE_EXTENSIONS:
+        return save_sqlite_file(df_filtered, output_file)
+    elif ext in PARQUET_EXTENSIONS:
+        return save_parquet_file(df_filtered, output_file)
+    elif ext in ARROW_EXTENSIONS:
+        return save_arrow_file(df_filtered, output_file)
     else:
         print(f"❌ Định dạng file không được hỗ trợ: {ext}")
         return False
\ No newline at end of file
@@ -0,0 +1,85 @@
+# core/conversion/utils/upload_store.py
+"""
+Lưu file upload theo hash nội dung (uploads/<sha256><ext>): cùng 1 file upload lại
+(vd F5 trình duyệt) chỉ lưu 1 bản trên đĩa, kết quả kiểm tra file được cache theo
+(hash nội dung, phiên bản mapping) và kết quả chuyển đổi theo
+(hash nội dung, nhóm địa chỉ đã chọn, phiên bản mapping) – xem result_cache_key.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+UPLOAD_DIR = Path("uploads")
+# Tăng khi đổi nội dung cache kết quả kiểm tra file
+DETECTION_CACHE_VERSION = 1
+
+def save_upload(fileobj: BinaryIO, ext: str, upload_dir: Path = UPLOAD_DIR,
+                block_size: int = 1 << 20) -> Tuple[str, Path, int]:
+    """
+    Ghi file upload ra file tạm, tính sha256 trong cùng lượt ghi.
+    Nội dung đã có trên đĩa thì bỏ file tạm (không lưu trùng), chưa có thì đổi tên thành uploads/<hash><ext>.
+    Trả về (hash nội dung, đường dẫn file, kích thước).
+    """
+    upload_dir.mkdir(exist_ok=True)
+    h = hashlib.sha256()
+    size = 0
+    tmp_path = upload_dir / f".upload-{os.getpid()}-{id(fileobj)}{ext}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            for block in iter(lambda: fileobj.read(block_size), b""):
+                h.update(block)
+                f.write(block)
+                size += len(block)
+        content_hash = h.hexdigest()
+        path = upload_path(content_hash, ext, upload_dir)
+        if path.exists() and path.stat().st_size == size:
+            tmp_path.unlink()
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+    return content_hash, path, size
+
+def upload_path(content_hash: str, ext: str, upload_dir: Path = UPLOAD_DIR) -> Path:
+    """uploads/<hash><ext>"""
+    return upload_dir / f"{content_hash}{ext.lower()}"
+
+# ---- Cache kết quả kiểm tra file ----
+def _detection_cache_path(content_hash: str, ext: str, mapping_version: str, upload_dir: Path) -> Path:
+    return upload_dir / f"{content_hash}{ext.lower()}.{mapping_version}.detect.json"
+
+def read_detection_cache(content_hash: str, ext: str, mapping_version: str,
+                         upload_dir: Path = UPLOAD_DIR) -> Optional[dict]:
+    """Kết quả kiểm tra file đã lưu (rows, mb, names, groups, sample); None nếu chưa có / hỏng / khác version"""
+    try:
+        with open(_detection_cache_path(content_hash, ext, mapping_version, upload_dir), encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("version") != DETECTION_CACHE_VERSION:
+        return None
+    return cached
+
+def write_detection_cache(content_hash: str, ext: str, mapping_version: str, detection: dict,
+                          upload_dir: Path = UPLOAD_DIR) -> None:
+    """Ghi kết quả kiểm tra file (đã JSON-serializable) ra file tạm rồi os.replace"""
+    path = _detection_cache_path(content_hash, ext, mapping_version, upload_dir)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": DETECTION_CACHE_VERSION, **detection}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Không ghi được cache kiểm tra file {path}: {e}")
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+# ---- Khóa cache kết quả chuyển đổi ----
+def result_cache_key(content_hash: str, selected_groups: list, mapping_version: str) -> str:
+    """Cùng file + cùng nhóm địa chỉ (giữ thứ tự) + cùng mapping → cùng kết quả chuyển đổi"""
+    payload = json.dumps([content_hash, selected_groups, mapping_version], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
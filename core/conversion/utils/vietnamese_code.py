@@ -1,4 +1,5 @@
 import unicodedata, re
+from functools import lru_cache
 
 # ============================================
 # BẢNG DỮ LIỆU CỐ ĐỊNH
@@ -29,6 +30,19 @@ reverse_map = {
     for idx, ch in enumerate(forms)
 }
 
+# Bảng tra theo cả chữ thường lẫn chữ hoa (đã ở dạng NFC) → tra thẳng, không cần normalize
+reverse_map_any_case = {
+    **reverse_map,
+    **{ch.upper(): value for ch, value in reverse_map.items()}
+}
+
+# Các ký tự nguyên âm có dấu thanh (hoa + thường): chuỗi NFC không chứa ký tự nào
+# trong tập này thì không có âm tiết nào cần đặt lại dấu
+toned_chars = frozenset(ch for ch, (_, tone) in reverse_map_any_case.items() if tone != 0)
+
+# Tách chuỗi thành các cụm chữ (vị trí chẵn) và cụm không phải chữ (vị trí lẻ)
+word_split_re = re.compile(r'(\W+)', flags=re.UNICODE)
+
 # ============================================
 # HÀM TRA CỨU
 # ============================================
@@ -39,6 +53,11 @@ def get_base_and_tone(ch):
       - Nó có thanh điệu mấy (0-5)
     Nếu không phải nguyên âm, trả về (None, 0)
     """
+    found = reverse_map_any_case.get(ch)
+    if found is not None:
+        return found
+    if ch.isascii():
+        return (None, 0)
     ch_nfc = unicodedata.normalize('NFC', ch.lower())
     return reverse_map.get(ch_nfc, (None, 0))
 
@@ -138,6 +157,9 @@ def normalize_syllable(syll):
 
     return result
 
+# Bảng âm tiết đã chuẩn hóa (cache theo âm tiết, có giới hạn)
+normalize_syllable_cached = lru_cache(maxsize=100000)(normalize_syllable)
+
 # ============================================
 # HÀM CHUẨN HÓA CẢ CÂU / VĂN BẢN
 # ============================================
@@ -147,16 +169,15 @@ def vietnamese_normalize_text(text):
       - Tách ra từng từ, ký tự đặc biệt, khoảng trắng.
       - Chuẩn hóa từng âm tiết riêng biệt.
       - Giữ nguyên định dạng gốc (dấu câu, khoảng trắng, chữ hoa).
+    Đường nhanh: chuỗi ASCII hoặc chuỗi NFC không có nguyên âm mang dấu thanh
+    được trả về ngay; các âm tiết còn lại tra qua bảng normalize_syllable_cached.
     """
-    # Tách từ và ký tự không phải chữ (giữ nguyên thứ tự)
-    words = re.findall(r'\w+|\W+', text, flags=re.UNICODE)
-    normalized = []
-    for token in words:
-        if re.match(r'\w+', token, flags=re.UNICODE):
-            # Nếu token là chữ (vd: "hoà bình")
-            subwords = token.split()
-            normalized.append(' '.join(normalize_syllable(sw) for sw in subwords))
-        else:
-            # Nếu là dấu câu, khoảng trắng thì giữ nguyên
-            normalized.append(token)
-    return ''.join(normalized)
+    if text.isascii():
+        return text
+    if toned_chars.isdisjoint(text) and unicodedata.is_normalized('NFC', text):
+        return text
+
+    # Vị trí chẵn là cụm chữ (có thể rỗng ở 2 đầu), vị trí lẻ là dấu câu / khoảng trắng giữ nguyên
+    parts = word_split_re.split(text)
+    parts[0::2] = [normalize_syllable_cached(word) for word in parts[0::2]]
+    return ''.join(parts)
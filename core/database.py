@@ -67,16 +67,19 @@ def init_db():
             );
         """))
 
-        # Thêm cột full_data_blob nếu chưa có
+        # Thêm cột full_data_blob nếu chưa có (không dùng: dòng kết quả lưu dạng blob theo chunk – task_row_chunks.rows_blob)
         db.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS full_data_blob BYTEA;"))
 
+        # Hash nội dung file upload + khóa dùng lại kết quả chuyển đổi
+        db.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS content_hash TEXT;"))
+        db.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS result_key TEXT;"))
+
         # Index nhanh
         db.execute(text("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);"))
         db.execute(text("CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at DESC);"))
-        db.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_result_full_data_status 
-            ON tasks USING GIN ((result->'full_data') jsonb_path_ops);
-        """))
+        db.execute(text("CREATE INDEX IF NOT EXISTS idx_tasks_result_key ON tasks(result_key);"))
+        # Dòng kết quả đã chuyển sang task_row_chunks, tasks.result chỉ còn metadata → bỏ GIN index trên full_data
+        db.execute(text("DROP INDEX IF EXISTS idx_result_full_data_status;"))
             
         db.commit()
     
@@ -95,5 +98,33 @@ def init_db():
         
         db.execute(text("CREATE INDEX IF NOT EXISTS idx_task_edits_task_id ON task_edits(task_id);"))
         db.commit()
+
+        # Table lưu kết quả theo từng chunk dòng (chuyển đổi dạng stream)
+        db.execute(text("""
+            CREATE TABLE IF NOT EXISTS task_row_chunks (
+                id SERIAL PRIMARY KEY,
+                task_id TEXT NOT NULL REFERENCES tasks(task_id) ON DELETE CASCADE,
+                chunk_index INTEGER NOT NULL,
+                start_row INTEGER NOT NULL,
+                n_rows INTEGER NOT NULL,
+                rows JSONB,
+                rows_blob BYTEA,
+                UNIQUE(task_id, chunk_index)
+            );
+        """))
+
+        # Bộ đếm theo chunk: lọc theo trạng thái bỏ qua được chunk không có dòng phù hợp
+        db.execute(text("ALTER TABLE task_row_chunks ADD COLUMN IF NOT EXISTS success_count INTEGER;"))
+
+        # Dòng kết quả lưu dạng Arrow IPC nén zstd (core/conversion/utils/row_blob.py), rows JSONB chỉ còn ở chunk cũ
+        db.execute(text("ALTER TABLE task_row_chunks ADD COLUMN IF NOT EXISTS rows_blob BYTEA;"))
+        db.execute(text("ALTER TABLE task_row_chunks ALTER COLUMN rows DROP NOT NULL;"))
+        # Blob đã nén sẵn → lưu ngoài dòng, không để Postgres nén lại
+        db.execute(text("ALTER TABLE task_row_chunks ALTER COLUMN rows_blob SET STORAGE EXTERNAL;"))
+
+        db.execute(text("CREATE INDEX IF NOT EXISTS idx_task_row_chunks_task_id ON task_row_chunks(task_id);"))
+        # Tìm chunk chứa 1 dòng theo vị trí (sửa dòng theo id)
+        db.execute(text("CREATE INDEX IF NOT EXISTS idx_task_row_chunks_task_start ON task_row_chunks(task_id, start_row);"))
+        db.commit()
         
 init_db()
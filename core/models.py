@@ -1,5 +1,5 @@
 # core/models.py
-from sqlalchemy import Column, ForeignKey, String, Integer, BigInteger, Text, DateTime, UniqueConstraint
+from sqlalchemy import Column, ForeignKey, String, Integer, BigInteger, Text, DateTime, LargeBinary, UniqueConstraint
 from sqlalchemy.sql import func
 from core.database import engine
 from sqlalchemy.ext.declarative import declarative_base
@@ -28,6 +28,9 @@ class Task(Base):
     step = Column(Integer, default=0)
     result = Column(JSONB, nullable=True)
 
+    content_hash = Column(String)                   # sha256 nội dung file upload (uploads/<hash><ext>)
+    result_key = Column(String, index=True)         # khóa dùng lại kết quả: hash file + nhóm địa chỉ + phiên bản mapping
+
 class TaskEdit(Base):
     __tablename__ = "task_edits"
 
@@ -42,4 +45,18 @@ class TaskEdit(Base):
 
     __table_args__ = (UniqueConstraint('task_id', 'row_index', name='uix_task_row'),)
 
+class TaskRowChunk(Base):
+    __tablename__ = "task_row_chunks"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(String, ForeignKey("tasks.task_id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    start_row = Column(Integer, nullable=False)     # vị trí (0-based) dòng đầu tiên của chunk
+    n_rows = Column(Integer, nullable=False)
+    rows = Column(JSONB(none_as_null=True))         # list record của chunk (dạng cũ, NULL khi đã có rows_blob)
+    rows_blob = Column(LargeBinary)                 # list record dạng Arrow IPC nén zstd (core/conversion/utils/row_blob.py)
+    success_count = Column(Integer)                 # số dòng "Thành công" (tính cả edit trong task_edits); NULL = chưa đếm
+
+    __table_args__ = (UniqueConstraint('task_id', 'chunk_index', name='uix_task_chunk'),)
+
 Base.metadata.create_all(bind=engine)
\ No newline at end of file
@@ -1,12 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers import file_router
+from core.conversion.engine import start_worker_pool, shutdown_worker_pool
 import uvicorn
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pool worker dùng chung: tạo khi khởi động, đóng khi tắt app
+    start_worker_pool()
+    yield
+    shutdown_worker_pool()
+
 app = FastAPI(
     title="Chuyển đổi địa chỉ hành chính Việt Nam 2025",
     description="Backend API - Cập nhật 01/07/2025",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Cho phép Next.js gọi (CORS)
@@ -1,11 +1,5 @@
 # routers/file_router.py – BẢN HOÀN HẢO CUỐI CÙNG
-import shutil
 from fastapi import APIRouter, File, UploadFile, BackgroundTasks, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from sqlalchemy.dialects.postgresql import insert as postgresql_insert
-from core.database import engine
-from core.models import TaskEdit
 from fastapi.responses import StreamingResponse,FileResponse
 import json
 from pathlib import Path
@@ -14,17 +8,17 @@ import pandas as pd
 from nanoid import generate
 
 from core.conversion.utils.save_file import save_file_0, save_file_1
-from tasks.task_manager import apply_edits_to_result, create_task, get_merged_full_data, update_task, get_task
+from tasks.task_manager import apply_edits_to_result, create_task, update_task, get_task, get_task_meta, edit_row, edit_rows, edit_rows_matching, query_rows, make_json_serializable
 from core.conversion.engine import convert_file_blocking
 from core.conversion.load_file.file_info import get_file_info
 from core.conversion.utils.column_detector import identify_address_columns_smart
-from core.conversion import mapping_table, units
+from core.conversion import mapping_table, units, mapping_version
+from core.conversion.utils.upload_store import UPLOAD_DIR, save_upload, read_detection_cache, write_detection_cache
 from config.settings import Settings
 from datetime import datetime
 
 router = APIRouter()
 
-UPLOAD_DIR = Path("uploads")
 DOWNLOAD_DIR = Path("downloads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 DOWNLOAD_DIR.mkdir(exist_ok=True)
@@ -35,38 +29,51 @@ SAMPLE_DATA_DIST = {}
 async def upload_and_detect(file: UploadFile = File(...)):
     task_id = generate(size=14)
     ext = Path(file.filename).suffix.lower()
-    input_path = UPLOAD_DIR / f"{task_id}{ext}"
 
-    with open(input_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
-
-
-    info = get_file_info(str(input_path))
-    if info["error"]:
-        raise HTTPException(400, detail=info["error"])
+    # Hash trong lúc ghi; nội dung đã có thì dùng lại file cũ (không lưu trùng)
+    content_hash, input_path, filesize = save_upload(file.file, ext, UPLOAD_DIR)
+
+    # Cùng nội dung + cùng mapping đã kiểm tra rồi → dùng lại kết quả, không đọc lại file
+    detection = read_detection_cache(content_hash, ext, mapping_version, UPLOAD_DIR)
+    if detection is None:
+        info = get_file_info(str(input_path))
+        if info["error"]:
+            raise HTTPException(400, detail=info["error"])
+
+        rows = info.get("rows", 0)
+        mb = round(info.get("mb", 0), 1)
+        configs, _ = identify_address_columns_smart(info["sample_df"], units)
+
+        groups = []
+        for g in configs:
+            id_p, id_d, id_w, p, d, w = g
+            groups.append({
+                "id_province": id_p,
+                "id_district": id_d,
+                "id_ward": id_w,
+                "province": p,
+                "district": d,
+                "ward": w
+            })
+
+        detection = make_json_serializable({
+            "rows": rows,
+            "mb": mb,
+            "names": info["names"],
+            "groups": groups,
+            "sample": info["sample_df"].head(5).to_dict(orient="records"),
+        })
+        write_detection_cache(content_hash, ext, mapping_version, detection, UPLOAD_DIR)
 
-    rows = info.get("rows", 0)
-    mb = round(info.get("mb", 0), 1)
+    rows = detection["rows"]
+    mb = detection["mb"]
+    groups = detection["groups"]
     suggested_workers = min(8, max(1, rows // 15000 + int(mb // 25) + 1))
 
-    create_task(task_id, file.filename, input_path.stat().st_size, suggested_workers)
+    create_task(task_id, file.filename, filesize, suggested_workers, content_hash=content_hash)
 
     global SAMPLE_DATA_DIST
-    SAMPLE_DATA_DIST = info["sample_df"].head(5).to_dict(orient="records")
-
-    configs, _ = identify_address_columns_smart(info["sample_df"], units)
-
-    groups = []
-    for g in configs:
-        id_p, id_d, id_w, p, d, w = g
-        groups.append({
-            "id_province": id_p,
-            "id_district": id_d,
-            "id_ward": id_w,
-            "province": p,
-            "district": d,
-            "ward": w
-        })
+    SAMPLE_DATA_DIST = detection["sample"]
 
     update_task(task_id, pending_groups=groups, step = 1)
 
@@ -75,7 +82,7 @@ async def upload_and_detect(file: UploadFile = File(...)):
             "task_id": task_id,
             "step": 1,
             "groups": groups,
-            "all_columns": info["names"],
+            "all_columns": detection["names"],
             "rows": rows,
             "mb": mb,
             "suggested_workers": suggested_workers
@@ -143,8 +150,9 @@ async def start_conversion(task_id: str, payload: dict):
 
 # 4. LẤY TRẠNG THÁI TASK VÀ DỮ LIỆU ĐÃ XỬ LÝ 
 @router.get("/tasks/{task_id}")
-async def get_task_status(task_id: str):
-    task = get_task(task_id)
+async def get_task_status(task_id: str, include_rows: bool = False):
+    # Poll trạng thái chỉ đọc metadata + bộ đếm; cần cả dòng dữ liệu thì gọi ?include_rows=true
+    task = get_task(task_id) if include_rows else get_task_meta(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task không tồn tại")
 
@@ -153,66 +161,73 @@ async def get_task_status(task_id: str):
 # 5. CẬP NHẬT DÒNG THEO id 
 @router.post("/tasks/{task_id}/row-by-id/{id}")
 async def update_row_by_id(task_id: str, id: str, updated_row: dict):
-    task = get_task(task_id)
+    task = get_task_meta(task_id)
     if not task or task.get("status") != "preview_ready":
         raise HTTPException(404, detail="Task không tồn tại hoặc chưa sẵn sàng")
 
-    full_data = get_task(task_id)['result']['full_data']
-    
-    # Tìm dòng theo id (duy nhất)
-    row_index = None
-    original_row = None
-    for idx, row in enumerate(full_data):
-        if str(row.get("id")) == str(id):  
-            row_index = idx
-            original_row = row.copy()
-            break
-
-    if row_index is None:
+    # Tìm dòng theo id, lưu edit và cập nhật bộ đếm – không đọc lại toàn bộ dòng
+    edited = edit_row(task_id, id, updated_row)
+    if edited is None:
         raise HTTPException(404, detail=f"Không tìm thấy dòng có id = {id}")
 
-    updated_row = {
-        **original_row,                   
-        **updated_row,                    
-        "statusState": "Thành công"
-    }
-
-    with Session(engine) as db:
-        stmt = postgresql_insert(TaskEdit).values(
-            task_id=task_id,
-            row_index=row_index,
-            original_row=original_row,
-            edited_row=updated_row
-        )
-        stmt = stmt.on_conflict_do_update(
-            index_elements=['task_id', 'row_index'],
-            set_={
-                "edited_row": updated_row,
-                "original_row": original_row,    
-                "edited_at": func.now()
-            }
-        )
-        db.execute(stmt)
-        db.commit()
-
-    # Tính lại thống kê
-    merged_data = get_merged_full_data(task_id)
-    new_success = sum(1 for r in merged_data if r.get("statusState") == "Thành công")
-    new_fail = len(merged_data) - new_success
-    new_progress = round(new_success / len(merged_data) * 100, 1) if merged_data else 100
-
-    update_task(task_id, step=2, result={"success_count": new_success, "fail_count": new_fail, "full_data": merged_data})
+    total_rows = edited["total_rows"]
+    new_success = edited["success_count"]
+    new_fail = edited["fail_count"]
+    new_progress = round(new_success / total_rows * 100, 1) if total_rows else 100
 
     return {
         "data": {
             "message": "Đã lưu chỉnh sửa thành công",
             "id": id,
-            "row_index": row_index,                   
-            "updated_row": updated_row,
-            "total_rows": len(merged_data),
+            "row_index": edited["row_index"],                   
+            "updated_row": edited["updated_row"],
+            "total_rows": total_rows,
+            "success_count": new_success,
+            "fail_count": new_fail,
+            "progress": new_progress,
+            "edits_version": edited["edits_version"],
+            "step": 2,
+            "saved_at": datetime.now().isoformat()
+        }
+    }
+
+# 5b. SỬA HÀNG LOẠT
+# {"rows": [{"id": 12, "Tỉnh": "...", ...}, ...]}        → sửa từng dòng theo id
+# {"match": {"Xã": "Phuong 1"}, "set": {"Xã": "Phường 1"}} → gán "set" cho mọi dòng có cột khớp "match"
+@router.post("/tasks/{task_id}/rows/bulk-edit")
+async def bulk_edit_rows(task_id: str, payload: dict):
+    task = get_task_meta(task_id)
+    if not task or task.get("status") != "preview_ready":
+        raise HTTPException(404, detail="Task không tồn tại hoặc chưa sẵn sàng")
+
+    rows = payload.get("rows")
+    match, changes = payload.get("match"), payload.get("set")
+    if rows == []:
+        raise HTTPException(400, detail='"rows" rỗng – không có dòng nào để sửa')
+    if isinstance(rows, list) and all(isinstance(r, dict) and "id" in r for r in rows):
+        edited = edit_rows(task_id, rows)
+    elif isinstance(match, dict) and match and isinstance(changes, dict) and changes:
+        edited = edit_rows_matching(task_id, match, changes)
+    else:
+        raise HTTPException(400, detail='Cần "rows" (danh sách dòng có id) hoặc "match" + "set"')
+    if edited is None:
+        raise HTTPException(404, detail="Task không tồn tại")
+
+    total_rows = edited["total_rows"]
+    new_success = edited["success_count"]
+    new_fail = edited["fail_count"]
+    new_progress = round(new_success / total_rows * 100, 1) if total_rows else 100
+
+    return {
+        "data": {
+            "message": f"Đã lưu chỉnh sửa {edited['edited']} dòng",
+            "edited": edited["edited"],
+            "not_found": edited["not_found"],
+            "total_rows": total_rows,
             "success_count": new_success,
             "fail_count": new_fail,
             "progress": new_progress,
+            "edits_version": edited["edits_version"],
             "step": 2,
             "saved_at": datetime.now().isoformat()
         }
@@ -221,7 +236,7 @@ async def update_row_by_id(task_id: str, id: str, updated_row: dict):
 # 6. TẢI FILE KẾT QUẢ ĐÃ CHUYỂN ĐỔI ĐÚNG
 @router.get("/download-and-save-success/{task_id}")
 async def download_and_save_success(task_id: str):
-    task = get_task(task_id)
+    task = get_task_meta(task_id)
     if not task or task.get("status") != "preview_ready":
         raise HTTPException(400, detail="Chưa sẵn sàng")
 
@@ -257,7 +272,7 @@ async def download_and_save_success(task_id: str):
 # 7. TẢI FILE KẾT QUẢ ĐÃ CHUYỂN ĐỔI SAI
 @router.get("/download-and-save-error/{task_id}")
 async def download_and_save_error(task_id: str):
-    task = get_task(task_id)
+    task = get_task_meta(task_id)
     if not task or task.get("status") != "preview_ready":
         raise HTTPException(400, detail="Chưa sẵn sàng")
 
@@ -293,22 +308,15 @@ async def get_filtered_data(
     task_id: str,
     filter_status: str = "all"
 ):
-    task = get_task(task_id)
+    task = get_task_meta(task_id)
     if not task or task.get("status") != "preview_ready":
         raise HTTPException(404, detail="Task không tồn tại")
 
-    full_data = get_merged_full_data(task_id) 
-    # Lọc
-    if filter_status == "success":
-        filtered = [r for r in full_data if r.get("statusState") == "Thành công"]
-    elif filter_status == "error":
-        filtered = [r for r in full_data if r.get("statusState") != "Thành công"]
-    else:
-        filtered = full_data
-
-    update_task(task_id, step = 2, created_at = datetime.now().isoformat())
-
-    task = get_task(task_id)
+    # Lọc trạng thái trong app (pyarrow trên blob của từng chunk, dòng đã ghép edit), chỉ đọc – không ghi lại task.
+    # Giữ hợp đồng cũ: full_data là TOÀN BỘ dòng khớp (file lớn → payload lớn).
+    # Client mới nên dùng GET /tasks/{task_id}/rows (phân trang theo cursor, tìm kiếm, sắp xếp)
+    page = query_rows(task_id, status=filter_status if filter_status in ("success", "error") else "all",
+                      limit=None)
 
     return {
         "data": {
@@ -327,12 +335,48 @@ async def get_filtered_data(
                 "columns": task['columns'] ,
                 "step": 2,
                 "result": {
-                    "total_rows": len(full_data),
-                    "fail_count": task['result']['fail_count'],
-                    "success_count": task['result']['success_count'],
-                    "full_data": filtered
+                    "total_rows": page["total_rows"],
+                    "fail_count": page["fail_count"],
+                    "success_count": page["success_count"],
+                    "full_data": page["rows"],
                 }
             },
             "message": "Lọc hoàn tất!"
         }
-    }
\ No newline at end of file
+    }
+
+# 9. DÒNG KẾT QUẢ THEO TRANG (LỌC, TÌM KIẾM, SẮP XẾP)
+@router.get("/tasks/{task_id}/rows")
+async def get_rows_page(
+    task_id: str,
+    status: str = Query("all", pattern="^(all|success|error)$"),
+    q: str | None = None,
+    column: str | None = None,
+    sort_by: str | None = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: str | None = None,
+    limit: int = Query(Settings.ROWS_PAGE_SIZE, ge=1, le=Settings.ROWS_PAGE_MAX_SIZE),
+):
+    task = get_task_meta(task_id)
+    if not task or task.get("status") != "preview_ready":
+        raise HTTPException(404, detail="Task không tồn tại hoặc chưa sẵn sàng")
+
+    try:
+        page = query_rows(task_id, status=status, search=q, search_column=column,
+                          sort_by=sort_by, order=order, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(400, detail="cursor không hợp lệ")
+    if page is None:
+        raise HTTPException(404, detail="Task không tồn tại")
+
+    return {
+        "data": {
+            "rows": page["rows"],
+            "next_cursor": page["next_cursor"],
+            "matched_rows": page["matched_rows"],
+            "total_rows": page["total_rows"],
+            "success_count": page["success_count"],
+            "fail_count": page["fail_count"],
+            "columns": task["columns"],
+        }
+    }
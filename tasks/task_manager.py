@@ -1,11 +1,19 @@
 # tasks/task_manager.py – BẢN HOÀN HẢO SAU KHI FIX BUG MẤT DỮ LIỆU
 import pandas as pd
 from sqlalchemy.orm import Session
-from core.models import Task, TaskEdit
+from core.models import Task, TaskEdit, TaskRowChunk
 from core.database import engine
 import json
-from sqlalchemy import update
+from sqlalchemy import update, insert, select, exists, literal, func
+from sqlalchemy.dialects.postgresql import JSONB, insert as postgresql_insert
+from sqlalchemy.orm import aliased, defer
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from bisect import bisect_left, bisect_right
+import heapq
+from core.conversion.utils import row_blob
+from config.settings import Settings
 from datetime import datetime, date
 
 def to_serializable(val):
@@ -49,12 +57,13 @@ def make_json_serializable(obj):
         except:
             return str(obj)  # Cuối cùng thì ép string
 
-def create_task(task_id: str, filename: str, filesize: int, suggested_workers: int = 1):
+def create_task(task_id: str, filename: str, filesize: int, suggested_workers: int = 1, content_hash: str = None):
     with Session(engine) as db:
         task = Task(
             task_id=task_id,
             filename=filename,
             filesize=filesize,
+            content_hash=content_hash,
             suggested_workers=suggested_workers,
             n_workers=suggested_workers,
             pending_groups=[],     
@@ -73,12 +82,13 @@ def create_task(task_id: str, filename: str, filesize: int, suggested_workers: i
 
 def update_task(task_id: str, **kwargs):
     with Session(engine) as db:
-        task = db.query(Task).filter(Task.task_id == task_id).first()
+        # Không đọc result khi chỉ cập nhật trạng thái / tiến độ
+        task = db.query(Task).options(defer(Task.result)).filter(Task.task_id == task_id).first()
         if not task:
             return False
 
         for key, value in kwargs.items():
-            if not hasattr(task, key):
+            if not hasattr(Task, key):
                 continue
 
             if key == "progress":
@@ -92,61 +102,875 @@ def update_task(task_id: str, **kwargs):
         db.commit()
         return True
 
+# Các cột nhỏ của task (không gồm dòng dữ liệu) – dùng cho poll trạng thái
+_TASK_STATUS_COLUMNS = (
+    Task.task_id, Task.filename, Task.filesize, Task.status, Task.progress, Task.message,
+    Task.created_at, Task.suggested_workers, Task.n_workers, Task.pending_groups,
+    Task.selected_groups, Task.columns, Task.step, Task.content_hash,
+)
+
+def _task_dict(row, result: dict) -> dict:
+    return {
+        "task_id": row.task_id,
+        "filename": row.filename,
+        "filesize": row.filesize,
+        "status": row.status,
+        "progress": row.progress,
+        "message": row.message or "",
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "suggested_workers": row.suggested_workers or 1,
+        "n_workers": row.n_workers or 1,
+        "pending_groups": row.pending_groups or [],
+        "selected_groups": row.selected_groups or [],
+        "columns": row.columns or [],
+        "step": row.step or 0,
+        "content_hash": row.content_hash,
+        "result": result,
+    }
+
+def get_task_meta(task_id: str) -> dict | None:
+    """
+    Task chỉ gồm metadata + bộ đếm, không có full_data: chỉ SELECT các cột nhỏ và
+    result - 'full_data' (Postgres bỏ full_data của task cũ ngay trên server).
+    Chi phí không phụ thuộc số dòng của file – dùng cho poll trạng thái, engine, kiểm tra quyền truy cập.
+    """
+    with Session(engine) as db:
+        row = (
+            db.query(*_TASK_STATUS_COLUMNS, Task.result.op("-")("full_data").label("result_meta"))
+            .filter(Task.task_id == task_id)
+            .first()
+        )
+        if not row:
+            return None
+        return _task_dict(row, row.result_meta or {})
+
 def get_task(task_id: str) -> dict | None:
+    """Task đầy đủ, result kèm full_data (đọc toàn bộ dòng) – chỉ dùng ở endpoint cần dữ liệu dòng"""
     with Session(engine) as db:
-        task = db.query(Task).filter(Task.task_id == task_id).first()
-        if not task:
+        row = (
+            db.query(*_TASK_STATUS_COLUMNS, Task.result)
+            .filter(Task.task_id == task_id)
+            .first()
+        )
+        if not row:
             return None
+        result = row.result or {}
+    return _task_dict(row, _with_full_data(task_id, result))
+
+def _with_full_data(task_id: str, result: dict) -> dict:
+    """
+    Dòng kết quả nằm ở task_row_chunks (tasks.result chỉ giữ metadata + bộ đếm) → ghép lại full_data như cũ.
+    Task cũ còn full_data trong tasks.result thì trả nguyên.
+    """
+    if result.get("row_chunks") and "full_data" not in result:
+        return {**result, "full_data": load_row_chunks(task_id)}
+    return result
+
+def result_metadata(result: dict) -> dict:
+    """result của task bỏ full_data (phần được lưu trong tasks.result)"""
+    return {k: v for k, v in (result or {}).items() if k != "full_data"}
+
+# ------------------- KẾT QUẢ THEO CHUNK DÒNG -------------------
+SUCCESS_STATUS = "Thành công"
+
+def count_success(rows: list) -> int:
+    """Số dòng statusState = Thành công (bộ đếm theo chunk)"""
+    return sum(1 for row in rows if row and row.get("statusState") == SUCCESS_STATUS)
+
+def _encode_chunk(rows: list) -> bytes:
+    """Dòng của 1 chunk → rows_blob (Arrow IPC nén zstd, xem core/conversion/utils/row_blob.py)"""
+    return row_blob.encode_rows(make_json_serializable(rows), Settings.ROW_BLOB_BATCH_ROWS)
+
+def save_row_chunk(task_id: str, chunk_index: int, start_row: int, rows: list) -> None:
+    """Ghi kết quả 1 chunk (sink của chuyển đổi dạng stream)"""
+    with Session(engine) as db:
+        db.add(TaskRowChunk(
+            task_id=task_id,
+            chunk_index=chunk_index,
+            start_row=start_row,
+            n_rows=len(rows),
+            rows_blob=_encode_chunk(rows),
+            success_count=count_success(rows),
+        ))
+        db.commit()
+
+def save_row_chunks(task_id: str, rows: list, chunk_rows: int) -> int:
+    """
+    Thay toàn bộ kết quả của task bằng rows, chia thành chunk chunk_rows dòng, trong 1 transaction
+    (dùng cho handler không stream và khi ghi lại kết quả đã merge edit). Trả về số chunk.
+    """
+    n_chunks = 0
+    with Session(engine) as db:
+        db.query(TaskRowChunk).filter(TaskRowChunk.task_id == task_id).delete()
+        for start_row in range(0, len(rows), chunk_rows):
+            chunk = rows[start_row:start_row + chunk_rows]
+            db.add(TaskRowChunk(
+                task_id=task_id,
+                chunk_index=n_chunks,
+                start_row=start_row,
+                n_rows=len(chunk),
+                rows_blob=_encode_chunk(chunk),
+                success_count=count_success(chunk),
+            ))
+            db.flush()
+            n_chunks += 1
+        db.commit()
+    return n_chunks
+
+def delete_row_chunks(task_id: str) -> None:
+    """Xóa kết quả theo chunk cũ (trước khi chuyển đổi lại)"""
+    with Session(engine) as db:
+        db.query(TaskRowChunk).filter(TaskRowChunk.task_id == task_id).delete()
+        db.commit()
+
+def load_row_chunks(task_id: str) -> list:
+    """Toàn bộ dòng kết quả theo đúng thứ tự chunk, dòng đã sửa lấy bản trong task_edits (xem _save_edits)"""
+    with Session(engine) as db:
+        chunks = (
+            db.query(TaskRowChunk.rows_blob, TaskRowChunk.rows)
+            .filter(TaskRowChunk.task_id == task_id)
+            .order_by(TaskRowChunk.chunk_index)
+            .all()
+        )
+        rows = [row for blob, chunk_rows in chunks for row in _chunk_rows(blob, chunk_rows)]
+        for row_index, edited_row in db.query(TaskEdit.row_index, TaskEdit.edited_row).filter(TaskEdit.task_id == task_id):
+            if 0 <= row_index < len(rows):
+                rows[row_index] = {**(rows[row_index] or {}), **(edited_row or {})}
+        return rows
+
+def _chunk_rows(blob, rows) -> list:
+    """Dòng của 1 chunk: giải mã rows_blob; chunk cũ chưa có blob đọc thẳng rows JSONB"""
+    return row_blob.decode_rows(blob) if blob is not None else (rows or [])
+
+def _chunk_table(db: Session, chunk_id: int) -> pa.Table:
+    """Dòng gốc (chưa ghép edit) của 1 chunk dạng Arrow Table; chunk cũ chưa có blob được mã hóa tạm từ rows JSONB"""
+    blob, rows = db.query(TaskRowChunk.rows_blob, TaskRowChunk.rows).filter(TaskRowChunk.id == chunk_id).one()
+    return row_blob.read_table(blob if blob is not None else row_blob.encode_rows(rows or []))
+
+def _chunk_bounds(db: Session, task_id: str) -> list:
+    """(id, start_row, n_rows, success_count) các chunk của task theo thứ tự dòng – không đọc dữ liệu dòng"""
+    return (
+        db.query(TaskRowChunk.id, TaskRowChunk.start_row, TaskRowChunk.n_rows, TaskRowChunk.success_count)
+        .filter(TaskRowChunk.task_id == task_id)
+        .order_by(TaskRowChunk.start_row)
+        .all()
+    )
+
+def _edits_in(db: Session, task_id: str, start_row: int, stop_row: int) -> dict:
+    """{row_index: edited_row} các dòng đã sửa có vị trí trong [start_row, stop_row)"""
+    return dict(
+        db.query(TaskEdit.row_index, TaskEdit.edited_row)
+        .filter(TaskEdit.task_id == task_id, TaskEdit.row_index >= start_row, TaskEdit.row_index < stop_row)
+        .all()
+    )
 
-        return {
-            "task_id": task.task_id,
-            "filename": task.filename,
-            "filesize": task.filesize,
-            "status": task.status,
-            "progress": task.progress,
-            "message": task.message or "",
-            "created_at": task.created_at.isoformat() if task.created_at else None,
-            "suggested_workers": task.suggested_workers or 1,
-            "n_workers": task.n_workers or 1,
-            "pending_groups": task.pending_groups or [],
-            "selected_groups": task.selected_groups or [],
-            "columns": task.columns or [],
-            "step": task.step or 0,
-            "result": task.result or {}
-        }
-
-def get_merged_full_data(task_id: str):
-    """Trả về full_data đã được MERGE (không ghi đè) các edit thủ công"""
-    task = get_task(task_id)
-    if not task or not task.get("result") or "full_data" not in task["result"]:
+def _current_rows(table: pa.Table, edits: dict, start_row: int, offsets: list) -> list:
+    """Dòng hiện tại tại các vị trí offsets (trong chunk, theo đúng thứ tự) – dòng đã sửa lấy bản trong task_edits"""
+    if not offsets:
         return []
+    rows = row_blob.table_to_rows(table.take(pa.array(offsets, type=pa.int64())))
+    return [
+        {**row, **(edits[start_row + offset] or {})} if start_row + offset in edits else row
+        for offset, row in zip(offsets, rows)
+    ]
+
+def _rows_at(db: Session, task_id: str, chunk, row_indexes: list) -> dict:
+    """
+    {row_index: dòng hiện tại} các dòng row_indexes cùng thuộc chunk (id, start_row, ...)
+    – chỉ giải nén các record batch chứa các dòng đó.
+    """
+    chunk_id, start_row = chunk[0], chunk[1]
+    blob, rows = db.query(TaskRowChunk.rows_blob, TaskRowChunk.rows).filter(TaskRowChunk.id == chunk_id).one()
+    offsets = [row_index - start_row for row_index in row_indexes]
+    base = row_blob.take_rows(blob, offsets) if blob is not None else [(rows or [])[offset] for offset in offsets]
+    edits = _edits_in(db, task_id, min(row_indexes), max(row_indexes) + 1)
+    return {
+        row_index: {**(row or {}), **(edits[row_index] or {})} if row_index in edits else row
+        for row_index, row in zip(row_indexes, base)
+    }
+
+def _true_offsets(mask) -> list:
+    """Vị trí các phần tử True (null = False) của mảng bool Arrow"""
+    return np.flatnonzero(pc.fill_null(mask, False).to_numpy(zero_copy_only=False)).tolist()
+
+# ------------------- DÙNG LẠI KẾT QUẢ ĐÃ CHUYỂN ĐỔI -------------------
+def find_reusable_result(result_key: str, exclude_task_id: str) -> str | None:
+    """
+    Task khác đã chuyển đổi xong với cùng result_key (cùng file, nhóm địa chỉ, mapping)
+    và chưa có chỉnh sửa thủ công nào (kết quả còn nguyên như lúc chuyển đổi).
+    Chỉ là ứng viên: copy_task_result kiểm tra lại dưới khóa trước khi chép.
+    """
+    with Session(engine) as db:
+        row = (
+            db.query(Task.task_id)
+            .filter(
+                Task.result_key == result_key,
+                Task.task_id != exclude_task_id,
+                Task.status == "preview_ready",
+                ~exists().where(TaskEdit.task_id == Task.task_id),
+            )
+            .order_by(Task.updated_at.desc())
+            .first()
+        )
+        return row[0] if row else None
+
+def copy_task_result(src_task_id: str, dst_task_id: str) -> tuple | None:
+    """
+    Chép kết quả của src sang dst ngay trong Postgres (INSERT ... SELECT các chunk dòng,
+    UPDATE result bằng subquery) – dữ liệu dòng không đi qua app.
+    Kiểm tra và chép trong cùng 1 transaction: src bị khóa (_lock_task) rồi kiểm tra lại vẫn sẵn sàng
+    và chưa có edit → edit đồng thời của src phải chờ, không lọt vào bản chép.
+    result chép sang bỏ edits_version (dst chưa có edit nào, bộ đếm tự khởi tạo ở lần sửa đầu).
+    Trả về (result không kèm full_data, columns) của src; None nếu src không còn dùng lại được.
+    """
+    src = aliased(Task)
+    with Session(engine) as db:
+        if not _lock_task(db, src_task_id):
+            return None
+        meta = (
+            db.query(src.result.op("-")("full_data").op("-")("edits_version"), src.columns)
+            .filter(
+                src.task_id == src_task_id,
+                src.status == "preview_ready",
+                src.result.isnot(None),
+                ~exists().where(TaskEdit.task_id == src.task_id),
+            )
+            .first()
+        )
+        if not meta:
+            db.rollback()
+            return None
+        result_meta, columns = meta
+
+        db.query(TaskRowChunk).filter(TaskRowChunk.task_id == dst_task_id).delete()
+        db.execute(
+            insert(TaskRowChunk).from_select(
+                ["task_id", "chunk_index", "start_row", "n_rows", "rows", "rows_blob", "success_count"],
+                select(
+                    literal(dst_task_id),
+                    TaskRowChunk.chunk_index,
+                    TaskRowChunk.start_row,
+                    TaskRowChunk.n_rows,
+                    TaskRowChunk.rows,
+                    TaskRowChunk.rows_blob,
+                    TaskRowChunk.success_count,
+                ).where(TaskRowChunk.task_id == src_task_id),
+            )
+        )
+        db.execute(
+            update(Task)
+            .where(Task.task_id == dst_task_id)
+            .values(
+                result=select(src.result.op("-")("edits_version")).where(src.task_id == src_task_id).scalar_subquery(),
+                columns=columns,
+            )
+        )
+        db.commit()
+        return result_meta, columns
+
+# ------------------- SỬA 1 DÒNG -------------------
+def _load_row(db: Session, task_id: str, row_index: int) -> dict | None:
+    """
+    Đọc đúng 1 dòng (đã gồm edit) theo vị trí: chunk chứa dòng tìm qua index (task_id, start_row),
+    chỉ giải nén record batch chứa dòng (xem _rows_at). Task cũ: result -> 'full_data' -> row_index.
+    """
+    chunk = (
+        db.query(TaskRowChunk.id, TaskRowChunk.start_row)
+        .filter(
+            TaskRowChunk.task_id == task_id,
+            TaskRowChunk.start_row <= row_index,
+            TaskRowChunk.start_row + TaskRowChunk.n_rows > row_index,
+        )
+        .first()
+    )
+    if chunk is not None:
+        return _rows_at(db, task_id, chunk, [row_index]).get(row_index)
+
+    edited = (
+        db.query(TaskEdit.edited_row)
+        .filter(TaskEdit.task_id == task_id, TaskEdit.row_index == row_index)
+        .first()
+    )
+    row = (
+        db.query(Task.result.op("->", return_type=JSONB)("full_data").op("->", return_type=JSONB)(row_index))
+        .filter(Task.task_id == task_id)
+        .first()
+    )
+    if not row:
+        return None
+    return {**(row[0] or {}), **(edited[0] or {})} if edited and row[0] is not None else row[0]
+
+def _find_row_index(db: Session, task_id: str, row_id: str) -> tuple | None:
+    """
+    id → (vị trí dòng, dòng hiện tại). Handler gán id = vị trí + 1 nên thử thẳng vị trí id - 1;
+    id không khớp (dữ liệu lạ) mới quét cột id của mọi chunk.
+    """
+    try:
+        row_index = int(row_id) - 1
+    except (TypeError, ValueError):
+        row_index = -1
+    if row_index >= 0:
+        row = _load_row(db, task_id, row_index)
+        if row is not None and str(row.get("id")) == str(row_id):
+            return row_index, row
+
+    found = _rows_by_id(db, task_id, [str(row_id)])
+    if not found:
+        return None
+    row_index = min(found)
+    return row_index, found[row_index]
+
+def _rows_by_id(db: Session, task_id: str, row_ids: list) -> dict:
+    """{row_index: dòng hiện tại} các dòng có id (dạng chuỗi) thuộc row_ids – quét cột id của mọi chunk bằng pyarrow"""
+    wanted = pa.array([str(row_id) for row_id in row_ids], type=pa.string())
+    found = {}
+    for chunk_id, start_row, n_rows, _ in _chunk_bounds(db, task_id):
+        table = _chunk_table(db, chunk_id)
+        offsets = _true_offsets(pc.is_in(row_blob.column_text(table, "id"), value_set=wanted))
+        if offsets:
+            edits = _edits_in(db, task_id, start_row, start_row + n_rows)
+            found.update(zip((start_row + offset for offset in offsets), _current_rows(table, edits, start_row, offsets)))
+    return found
+
+# Số edit mỗi câu INSERT ... ON CONFLICT khi sửa hàng loạt
+EDIT_BATCH_ROWS = 1000
+
+def _chunk_of(bounds: list):
+    """Hàm row_index → chunk (id, start_row, n_rows, success_count) chứa dòng, None nếu ngoài phạm vi"""
+    starts = [chunk[1] for chunk in bounds]
+
+    def chunk_of(row_index: int):
+        pos = bisect_right(starts, row_index) - 1
+        if pos < 0:
+            return None
+        chunk = bounds[pos]
+        return chunk if row_index < chunk[1] + chunk[2] else None
+    return chunk_of
+
+def _recount_chunks(db: Session, task_id: str) -> None:
+    """
+    Đếm lại success_count (tính cả edit) của các chunk có edit hoặc chưa có bộ đếm – chỉ ghi cột đếm,
+    chỉ giải mã cột statusState.
+    """
+    edited = sorted(row_index for (row_index,) in db.query(TaskEdit.row_index).filter(TaskEdit.task_id == task_id))
+    for chunk_id, start_row, n_rows, success_count in _chunk_bounds(db, task_id):
+        pos = bisect_left(edited, start_row)
+        if success_count is not None and (pos == len(edited) or edited[pos] >= start_row + n_rows):
+            continue
+        statuses = row_blob.column_values(_chunk_table(db, chunk_id), "statusState")
+        for row_index, edited_row in _edits_in(db, task_id, start_row, start_row + n_rows).items():
+            if "statusState" in (edited_row or {}):
+                statuses[row_index - start_row] = edited_row["statusState"]
+        db.execute(
+            update(TaskRowChunk)
+            .where(TaskRowChunk.id == chunk_id)
+            .values(success_count=sum(1 for status in statuses if status == SUCCESS_STATUS))
+        )
 
-    full_data = task["result"]["full_data"][:] 
-    final_order = list(dict.fromkeys(task.get("columns", []) + ["id"]))
+def _ensure_merged_view(db: Session, task_id: str) -> None:
+    """
+    (Task đã bị khóa) Từ khi có result.edits_version, bộ đếm theo chunk luôn tính cả edit (cập nhật lúc ghi).
+    Kết quả chưa có edits_version (edit lưu trước đây, hoặc kết quả mới chuyển đổi lại) → đếm lại 1 lần
+    các chunk có edit, tính lại success_count / fail_count của task từ bộ đếm theo chunk
+    (edit cũ có thể chưa được tính vào tổng của kết quả mới) rồi đặt edits_version = 0.
+    """
+    pending = db.query(Task.result.has_key("edits_version")).filter(Task.task_id == task_id).scalar()
+    if pending is not False:
+        return
+    _recount_chunks(db, task_id)
+    result = func.jsonb_set(Task.result, "{edits_version}", func.to_jsonb(0))
+    n_chunks, total_rows, success_count = db.query(
+        func.count(TaskRowChunk.id),
+        func.coalesce(func.sum(TaskRowChunk.n_rows), 0),
+        func.coalesce(func.sum(TaskRowChunk.success_count), 0),
+    ).filter(TaskRowChunk.task_id == task_id).one()
+    if n_chunks:
+        result = func.jsonb_set(
+            func.jsonb_set(result, "{success_count}", func.to_jsonb(int(success_count))),
+            "{fail_count}",
+            func.to_jsonb(int(total_rows - success_count)),
+        )
+    db.execute(
+        update(Task)
+        .where(Task.task_id == task_id)
+        .values(result=result)
+    )
+
+def ensure_merged_view(task_id: str) -> None:
+    """Xem _ensure_merged_view; task đã sẵn sàng thì chỉ tốn 1 truy vấn kiểm tra"""
+    with Session(engine) as db:
+        if db.query(Task.result.has_key("edits_version")).filter(Task.task_id == task_id).scalar() is not False:
+            return
+        _lock_task(db, task_id)
+        db.commit()
+
+def _lock_task(db: Session, task_id: str) -> bool:
+    """
+    Khóa dòng tasks (FOR UPDATE) để các edit đồng thời của cùng task không đếm trùng,
+    rồi đảm bảo bộ đếm theo chunk đã tính các edit cũ (xem _ensure_merged_view).
+    """
+    if db.query(Task.task_id).filter(Task.task_id == task_id).with_for_update().first() is None:
+        return False
+    _ensure_merged_view(db, task_id)
+    return True
+
+def _save_edits(db: Session, task_id: str, targets: dict) -> tuple:
+    """
+    (Task đã bị khóa) targets: {row_index: (dòng hiện tại, thay đổi)} – dòng hiện tại đã gồm các edit trước đó.
+    Dòng mới = dòng hiện tại + thay đổi, statusState = Thành công, được ghép 1 lần lúc ghi và lưu đầy đủ
+    trong task_edits (original_row giữ bản trước lần sửa đầu tiên) – đọc chỉ cần thay dòng, không replay edit.
+    Chunk dòng (nén, hàng chục nghìn dòng) không bị ghi lại; chỉ bộ đếm thay đổi:
+      - success_count theo chunk và success_count / fail_count của task, tính tăng dần,
+      - result.edits_version tăng 1 mỗi lần lưu.
+    Trả về (list edited_row theo thứ tự targets, (total_rows, success_count, fail_count, edits_version)).
+    """
+    chunk_of = _chunk_of(_chunk_bounds(db, task_id))
+    values = []
+    fixed_by_chunk = {}
+    for row_index, (current_row, changes) in targets.items():
+        if current_row.get("statusState") != SUCCESS_STATUS:
+            chunk = chunk_of(row_index)
+            chunk_id = chunk[0] if chunk is not None else None
+            fixed_by_chunk[chunk_id] = fixed_by_chunk.get(chunk_id, 0) + 1
+        values.append({
+            "task_id": task_id,
+            "row_index": row_index,
+            "original_row": current_row,
+            "edited_row": make_json_serializable({
+                **current_row,
+                **changes,
+                "statusState": SUCCESS_STATUS,
+            }),
+        })
+
+    for start in range(0, len(values), EDIT_BATCH_ROWS):
+        stmt = postgresql_insert(TaskEdit).values(values[start:start + EDIT_BATCH_ROWS])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["task_id", "row_index"],
+            set_={
+                "edited_row": stmt.excluded.edited_row,
+                "edited_at": func.now(),
+            },
+        )
+        db.execute(stmt)
+
+    # Dòng lỗi → thành công: chuyển n_fixed đơn vị từ fail_count sang success_count
+    n_fixed = sum(fixed_by_chunk.values())
+    for chunk_id, n in fixed_by_chunk.items():
+        if chunk_id is not None:
+            db.execute(
+                update(TaskRowChunk)
+                .where(TaskRowChunk.id == chunk_id)
+                .values(success_count=TaskRowChunk.success_count + n)
+            )
+    result = func.jsonb_set(
+        Task.result, "{edits_version}",
+        func.to_jsonb(func.coalesce(Task.result["edits_version"].as_integer(), 0) + 1),
+    )
+    if n_fixed:
+        result = func.jsonb_set(
+            func.jsonb_set(
+                result, "{success_count}",
+                func.to_jsonb(Task.result["success_count"].as_integer() + n_fixed),
+            ),
+            "{fail_count}",
+            func.to_jsonb(Task.result["fail_count"].as_integer() - n_fixed),
+        )
+    counters = db.execute(
+        update(Task)
+        .where(Task.task_id == task_id)
+        .values(result=result, step=2)
+        .returning(
+            Task.result["total_rows"].as_integer(),
+            Task.result["success_count"].as_integer(),
+            Task.result["fail_count"].as_integer(),
+            Task.result["edits_version"].as_integer(),
+        )
+    ).first()
+    return [v["edited_row"] for v in values], tuple(counters)
+
+def edit_row(task_id: str, row_id: str, changes: dict) -> dict | None:
+    """
+    Lưu chỉnh sửa 1 dòng theo id, chi phí không phụ thuộc số dòng của task:
+      - Dòng hiện tại đọc trực tiếp theo vị trí (xem _find_row_index / _load_row).
+      - Edit upsert theo khóa (task_id, row_index) và ghép ngay vào chunk chứa dòng.
+      - success_count / fail_count cập nhật tăng dần từ statusState cũ → mới, ngay trong Postgres.
+    Trả về None nếu không tìm thấy dòng.
+    """
+    migrate_legacy_result(task_id)
+    with Session(engine) as db:
+        if not _lock_task(db, task_id):
+            return None
+
+        found = _find_row_index(db, task_id, row_id)
+        if found is None:
+            return None
+        row_index, current_row = found
+
+        edited_rows, (total_rows, success_count, fail_count, edits_version) = _save_edits(
+            db, task_id, {row_index: (current_row, changes)}
+        )
+        db.commit()
 
+    return {
+        "row_index": row_index,
+        "updated_row": edited_rows[0],
+        "total_rows": total_rows,
+        "success_count": success_count,
+        "fail_count": fail_count,
+        "edits_version": edits_version,
+    }
+
+def edit_rows(task_id: str, patches: list) -> dict | None:
+    """
+    Sửa hàng loạt theo id: patches = [{"id": ..., <cột>: <giá trị mới>, ...}] (id trùng → patch sau ghi đè).
+    Dòng đọc theo vị trí id - 1 (mỗi chunk giải nén 1 lần, chỉ các record batch chứa dòng cần),
+    id không khớp thì quét cột id; lưu theo lô, đếm lại 1 lần.
+    Trả về None nếu task không tồn tại.
+    """
+    changes_by_id = {}
+    for patch in patches:
+        row_id = str(patch.get("id"))
+        changes_by_id.setdefault(row_id, {}).update({k: v for k, v in patch.items() if k != "id"})
+
+    migrate_legacy_result(task_id)
     with Session(engine) as db:
-        edits = db.query(TaskEdit).filter(TaskEdit.task_id == task_id).order_by(TaskEdit.edited_at).all()
-        for edit in edits:
-            idx = edit.row_index
-            if 0 <= idx < len(full_data):
-                original_row = full_data[idx] or {}  
-                edited_row = edit.edited_row or {}  
+        if not _lock_task(db, task_id):
+            return None
+
+        index_of = {}
+        for row_id in changes_by_id:
+            try:
+                if int(row_id) >= 1:
+                    index_of[int(row_id) - 1] = row_id
+            except ValueError:
+                pass
+        chunk_of = _chunk_of(_chunk_bounds(db, task_id))
+        indexes_by_chunk = {}
+        for row_index in sorted(index_of):
+            chunk = chunk_of(row_index)
+            if chunk is not None:
+                indexes_by_chunk.setdefault(chunk, []).append(row_index)
+        targets = {}
+        for chunk, row_indexes in indexes_by_chunk.items():
+            for row_index, row in _rows_at(db, task_id, chunk, row_indexes).items():
+                row_id = index_of[row_index]
+                if str(row.get("id")) == row_id:
+                    targets[row_index] = (row, changes_by_id[row_id])
+
+        found_ids = {index_of[i] for i in targets}
+        missing = [row_id for row_id in changes_by_id if row_id not in found_ids]
+        if missing:
+            for row_index, row in sorted(_rows_by_id(db, task_id, missing).items()):
+                row_id = str(row.get("id"))
+                if row_index not in targets:
+                    targets[row_index] = (row, changes_by_id[row_id])
+                    found_ids.add(row_id)
+
+        edited_rows, (total_rows, success_count, fail_count, edits_version) = _save_edits(db, task_id, targets)
+        db.commit()
+
+    return {
+        "edited": len(edited_rows),
+        "not_found": [row_id for row_id in changes_by_id if row_id not in found_ids],
+        "total_rows": total_rows,
+        "success_count": success_count,
+        "fail_count": fail_count,
+        "edits_version": edits_version,
+    }
+
+def edit_rows_matching(task_id: str, match: dict, changes: dict) -> dict | None:
+    """
+    Sửa hàng loạt theo quy tắc: gán changes cho mọi dòng có các cột khớp đúng match
+    (vd cùng 1 tên xã viết sai trên hàng nghìn dòng). So khớp trên dòng đã sửa: mỗi chunk lọc dữ liệu gốc
+    bằng mask pyarrow của _table_mask, chỉ dòng khớp (và dòng đã sửa) được giải mã đầy đủ và kiểm tra lại.
+    Trả về None nếu task không tồn tại.
+    """
+    migrate_legacy_result(task_id)
+    with Session(engine) as db:
+        if not _lock_task(db, task_id):
+            return None
 
-                merged_row = {**original_row, **edited_row}
-                full_data[idx] = merged_row
+        match = make_json_serializable(match)
+        targets = {}
+        for chunk_id, start_row, n_rows, _ in _chunk_bounds(db, task_id):
+            table = _chunk_table(db, chunk_id)
+            mask = _table_mask(table, "all", None, [], match=match)
+            offsets = set(range(table.num_rows)) if mask is None else set(_true_offsets(mask))
+            edits = _edits_in(db, task_id, start_row, start_row + n_rows)
+            offsets = sorted(offsets | {row_index - start_row for row_index in edits})
+            for offset, row in zip(offsets, _current_rows(table, edits, start_row, offsets)):
+                if all(key in row and row[key] == value for key, value in match.items()):
+                    targets[start_row + offset] = (row, changes)
 
-    if final_order:
-        full_data = [
-            {col: row.get(col, "") for col in final_order} for row in full_data
+        edited_rows, (total_rows, success_count, fail_count, edits_version) = _save_edits(db, task_id, targets)
+        db.commit()
+
+    return {
+        "edited": len(edited_rows),
+        "not_found": [],
+        "total_rows": total_rows,
+        "success_count": success_count,
+        "fail_count": fail_count,
+        "edits_version": edits_version,
+    }
+
+# ------------------- LỌC / TÌM KIẾM / PHÂN TRANG -------------------
+def _status_matches(status_value, status: str) -> bool:
+    if status == "success":
+        return status_value == SUCCESS_STATUS
+    if status == "error":
+        return status_value != SUCCESS_STATUS
+    return True
+
+def _row_matches(row: dict, status: str, search: str | None, search_columns: list) -> bool:
+    """Lọc trạng thái + tìm chuỗi con (không phân biệt hoa thường) trên 1 dòng – dùng cho dòng đã sửa"""
+    if not _status_matches(row.get("statusState"), status):
+        return False
+    if not search:
+        return True
+    needle = search.lower()
+    return any(row.get(col) is not None and needle in _jsonb_text(row[col]).lower() for col in search_columns)
+
+def _table_mask(table: pa.Table, status: str, search: str | None, search_columns: list, match: dict | None = None):
+    """
+    Như _row_matches nhưng trên cả chunk (dữ liệu gốc) bằng pyarrow.compute; None = mọi dòng.
+    match: thêm điều kiện các cột bằng đúng giá trị (xem row_blob.equals_value) – dùng cho sửa theo quy tắc.
+    """
+    mask = None
+    for key, value in (match or {}).items():
+        hits = row_blob.equals_value(table, key, value)
+        mask = hits if mask is None else pc.and_(mask, hits)
+    if status in ("success", "error"):
+        mask = pc.fill_null(pc.equal(row_blob.column_text(table, "statusState"), SUCCESS_STATUS), False)
+        if status == "error":
+            mask = pc.invert(mask)
+    if search:
+        hits = pa.chunked_array([pa.array([False] * table.num_rows)])
+        for col in search_columns:
+            if col in table.column_names:
+                hits = pc.or_(hits, row_blob.contains_text(table, col, search))
+        mask = hits if mask is None else pc.and_(mask, hits)
+    return mask
+
+def _matched_offsets(db: Session, task_id: str, chunk, status: str, search: str | None, search_columns: list) -> tuple:
+    """
+    (vị trí trong chunk tăng dần, table, edits) các dòng hiện tại của chunk (id, start_row, n_rows) khớp lọc:
+    dữ liệu gốc lọc theo cột bằng pyarrow.compute, riêng dòng đã sửa được xét lại trên bản trong task_edits.
+    """
+    chunk_id, start_row, n_rows = chunk
+    table = _chunk_table(db, chunk_id)
+    mask = _table_mask(table, status, search, search_columns)
+    offsets = set(range(table.num_rows)) if mask is None else set(_true_offsets(mask))
+    edits = _edits_in(db, task_id, start_row, start_row + n_rows)
+    if edits and mask is not None:
+        edited_offsets = sorted(row_index - start_row for row_index in edits)
+        for offset, row in zip(edited_offsets, _current_rows(table, edits, start_row, edited_offsets)):
+            if _row_matches(row, status, search, search_columns):
+                offsets.add(offset)
+            else:
+                offsets.discard(offset)
+    return sorted(offsets), table, edits
+
+def _sort_keys(table: pa.Table, edits: dict, start_row: int, offsets: list, sort_by: str) -> list:
+    """Giá trị chuỗi (như ->>, None → '') của cột sort_by tại các vị trí offsets, dòng đã sửa lấy bản trong task_edits"""
+    texts = row_blob.column_text(table, sort_by).to_pylist()
+    edited_offsets = [offset for offset in offsets if start_row + offset in edits]
+    edited_rows = dict(zip(edited_offsets, _current_rows(table, edits, start_row, edited_offsets)))
+    keys = []
+    for offset in offsets:
+        if offset in edited_rows:
+            value = edited_rows[offset].get(sort_by)
+            value = None if value is None else _jsonb_text(value)
+        else:
+            value = texts[offset]
+        keys.append("" if value is None else value)
+    return keys
+
+def _candidate_chunks(db: Session, task_id: str, status: str) -> list:
+    """
+    (id, start_row, n_rows) các chunk có thể chứa dòng khớp trạng thái, theo thứ tự dòng.
+    Bỏ qua nhờ bộ đếm theo chunk (đã tính cả edit): lọc lỗi → chunk toàn dòng thành công;
+    lọc thành công → chunk không có dòng thành công nào. Chunk chưa có bộ đếm luôn được đọc.
+    """
+    chunks = _chunk_bounds(db, task_id)
+    if status == "error":
+        chunks = [c for c in chunks if c.success_count is None or c.success_count < c.n_rows]
+    elif status == "success":
+        chunks = [c for c in chunks if c.success_count is None or c.success_count > 0]
+    return [(c.id, c.start_row, c.n_rows) for c in chunks]
+
+def _parse_cursor(cursor: str | None, sort_by: str | None):
+    """cursor: vị trí dòng cuối trang trước (sắp theo thứ tự dòng) hoặc [giá trị cột, vị trí] (sắp theo cột)"""
+    if cursor is None:
+        return None
+    value = json.loads(cursor)
+    if sort_by is None and isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if (sort_by is not None and isinstance(value, list) and len(value) == 2
+            and isinstance(value[0], str) and isinstance(value[1], int)):
+        return value
+    raise ValueError("cursor không hợp lệ")
+
+def query_rows(task_id: str, status: str = "all", search: str | None = None, search_column: str | None = None,
+               sort_by: str | None = None, order: str = "asc", cursor: str | None = None,
+               limit: int | None = 100) -> dict | None:
+    """
+    1 trang dòng kết quả (đã ghép edit) với lọc trạng thái (all / success / error), tìm chuỗi con
+    (1 cột hoặc mọi cột) và phân trang keyset: next_cursor của trang trước → cursor của trang sau.
+      - Mặc định sắp theo thứ tự dòng (id): đọc lần lượt từng chunk đến khi đủ trang,
+        chunk không thể có dòng khớp trạng thái bị bỏ qua (xem _candidate_chunks).
+      - sort_by = tên cột: sắp theo giá trị chuỗi của cột (so theo code point) rồi theo vị trí dòng;
+        phải quét mọi chunk ứng viên, chỉ các dòng của trang được giải mã đầy đủ.
+      - Mỗi chunk được lọc theo cột trên blob Arrow (xem _matched_offsets).
+      - Dòng trả về chỉ gồm các cột của task rồi id (final_order), cột thiếu → ''.
+      - limit=None → trả về tất cả dòng khớp.
+      - matched_rows: số dòng khớp – lấy từ bộ đếm của task khi không tìm kiếm,
+        có tìm kiếm thì chỉ đếm ở trang đầu (cursor rỗng), các trang sau là None.
+    Trả về None nếu task không tồn tại; cursor sai → ValueError.
+    """
+    after = _parse_cursor(cursor, sort_by)
+    descending = order == "desc"
+    migrate_legacy_result(task_id)
+    ensure_merged_view(task_id)
+
+    with Session(engine) as db:
+        counters = (
+            db.query(
+                Task.result["total_rows"].as_integer(),
+                Task.result["success_count"].as_integer(),
+                Task.result["fail_count"].as_integer(),
+                Task.columns,
+            )
+            .filter(Task.task_id == task_id)
+            .first()
+        )
+        if counters is None:
+            return None
+        total_rows, success_count, fail_count, columns = counters
+
+        chunks = _candidate_chunks(db, task_id, status)
+        final_order = list(dict.fromkeys((columns or []) + ["id"]))
+        search_columns = [search_column] if search_column else final_order
+        fetch = None if limit is None else limit + 1
+
+        def matched(chunk):
+            return _matched_offsets(db, task_id, chunk, status, search, search_columns)
+
+        if search:
+            matched_rows = None
+            if cursor is None:
+                matched_rows = sum(len(matched(chunk)[0]) for chunk in chunks)
+        else:
+            matched_rows = {"success": success_count, "error": fail_count}.get(status, total_rows)
+
+        rows = []
+        if sort_by is None:
+            # Theo thứ tự dòng: chunk nằm hết trước cursor bị bỏ qua, đọc từng chunk đến khi đủ trang
+            if after is not None:
+                chunks = [c for c in chunks if (c[1] < after if descending else c[1] + c[2] > after + 1)]
+            if descending:
+                chunks = chunks[::-1]
+            for chunk in chunks:
+                if fetch is not None and len(rows) >= fetch:
+                    break
+                start_row = chunk[1]
+                offsets, table, edits = matched(chunk)
+                if descending:
+                    offsets = offsets[::-1]
+                if after is not None:
+                    offsets = [o for o in offsets if (start_row + o < after if descending else start_row + o > after)]
+                if fetch is not None:
+                    offsets = offsets[:fetch - len(rows)]
+                rows.extend(zip((start_row + o for o in offsets), _current_rows(table, edits, start_row, offsets)))
+        else:
+            keyed = []
+            for chunk in chunks:
+                start_row = chunk[1]
+                offsets, table, edits = matched(chunk)
+                keys = _sort_keys(table, edits, start_row, offsets, sort_by)
+                keyed.extend(zip(keys, (start_row + o for o in offsets)))
+            if after is not None:
+                after = tuple(after)
+                keyed = [k for k in keyed if (k < after if descending else k > after)]
+            if fetch is None:
+                keyed.sort(reverse=descending)
+            else:
+                keyed = (heapq.nlargest if descending else heapq.nsmallest)(fetch, keyed)
+
+            # Chỉ các dòng của trang được giải mã đầy đủ, theo từng chunk
+            chunk_of = _chunk_of(_chunk_bounds(db, task_id))
+            indexes_by_chunk = {}
+            for _, row_index in keyed:
+                indexes_by_chunk.setdefault(chunk_of(row_index), []).append(row_index)
+            current = {}
+            for chunk, row_indexes in indexes_by_chunk.items():
+                current.update(_rows_at(db, task_id, chunk, row_indexes))
+            rows = [(row_index, current[row_index]) for _, row_index in keyed]
+
+    next_cursor = None
+    if fetch is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last_index, last_row = rows[-1]
+        if sort_by is None:
+            next_cursor = json.dumps(last_index)
+        else:
+            last_key = last_row.get(sort_by)
+            next_cursor = json.dumps(["" if last_key is None else _jsonb_text(last_key), last_index], ensure_ascii=False)
+
+    # Chiếu về final_order: các cột của task theo thứ tự rồi id, dòng thiếu cột → ''
+    return {
+        "rows": [{col: row.get(col, "") for col in final_order} for _, row in rows],
+        "next_cursor": next_cursor,
+        "matched_rows": matched_rows,
+        "total_rows": total_rows,
+        "success_count": success_count,
+        "fail_count": fail_count,
+    }
+
+def _jsonb_text(value) -> str:
+    """Giá trị như toán tử ->> của Postgres trả về (chuỗi giữ nguyên, số / bool / object → JSON)"""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+def migrate_legacy_result(task_id: str) -> bool:
+    """
+    Chuyển kết quả dạng cũ của task sang dạng hiện tại, trả về True nếu đã chuyển:
+      - full_data trong tasks.result → task_row_chunks, tasks.result chỉ còn metadata;
+      - chunk còn rows JSONB (chưa có rows_blob) → mã hóa sang rows_blob, từng chunk 1 transaction.
+    """
+    with Session(engine) as db:
+        legacy = db.query(Task.result).filter(Task.task_id == task_id, Task.result.has_key("full_data")).first()
+        legacy_chunks = [
+            chunk_id for (chunk_id,) in
+            db.query(TaskRowChunk.id).filter(TaskRowChunk.task_id == task_id, TaskRowChunk.rows_blob.is_(None))
         ]
-    
-    return full_data
+    if legacy:
+        result = legacy[0]
+        n_chunks = save_row_chunks(task_id, result["full_data"], Settings.STREAM_CHUNK_ROWS)
+        update_task(task_id, result={**result_metadata(result), "row_chunks": n_chunks})
+        return True
+
+    for chunk_id in legacy_chunks:
+        with Session(engine) as db:
+            rows = db.query(TaskRowChunk.rows).filter(TaskRowChunk.id == chunk_id, TaskRowChunk.rows_blob.is_(None)).scalar()
+            if rows is None:
+                continue
+            db.execute(
+                update(TaskRowChunk)
+                .where(TaskRowChunk.id == chunk_id, TaskRowChunk.rows_blob.is_(None))
+                .values(rows_blob=row_blob.encode_rows(rows, Settings.ROW_BLOB_BATCH_ROWS), rows=None)  # rows JSONB đã serializable
+            )
+            db.commit()
+    return bool(legacy_chunks)
 
 def apply_edits_to_result(task_id: str):
-    """Dùng khi tải file: merge tất cả edit vào result.full_data để xuất file sạch 100%"""
-    merged = get_merged_full_data(task_id)
-    current_result = get_task(task_id).get("result", {})
-    update_task(
-        task_id,
-        result={**current_result, "full_data": merged}
-    )
\ No newline at end of file
+    """
+    Dùng khi tải file: dòng đã sửa được ghép sẵn lúc ghi (xem _save_edits) và get_task / load_row_chunks
+    đọc thẳng bản đó, nên không còn đọc / ghi lại kết quả trước mỗi lần tải – chỉ đảm bảo bộ đếm theo chunk
+    của task cũ đã tính edit.
+    Task cũ còn full_data trong tasks.result được chuyển sang task_row_chunks trước.
+    """
+    migrate_legacy_result(task_id)
+    ensure_merged_view(task_id)
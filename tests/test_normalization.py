@@ -0,0 +1,96 @@
+# tests/test_normalization.py
+"""
+So sánh chuẩn hóa mới (vietnamese_code có bảng âm tiết + đường nhanh ASCII, PlaceNormalizer biên dịch sẵn + cache)
+với bản cũ giữ nguyên văn trong tests/reference_normalization.py: mọi tên tỉnh / huyện / xã (cũ và mới)
+trong mapping.json, mỗi tên thêm các biến thể hoa thường, dấu thanh, dạng Unicode và khoảng trắng.
+
+Chạy: python -m unittest discover -s tests -t .   (hoặc pytest tests)
+"""
+import json
+import random
+import unicodedata
+import unittest
+
+from config.settings import Settings
+from core.conversion.utils import vietnamese_code
+from core.conversion.utils.normalizer import normalize_mapping_key, normalize_place
+from tests import reference_normalization as reference
+
+NAME_FIELDS = ("Tỉnh", "Tỉnh (CŨ)", "Huyện", "Huyện (CŨ)", "Xã", "Xã (CŨ)")
+# Dấu thanh dạng combining (NFD): huyền, sắc, hỏi, ngã, nặng
+TONE_MARKS = "̣̀́̉̃"
+VOWELS = "aăâeêioôơuưyAĂÂEÊIOÔƠUƯY"
+PREFIXES = ("", "Xã ", "phường ", "TT. ", "Q.", "district of ", "Thành Phố ")
+SUFFIXES = ("", " ward", " District", " province", ",", " - ", " (cũ)")
+
+def mapping_names() -> list:
+    """Mọi tên tỉnh / huyện / xã (cũ + mới) khác nhau trong mapping.json"""
+    with open(Settings.MAPPING_FILE, encoding="utf-8") as f:
+        rows = json.load(f)
+    return sorted({str(row.get(field, "")).strip() for row in rows for field in NAME_FIELDS} - {""})
+
+def move_tone(name: str) -> str:
+    """Dời dấu thanh sang nguyên âm kế trước / kế sau (vd hòa ↔ hoà) – kiểu gõ dấu cũ / sai vị trí"""
+    chars = list(unicodedata.normalize("NFD", name))
+    for i, ch in enumerate(chars):
+        if ch in TONE_MARKS and i >= 2 and chars[i - 1] in "aeiouyAEIOUY" and chars[i - 2] in VOWELS:
+            chars[i - 1], chars[i] = chars[i], chars[i - 1]
+            chars[i - 1], chars[i - 2] = chars[i - 2], chars[i - 1]
+    return unicodedata.normalize("NFC", "".join(chars))
+
+def variants(name: str, rng: random.Random) -> list:
+    """Các biến thể hoa thường / dấu thanh / dạng Unicode / khoảng trắng của 1 tên"""
+    mixed_case = "".join(ch.upper() if rng.random() < 0.5 else ch.lower() for ch in name)
+    forms = [
+        name, name.upper(), name.lower(), name.title(), name.swapcase(), mixed_case,
+        unicodedata.normalize("NFD", name), unicodedata.normalize("NFKD", mixed_case),
+        move_tone(name), move_tone(mixed_case), unicodedata.normalize("NFD", move_tone(name)),
+        f"  {name}  ", name.replace(" ", "  "), name.replace(" ", "\t"), f" {name}\n",
+    ]
+    forms.append(rng.choice(PREFIXES) + rng.choice(forms) + rng.choice(SUFFIXES))
+    return forms
+
+def random_strings(n: int, rng: random.Random) -> list:
+    """Chuỗi ngẫu nhiên từ chữ tiếng Việt, dấu combining, số, dấu câu và khoảng trắng"""
+    alphabet = list("abcdđghklmnpqrstvxĐ0123456789 .,-()/\t") + list(VOWELS) + list(TONE_MARKS)
+    alphabet += [ch for ch in vietnamese_code.reverse_map_any_case]
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 24))) for _ in range(n)]
+
+class NormalizationEquivalenceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(20251018)
+        cls.names = mapping_names()
+        cls.cases = list(dict.fromkeys(v for name in cls.names for v in variants(name, rng)))
+        cls.cases += random_strings(20000, rng)
+
+    def assertSameOutput(self, old, new, cases):
+        mismatches = []
+        for text in cases:
+            expected, actual = old(text), new(text)
+            if expected != actual:
+                mismatches.append((text, expected, actual))
+        self.assertEqual(mismatches[:20], [], f"{len(mismatches)} / {len(cases)} chuỗi khác kết quả")
+
+    def test_mapping_is_covered(self):
+        self.assertGreater(len(self.names), 9000)
+        self.assertGreater(len(self.cases), 100000)
+
+    def test_vietnamese_normalize_text(self):
+        self.assertSameOutput(reference.vietnamese_normalize_text, vietnamese_code.vietnamese_normalize_text, self.cases)
+
+    def test_normalize_place(self):
+        self.assertSameOutput(reference.normalize_place, normalize_place, self.cases)
+
+    def test_normalize_mapping_key(self):
+        triples = [tuple(self.cases[i:i + 3]) for i in range(0, len(self.cases) - 2, 3)]
+        self.assertSameOutput(
+            lambda t: reference.normalize_mapping_key(*t), lambda t: normalize_mapping_key(*t), triples
+        )
+
+    def test_non_string_values(self):
+        cases = [None, float("nan"), 0, 1, 1.0, 12.5, "", "0012", "  "]
+        self.assertSameOutput(reference.normalize_place, normalize_place, cases)
+
+if __name__ == "__main__":
+    unittest.main()